@@ -1,20 +1,46 @@
 import asyncio
 import logging
-import re
 import uuid
-from typing import Any, Dict, List, Optional, Text, Union
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Any, Dict, List, Mapping, Optional, Text, Union
 from urllib.parse import urlencode, urljoin
 
 import httpx
 import sentry_sdk
 from rasa_sdk import Tracker
-from rasa_sdk.events import ActionExecuted, SessionStarted, SlotSet
+from rasa_sdk.events import ActionExecuted, ReminderScheduled, SessionStarted, SlotSet
 from rasa_sdk.executor import CollectingDispatcher
 from rasa_sdk.forms import Action, FormAction
 from sentry_sdk.integrations.logging import LoggingIntegration
 from sentry_sdk.integrations.sanic import SanicIntegration
 
-from . import config, utils
+from . import codec, config, outbox
+from . import risk as risk_rules
+from . import utils
+from .breaker import CircuitOpenError, breakers
+from .clients import GOOGLE_PLACES, get_client
+from .deadline import Deadline
+from .eventstore import TRIAGE, eventstore
+from .flows import Branch, FormFlow
+from .lookups import lookup_tables
+from .places import places_cache
+from .retry import RETRYABLE_ERRORS, retry_policy
+from .singleflight import SingleFlight
+from .slots import (
+    YES_NO,
+    YES_NO_MAYBE,
+    Choices,
+    Entity,
+    LookupChoices,
+    SlotSchema,
+    compile_mappings,
+    make_validator,
+    schema,
+    validate_choice,
+    validate_slot,
+    yes_no,
+    yes_no_maybe,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -24,20 +50,88 @@ if config.SENTRY_DSN:
         dsn=config.SENTRY_DSN, integrations=[sentry_logging, SanicIntegration()]
     )
 
-YES_NO_DATA = {1: "yes", 2: "no"}
+# Load the lookup tables on action server startup, rather than on the first request
+lookup_tables.load()
+if config.PLACES_CACHE_PATH:
+    places_cache.load(config.PLACES_CACHE_PATH)
+
+# Users often send the same location at the same time, eg. after a broadcast
+places_lookups = SingleFlight("places_lookup")
+
+# Errors from parsing a response that isn't in the format we expect. These aren't
+# retried, but the user is asked for their location again, rather than the action
+# failing
+MALFORMED_RESPONSE_ERRORS = (KeyError, IndexError, TypeError, ValueError)
 
 
 class BaseFormAction(FormAction):
+    # The slots that the form fills, compiled into slot_mappings and validate_<slot>
+    # methods when the class is created. Slots that need more than checking against
+    # their choices can still have their own validate_<slot> method.
+    SLOT_SCHEMA: Dict[Text, SlotSchema] = {}
+
+    _slot_mappings: Dict[Text, List[Dict[Text, Any]]] = {}
+
+    # The order that the form asks for the slots in, compiled from form_flow
+    FLOW = FormFlow(())
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.FLOW = cls.form_flow()
+        if "SLOT_SCHEMA" not in cls.__dict__:
+            return
+        cls._slot_mappings = {
+            name: compile_mappings(slot) for name, slot in cls.SLOT_SCHEMA.items()
+        }
+        for name, slot in cls.SLOT_SCHEMA.items():
+            if slot.choices is None:
+                continue
+            # Replace validators generated for a parent's schema, but not hand
+            # written ones, including inherited ones
+            method = getattr(cls, f"validate_{name}", None)
+            if method is None or getattr(method, "generated", False):
+                setattr(cls, f"validate_{name}", make_validator(slot))
+
+    @classmethod
+    def form_flow(cls) -> FormFlow:
+        return FormFlow(getattr(cls, "SLOTS", ()))
+
+    @classmethod
+    def required_slots(cls, tracker: Tracker) -> List[Text]:
+        return cls.FLOW.next_slot(tracker)
+
+    if TYPE_CHECKING:
+        # For the generated validate_<slot> methods
+        def __getattr__(self, name: Text) -> Any:
+            ...
+
     def name(self) -> Text:
         return "base_form"
 
+    def slot_mappings(self) -> Dict[Text, Union[Dict, List[Dict]]]:
+        # Compiled once for the class, so this must not be modified
+        return self._slot_mappings  # type: ignore
+
+    def validate_from_schema(
+        self,
+        slot: Text,
+        value: Text,
+        dispatcher: CollectingDispatcher,
+        tracker: Tracker,
+    ) -> Dict[Text, Any]:
+        """
+        Validates the slot against its schema, for validate_<slot> methods that do
+        more than that
+        """
+        return validate_slot(self.SLOT_SCHEMA[slot], value, dispatcher, tracker)
+
     @property
-    def yes_no_data(self) -> Dict[int, Text]:
-        return YES_NO_DATA
+    def yes_no_data(self) -> Mapping[int, Text]:
+        return YES_NO.values
 
     @property
-    def yes_no_maybe_data(self) -> Dict[int, Text]:
-        return {1: "yes", 2: "no", 3: "not sure"}
+    def yes_no_maybe_data(self) -> Mapping[int, Text]:
+        return YES_NO_MAYBE.values
 
     @staticmethod
     def is_int(value: Text) -> bool:
@@ -55,73 +149,23 @@ class BaseFormAction(FormAction):
         field: Text,
         dispatcher: CollectingDispatcher,
         value: Text,
-        data: Dict[int, Text],
+        data: Union[Mapping[int, Text], Choices],
         accept_labels=True,
     ) -> Dict[Text, Optional[Text]]:
         """
         Validates that the value is either:
         - One of the values
         - An integer that is one of the keys
-        """
-        if (
-            accept_labels
-            and value
-            and isinstance(value, str)
-            and value.lower() in data.values()
-        ):
-            return {field: value}
-        elif self.is_int(value) and int(value) in data:
-            return {field: data[int(value)]}
-        else:
-            dispatcher.utter_message(template="utter_incorrect_selection")
-            return {field: None}
 
-    @staticmethod
-    def format_location(latitude: float, longitude: float) -> Text:
-        """
-        Returns the location in ISO6709 format
+        For choices that don't change, pass compiled Choices, so that they're not
+        compiled on every call.
         """
+        if not isinstance(data, Choices):
+            data = Choices.from_mapping(data)
+        return validate_choice(field, dispatcher, value, data, accept_labels)
 
-        def fractional_part(f):
-            if not f % 1:
-                return ""
-            parts = str(f).split(".")
-            return f".{parts[1]}"
-
-        # latitude integer part must be fixed width 2, longitude 3
-        return (
-            f"{int(latitude):+03d}"
-            f"{fractional_part(latitude)}"
-            f"{int(longitude):+04d}"
-            f"{fractional_part(longitude)}"
-            "/"
-        )
-
-    @staticmethod
-    def fix_location_format(text: Text) -> Text:
-        """
-        Previously there was a bug that caused the location to not be stored in
-        proper ISO6709 format. This function extracts the latitude and longitude from
-        either the incorrect or correct format, and then returns a properly formatted
-        ISO6709 string
-        """
-        if not text:
-            return ""
-        regex = re.compile(
-            r"""
-            ^
-            (?P<latitude>[\+|-]\d+\.?\d*)
-            (?P<longitude>[\+|-]\d+\.?\d*)
-            """,
-            flags=re.VERBOSE,
-        )
-        match = regex.match(text)
-        if not match:
-            raise ValueError(f"Invalid location {text}")
-        data = match.groupdict()
-        return BaseFormAction.format_location(
-            float(data["latitude"]), float(data["longitude"])
-        )
+    format_location = staticmethod(utils.format_location)
+    fix_location_format = staticmethod(utils.fix_location_format)
 
 
 class HealthCheckTermsForm(BaseFormAction):
@@ -131,27 +175,20 @@ class HealthCheckTermsForm(BaseFormAction):
         "terms",
     ]
 
+    SLOT_SCHEMA = schema(
+        SlotSchema(
+            "terms",
+            Choices.from_mapping({1: "yes"}),
+            entities=(),
+            intents={"affirm": "yes", "more": "more"},
+        )
+    )
+
     def name(self) -> Text:
         """Unique identifier of the form"""
 
         return "healthcheck_terms_form"
 
-    @classmethod
-    def required_slots(cls, tracker: Tracker) -> List[Text]:
-        for slot in cls.SLOTS:
-            if not tracker.get_slot(slot):
-                return [slot]
-        return []
-
-    def slot_mappings(self) -> Dict[Text, Union[Dict, List[Dict]]]:
-        return {
-            "terms": [
-                self.from_intent(intent="affirm", value="yes"),
-                self.from_intent(intent="more", value="more"),
-                self.from_text(),
-            ]
-        }
-
     def validate_terms(
         self,
         value: Text,
@@ -164,7 +201,7 @@ class HealthCheckTermsForm(BaseFormAction):
             dispatcher.utter_message(template="utter_more_terms_doc")
             return {"terms": None}
 
-        return self.validate_generic("terms", dispatcher, value, {1: "yes"})
+        return self.validate_from_schema("terms", value, dispatcher, tracker)
 
     def submit(
         self,
@@ -179,6 +216,22 @@ class HealthCheckTermsForm(BaseFormAction):
         return []
 
 
+def skip_location_for_minors(
+    result: Dict[Text, Any], dispatcher: CollectingDispatcher, tracker: Tracker
+) -> Dict[Text, Any]:
+    if result.get("age") == "<18":
+        result["location"] = "<not collected>"
+    return result
+
+
+def reset_rejected_location(
+    result: Dict[Text, Any], dispatcher: CollectingDispatcher, tracker: Tracker
+) -> Dict[Text, Any]:
+    if result["location_confirm"] == "no":
+        return {"location_confirm": None, "location": None}
+    return result
+
+
 class HealthCheckProfileForm(BaseFormAction):
     """HealthCheck form action"""
 
@@ -208,130 +261,57 @@ class HealthCheckProfileForm(BaseFormAction):
         "medical_condition_cardio",
     ]
 
+    SLOT_SCHEMA = schema(
+        SlotSchema("age", LookupChoices("base", "ages"), post=skip_location_for_minors),
+        SlotSchema("gender", LookupChoices("base", "gender")),
+        SlotSchema(
+            "province",
+            LookupChoices("base", "provinces"),
+            entities=(Entity("number"), Entity("province", intent="inform")),
+        ),
+        SlotSchema("location", entities=()),
+        yes_no("location_confirm", post=reset_rejected_location),
+        yes_no_maybe("medical_condition"),
+        yes_no("medical_condition_obesity"),
+        yes_no("medical_condition_diabetes"),
+        yes_no("medical_condition_hypertension"),
+        yes_no("medical_condition_cardio"),
+    )
+
     def name(self) -> Text:
         """Unique identifier of the form"""
 
         return "healthcheck_profile_form"
 
     @classmethod
-    def required_slots(cls, tracker: Tracker) -> List[Text]:
-        """A list of required slots that the form has to fill"""
-        slots = cls.SLOTS + cls.PERSISTED_SLOTS
-        # This is a strange workaround
-        # Rasa wants to fill all the slots with every question
-        # To prevent that, we just tell Rasa with each message that the slots
-        # that it's required to fill is just a single slot, the first
-        # slot that hasn't been filled yet.
-
-        # expanded questions when user has underlying medical conditions
-        if tracker.get_slot("medical_condition") != "no":
-            slots = cls.SLOTS + cls.PERSISTED_SLOTS + cls.CONDITIONS
-
-        if tracker.get_slot("age") == "<18":
-            for slot in cls.MINOR_SKIP_SLOTS:
-                if slot in slots:
-                    slots.remove(slot)
-
-        for slot in slots:
-            if not tracker.get_slot(slot):
-                return [slot]
-        return []
+    def form_flow(cls) -> FormFlow:
+        return FormFlow(
+            cls.SLOTS + cls.PERSISTED_SLOTS + cls.CONDITIONS,
+            [
+                # We only ask about specific conditions if they have any
+                Branch(
+                    "no_conditions", "medical_condition", "no", tuple(cls.CONDITIONS)
+                ),
+                Branch("minor", "age", "<18", tuple(cls.MINOR_SKIP_SLOTS)),
+            ],
+        )
 
     @property
-    def province_data(self) -> Dict[int, Text]:
-        with open("base/data/lookup_tables/provinces.txt") as f:
-            return dict(enumerate(f.read().splitlines(), start=1))
+    def province_data(self) -> Mapping[int, Text]:
+        return lookup_tables.labels("base", "provinces")
 
     @property
-    def age_data(self) -> Dict[int, Text]:
-        with open("base/data/lookup_tables/ages.txt") as f:
-            return dict(enumerate(f.read().splitlines(), start=1))
+    def age_data(self) -> Mapping[int, Text]:
+        return lookup_tables.labels("base", "ages")
 
     @property
-    def gender_data(self) -> Dict[int, Text]:
-        with open("base/data/lookup_tables/gender.txt") as f:
-            return dict(enumerate(f.read().splitlines(), start=1))
+    def gender_data(self) -> Mapping[int, Text]:
+        return lookup_tables.labels("base", "gender")
 
-    def slot_mappings(self) -> Dict[Text, Union[Dict, List[Dict]]]:
-        return {
-            "age": [self.from_entity(entity="number"), self.from_text()],
-            "gender": [self.from_entity(entity="number"), self.from_text()],
-            "province": [
-                self.from_entity(entity="number"),
-                self.from_entity(intent="inform", entity="province"),
-                self.from_text(),
-            ],
-            "location": [self.from_text()],
-            "location_confirm": [
-                self.from_entity(entity="number"),
-                self.from_intent(intent="affirm", value="yes"),
-                self.from_intent(intent="deny", value="no"),
-                self.from_text(),
-            ],
-            "medical_condition": [
-                self.from_entity(entity="number"),
-                self.from_intent(intent="affirm", value="yes"),
-                self.from_intent(intent="deny", value="no"),
-                self.from_intent(intent="maybe", value="not sure"),
-                self.from_text(),
-            ],
-            "medical_condition_obesity": [
-                self.from_entity(entity="number"),
-                self.from_intent(intent="affirm", value="yes"),
-                self.from_intent(intent="deny", value="no"),
-                self.from_text(),
-            ],
-            "medical_condition_diabetes": [
-                self.from_entity(entity="number"),
-                self.from_intent(intent="affirm", value="yes"),
-                self.from_intent(intent="deny", value="no"),
-                self.from_text(),
-            ],
-            "medical_condition_hypertension": [
-                self.from_entity(entity="number"),
-                self.from_intent(intent="affirm", value="yes"),
-                self.from_intent(intent="deny", value="no"),
-                self.from_text(),
-            ],
-            "medical_condition_cardio": [
-                self.from_entity(entity="number"),
-                self.from_intent(intent="affirm", value="yes"),
-                self.from_intent(intent="deny", value="no"),
-                self.from_text(),
-            ],
-        }
-
-    def validate_age(
-        self,
-        value: Text,
-        dispatcher: CollectingDispatcher,
-        tracker: Tracker,
-        domain: Dict[Text, Any],
-    ) -> Dict[Text, Optional[Text]]:
-        result = self.validate_generic("age", dispatcher, value, self.age_data)
-        if result.get("age") == "<18":
-            result["location"] = "<not collected>"
-        return result
-
-    def validate_gender(
-        self,
-        value: Text,
-        dispatcher: CollectingDispatcher,
-        tracker: Tracker,
-        domain: Dict[Text, Any],
-    ) -> Dict[Text, Optional[Text]]:
-        return self.validate_generic("gender", dispatcher, value, self.gender_data)
-
-    def validate_province(
-        self,
-        value: Text,
-        dispatcher: CollectingDispatcher,
-        tracker: Tracker,
-        domain: Dict[Text, Any],
-    ) -> Dict[Text, Optional[Text]]:
-        return self.validate_generic("province", dispatcher, value, self.province_data)
-
-    async def places_lookup(self, client, search_text, session_token, province):
+    async def places_lookup(
+        self, client, search_text, session_token, province, deadline=None
+    ):
+        timeout = (deadline or Deadline(None)).timeout(config.HTTP_TIMEOUT)
         locationbias = {
             "ec": "-32.2968402,26.419389",
             "fs": "-28.4541105,26.7967849",
@@ -353,11 +333,13 @@ class HealthCheckProfileForm(BaseFormAction):
                 "location": locationbias,
             }
         )
-        url = (
-            "https://maps.googleapis.com/maps/api/place/autocomplete/json"
-            f"?{querystring}"
+        url = urljoin(
+            config.GOOGLE_PLACES_URL,
+            f"/maps/api/place/autocomplete/json?{querystring}",
         )
-        response = (await client.get(url)).json()
+        resp = await client.get(url, timeout=timeout)
+        resp.raise_for_status()
+        response = codec.loads(resp.content)
         if not response["predictions"]:
             return None
         place_id = response["predictions"][0]["place_id"]
@@ -371,8 +353,13 @@ class HealthCheckProfileForm(BaseFormAction):
                 "fields": "formatted_address,geometry",
             }
         )
-        url = f"https://maps.googleapis.com/maps/api/place/details/json?{querystring}"
-        response = (await client.get(url)).json()
+        url = urljoin(
+            config.GOOGLE_PLACES_URL, f"/maps/api/place/details/json?{querystring}"
+        )
+        timeout = (deadline or Deadline(None)).timeout(config.HTTP_TIMEOUT)
+        resp = await client.get(url, timeout=timeout)
+        resp.raise_for_status()
+        response = codec.loads(resp.content)
         return response["result"]
 
     def get_province(self, tracker):
@@ -413,101 +400,58 @@ class HealthCheckProfileForm(BaseFormAction):
         session_token = uuid.uuid4().hex
         province = self.get_province(tracker)
 
-        if hasattr(httpx, "AsyncClient"):
-            # from httpx>=0.11.0, the async client is a different class
-            HTTPXClient = getattr(httpx, "AsyncClient")
-        else:
-            HTTPXClient = getattr(httpx, "Client")
-
-        async with HTTPXClient() as client:
-            location = None
-            for _ in range(3):
-                try:
-                    location = await self.places_lookup(
-                        client, value, session_token, province
-                    )
-                    break
-                except Exception:
-                    pass
-            if not location:
-                dispatcher.utter_message(template="utter_incorrect_location")
-                return {"location": None}
-            geometry = location["geometry"]["location"]
-            return {
-                "location": location["formatted_address"],
-                "city_location_coords": self.format_location(
-                    geometry["lat"], geometry["lng"]
+        client = get_client(GOOGLE_PLACES)
+        breaker = breakers[GOOGLE_PLACES]
+        deadline = Deadline(config.LOCATION_DEADLINE or None)
+        try:
+            location = await asyncio.wait_for(
+                places_lookups.do(
+                    places_cache.key(province, value),
+                    lambda: places_cache.lookup(
+                        province,
+                        value,
+                        lambda: retry_policy.call(
+                            GOOGLE_PLACES,
+                            breaker.wrap(
+                                lambda: self.places_lookup(
+                                    client, value, session_token, province, deadline
+                                )
+                            ),
+                            deadline,
+                        ),
+                    ),
                 ),
-            }
-
-    def validate_location_confirm(
-        self,
-        value: Text,
-        dispatcher: CollectingDispatcher,
-        tracker: Tracker,
-        domain: Dict[Text, Any],
-    ) -> Dict[Text, Optional[Text]]:
-        loc_confirm = self.validate_generic(
-            "location_confirm", dispatcher, value, self.yes_no_data
-        )
-        if loc_confirm["location_confirm"] and loc_confirm["location_confirm"] == "no":
-            return {"location_confirm": None, "location": None}
-        return loc_confirm
-
-    def validate_medical_condition(
-        self,
-        value: Text,
-        dispatcher: CollectingDispatcher,
-        tracker: Tracker,
-        domain: Dict[Text, Any],
-    ) -> Dict[Text, Optional[Text]]:
-        return self.validate_generic(
-            "medical_condition", dispatcher, value, self.yes_no_maybe_data
-        )
-
-    def validate_medical_condition_obesity(
-        self,
-        value: Text,
-        dispatcher: CollectingDispatcher,
-        tracker: Tracker,
-        domain: Dict[Text, Any],
-    ) -> Dict[Text, Optional[Text]]:
-        return self.validate_generic(
-            "medical_condition_obesity", dispatcher, value, self.yes_no_data
-        )
-
-    def validate_medical_condition_diabetes(
-        self,
-        value: Text,
-        dispatcher: CollectingDispatcher,
-        tracker: Tracker,
-        domain: Dict[Text, Any],
-    ) -> Dict[Text, Optional[Text]]:
-        return self.validate_generic(
-            "medical_condition_diabetes", dispatcher, value, self.yes_no_data
-        )
-
-    def validate_medical_condition_hypertension(
-        self,
-        value: Text,
-        dispatcher: CollectingDispatcher,
-        tracker: Tracker,
-        domain: Dict[Text, Any],
-    ) -> Dict[Text, Optional[Text]]:
-        return self.validate_generic(
-            "medical_condition_hypertension", dispatcher, value, self.yes_no_data
-        )
-
-    def validate_medical_condition_cardio(
-        self,
-        value: Text,
-        dispatcher: CollectingDispatcher,
-        tracker: Tracker,
-        domain: Dict[Text, Any],
-    ) -> Dict[Text, Optional[Text]]:
-        return self.validate_generic(
-            "medical_condition_cardio", dispatcher, value, self.yes_no_data
-        )
+                deadline.timeout(),
+            )
+        except CircuitOpenError:
+            # Google Places is down, so accept the location as the user typed it
+            return {"location": value}
+        except asyncio.TimeoutError:
+            # Don't keep the user waiting, accept the location as they typed it
+            Deadline.record_exceeded("validate_location")
+            return {"location": value}
+        except RETRYABLE_ERRORS + (httpx.HTTPError,) as e:
+            if deadline.expired:
+                Deadline.record_exceeded("validate_location")
+                return {"location": value}
+            logger.warning("Unable to look up location with Google Places: %r", e)
+            location = None
+        except MALFORMED_RESPONSE_ERRORS:
+            logger.exception("Invalid response from Google Places")
+            location = None
+        try:
+            if location:
+                geometry = location["geometry"]["location"]
+                return {
+                    "location": location["formatted_address"],
+                    "city_location_coords": self.format_location(
+                        geometry["lat"], geometry["lng"]
+                    ),
+                }
+        except MALFORMED_RESPONSE_ERRORS:
+            logger.exception("Invalid location from Google Places")
+        dispatcher.utter_message(template="utter_incorrect_location")
+        return {"location": None}
 
     def submit(
         self,
@@ -535,6 +479,16 @@ class HealthCheckForm(BaseFormAction):
         "tracing",
     ]
 
+    SLOT_SCHEMA = schema(
+        yes_no("symptoms_fever"),
+        yes_no("symptoms_cough"),
+        yes_no("symptoms_sore_throat"),
+        yes_no("symptoms_difficulty_breathing"),
+        yes_no("symptoms_taste_smell"),
+        yes_no_maybe("exposure"),
+        yes_no("tracing"),
+    )
+
     GENDER_MAPPING = {
         "MALE": "male",
         "FEMALE": "female",
@@ -565,143 +519,6 @@ class HealthCheckForm(BaseFormAction):
 
         return "healthcheck_form"
 
-    @classmethod
-    def required_slots(cls, tracker: Tracker) -> List[Text]:
-        """A list of required slots that the form has to fill"""
-
-        # This is a strange workaround
-        # Rasa wants to fill all the slots with every question
-        # To prevent that, we just tell Rasa with each message that the slots
-        # that it's required to fill is just a single slot, the first
-        # slot that hasn't been filled yet.
-
-        for slot in cls.SLOTS:
-            if not tracker.get_slot(slot):
-                return [slot]
-        return []
-
-    def slot_mappings(self) -> Dict[Text, Union[Dict, List[Dict]]]:
-        return {
-            "symptoms_fever": [
-                self.from_entity(entity="number"),
-                self.from_intent(intent="affirm", value="yes"),
-                self.from_intent(intent="deny", value="no"),
-                self.from_text(),
-            ],
-            "symptoms_cough": [
-                self.from_entity(entity="number"),
-                self.from_intent(intent="affirm", value="yes"),
-                self.from_intent(intent="deny", value="no"),
-                self.from_text(),
-            ],
-            "symptoms_sore_throat": [
-                self.from_entity(entity="number"),
-                self.from_intent(intent="affirm", value="yes"),
-                self.from_intent(intent="deny", value="no"),
-                self.from_text(),
-            ],
-            "symptoms_difficulty_breathing": [
-                self.from_entity(entity="number"),
-                self.from_intent(intent="affirm", value="yes"),
-                self.from_intent(intent="deny", value="no"),
-                self.from_text(),
-            ],
-            "symptoms_taste_smell": [
-                self.from_entity(entity="number"),
-                self.from_intent(intent="affirm", value="yes"),
-                self.from_intent(intent="deny", value="no"),
-                self.from_text(),
-            ],
-            "exposure": [
-                self.from_entity(entity="number"),
-                self.from_intent(intent="affirm", value="yes"),
-                self.from_intent(intent="deny", value="no"),
-                self.from_intent(intent="maybe", value="not sure"),
-                self.from_text(),
-            ],
-            "tracing": [
-                self.from_entity(entity="number"),
-                self.from_intent(intent="affirm", value="yes"),
-                self.from_intent(intent="deny", value="no"),
-                self.from_text(),
-            ],
-        }
-
-    def validate_symptoms_fever(
-        self,
-        value: Text,
-        dispatcher: CollectingDispatcher,
-        tracker: Tracker,
-        domain: Dict[Text, Any],
-    ) -> Dict[Text, Optional[Text]]:
-        return self.validate_generic(
-            "symptoms_fever", dispatcher, value, self.yes_no_data
-        )
-
-    def validate_symptoms_cough(
-        self,
-        value: Text,
-        dispatcher: CollectingDispatcher,
-        tracker: Tracker,
-        domain: Dict[Text, Any],
-    ) -> Dict[Text, Optional[Text]]:
-        return self.validate_generic(
-            "symptoms_cough", dispatcher, value, self.yes_no_data
-        )
-
-    def validate_symptoms_sore_throat(
-        self,
-        value: Text,
-        dispatcher: CollectingDispatcher,
-        tracker: Tracker,
-        domain: Dict[Text, Any],
-    ) -> Dict[Text, Optional[Text]]:
-        return self.validate_generic(
-            "symptoms_sore_throat", dispatcher, value, self.yes_no_data
-        )
-
-    def validate_symptoms_difficulty_breathing(
-        self,
-        value: Text,
-        dispatcher: CollectingDispatcher,
-        tracker: Tracker,
-        domain: Dict[Text, Any],
-    ) -> Dict[Text, Optional[Text]]:
-        return self.validate_generic(
-            "symptoms_difficulty_breathing", dispatcher, value, self.yes_no_data
-        )
-
-    def validate_symptoms_taste_smell(
-        self,
-        value: Text,
-        dispatcher: CollectingDispatcher,
-        tracker: Tracker,
-        domain: Dict[Text, Any],
-    ) -> Dict[Text, Optional[Text]]:
-        return self.validate_generic(
-            "symptoms_taste_smell", dispatcher, value, self.yes_no_data
-        )
-
-    def validate_exposure(
-        self,
-        value: Text,
-        dispatcher: CollectingDispatcher,
-        tracker: Tracker,
-        domain: Dict[Text, Any],
-    ) -> Dict[Text, Optional[Text]]:
-        return self.validate_generic(
-            "exposure", dispatcher, value, self.yes_no_maybe_data
-        )
-
-    def validate_tracing(
-        self,
-        value: Text,
-        dispatcher: CollectingDispatcher,
-        tracker: Tracker,
-        domain: Dict[Text, Any],
-    ) -> Dict[Text, Optional[Text]]:
-        return self.validate_generic("tracing", dispatcher, value, self.yes_no_data)
-
     def map_age(self, value: Text) -> Text:
         return self.AGE_MAPPING[value]
 
@@ -750,6 +567,7 @@ class HealthCheckForm(BaseFormAction):
                 "cardio": self.YES_NO_MAPPING.get(
                     tracker.get_slot("medical_condition_cardio")
                 ),
+                "risk_version": risk_rules.VERSION,
             },
         }
 
@@ -778,17 +596,6 @@ class HealthCheckForm(BaseFormAction):
             dispatcher.utter_message(template="utter_tb_prompt_low_risk_1")
             dispatcher.utter_message(template="utter_tb_prompt_low_risk_2")
 
-    def get_risk_data(self, tracker: Tracker) -> Dict:
-        data = {
-            slot: tracker.get_slot(slot)
-            for slot in self.SLOTS
-            if slot.startswith("symptoms_")
-        }
-        data.update(
-            {"exposure": tracker.get_slot("exposure"), "age": tracker.get_slot("age")}
-        )
-        return data
-
     async def submit(
         self,
         dispatcher: CollectingDispatcher,
@@ -797,37 +604,21 @@ class HealthCheckForm(BaseFormAction):
     ) -> List[Dict]:
         """Define what the form has to do
         after all required slots are filled"""
-        data = self.get_risk_data(tracker)
-        risk = utils.get_risk_level(data)
+        risk = risk_rules.get_risk_level(tracker.slots)
         study_a_arm = None
 
-        if config.EVENTSTORE_URL and config.EVENTSTORE_TOKEN:
-            url = urljoin(config.EVENTSTORE_URL, "/api/v5/covid19triage/")
-
+        if eventstore.enabled:
             post_data = self.get_eventstore_data(tracker, risk)
-            headers = {
-                "Authorization": f"Token {config.EVENTSTORE_TOKEN}",
-                "User-Agent": "rasa/covid19-healthcheckbot",
-            }
-
-            if hasattr(httpx, "AsyncClient"):
-                # from httpx>=0.11.0, the async client is a different class
-                HTTPXClient = getattr(httpx, "AsyncClient")
-            else:
-                HTTPXClient = getattr(httpx, "Client")
-
-            for i in range(config.HTTP_RETRIES):
-                try:
-                    async with HTTPXClient() as client:
-                        resp = await client.post(url, json=post_data, headers=headers)
-                        resp.raise_for_status()
-                        study_a_arm = (
-                            resp.json().get("profile", {}).get("hcs_study_a_arm", {})
-                        )
-                        break
-                except httpx.HTTPError as e:
-                    if i == config.HTTP_RETRIES - 1:
-                        raise e
+            if config.EVENTSTORE_OUTBOX_PATH:
+                # The submission is sent in the background, so there's no response
+                # to get the study A arm from
+                await outbox.enqueue(TRIAGE, post_data)
+                self.send_risk_to_user(dispatcher, risk, tracker)
+                self.send_post_risk_prompts(dispatcher, risk, tracker)
+                return [SlotSet("study_a_arm", None)]
+
+            response = await eventstore.post(TRIAGE, post_data)
+            study_a_arm = response.get("profile", {}).get("hcs_study_a_arm", {})
         self.send_risk_to_user(dispatcher, risk, tracker)
         self.send_post_risk_prompts(dispatcher, risk, tracker)
 
@@ -838,15 +629,55 @@ class ActionSendStudyMessages(Action):
     def name(self) -> Text:
         return "action_send_study_messages"
 
-    async def run(
+    def run(
         self,
         dispatcher: CollectingDispatcher,
         tracker: Tracker,
         domain: Dict[Text, Any],
     ) -> List[Dict[Text, Any]]:
+        """
+        The study A message is scheduled by action_session_start, which always
+        follows this action, because reminders scheduled before a session restart are
+        dropped instead of triggering
+        """
+        return []
+
+    def get_study_a_reminder(self, tracker: Tracker) -> List[Dict[Text, Any]]:
+        """
+        Schedules the study A message to be sent after STUDY_A_MESSAGE_DELAY, rather
+        than waiting in the action, so that we don't hold on to the request in the
+        meantime.
+
+        The arm is passed along as an entity, because the slot is cleared by the
+        session restart.
+        """
         study_a_arm = tracker.get_slot("study_a_arm")
         if study_a_arm and study_a_arm != "C":
-            await asyncio.sleep(config.STUDY_A_MESSAGE_DELAY)
+            delay = timedelta(seconds=config.STUDY_A_MESSAGE_DELAY)
+            return [
+                ReminderScheduled(
+                    "EXTERNAL_study_a_message",
+                    trigger_date_time=datetime.now(timezone.utc) + delay,
+                    entities=[{"entity": "study_a_arm", "value": study_a_arm}],
+                    name="study_a_message",
+                    kill_on_user_message=False,
+                )
+            ]
+        return []
+
+
+class ActionSendStudyAMessage(Action):
+    def name(self) -> Text:
+        return "action_send_study_a_message"
+
+    def run(
+        self,
+        dispatcher: CollectingDispatcher,
+        tracker: Tracker,
+        domain: Dict[Text, Any],
+    ) -> List[Dict[Text, Any]]:
+        study_a_arm = next(tracker.get_latest_entity_values("study_a_arm"), None)
+        if study_a_arm and study_a_arm != "C":
             dispatcher.utter_message(template=f"utter_study_a_{study_a_arm}")
         return []
 
@@ -874,9 +705,16 @@ class ActionSessionStart(Action):
         domain: Dict[Text, Any],
     ) -> List[Dict[Text, Any]]:
         actions = self.get_carry_over_slots(tracker)
+        # Only reminders scheduled after SessionStarted will trigger
+        actions.extend(self.get_session_reminders(tracker))
         actions.append(ActionExecuted("action_listen"))
         return actions
 
+    def get_session_reminders(self, tracker: Tracker) -> List[Dict[Text, Any]]:
+        if tracker.latest_action_name == "action_send_study_messages":
+            return ActionSendStudyMessages().get_study_a_reminder(tracker)
+        return []
+
 
 class ActionExit(Action):
     def name(self) -> Text:
@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Text, TypeVar
+
+from . import config
+from .clients import EVENTSTORE, GOOGLE_PLACES
+from .metrics import REGISTRY
+from .retry import is_retryable
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+STATES = (CLOSED, OPEN, HALF_OPEN)
+
+STATE = REGISTRY.gauge(
+    "circuit_breaker_state",
+    "The state of the circuit breaker, 0 is closed, 1 is open, 2 is half open",
+    ["upstream"],
+)
+TRIPS = REGISTRY.counter(
+    "circuit_breaker_trips_total",
+    "Number of times the circuit breaker opened",
+    ["upstream"],
+)
+REJECTIONS = REGISTRY.counter(
+    "circuit_breaker_rejections_total",
+    "Number of requests not made because the circuit breaker was open",
+    ["upstream"],
+)
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of making a request to an upstream that is failing
+    """
+
+    def __init__(self, upstream: Text):
+        self.upstream = upstream
+        super().__init__(f"Circuit breaker for {upstream} is open")
+
+
+class CircuitBreaker:
+    """
+    Stops making requests to an upstream after `failure_threshold` consecutive
+    failures, so that we fail fast instead of waiting on a service that is down.
+
+    After `reset_timeout` seconds, a single trial request is let through (half open).
+    If it succeeds the breaker closes again, otherwise it stays open for another
+    `reset_timeout` seconds.
+
+    Only errors that indicate the upstream is unhealthy (see `retry.is_retryable`)
+    count as failures.
+    """
+
+    def __init__(
+        self,
+        upstream: Text,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        timer: Callable[[], float] = time.monotonic,
+    ):
+        self.upstream = upstream
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.timer = timer
+        self.reset()
+
+    def reset(self) -> None:
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_progress = False
+        self._set_state(CLOSED)
+
+    def _set_state(self, state: Text) -> None:
+        self.state = state
+        STATE.set(STATES.index(state), upstream=self.upstream)
+
+    def allow_request(self) -> bool:
+        if self.state == OPEN and self.timer() - self.opened_at >= self.reset_timeout:
+            self._set_state(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self._trial_in_progress:
+                return False
+            self._trial_in_progress = True
+            return True
+        return self.state == CLOSED
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._trial_in_progress = False
+        if self.state != CLOSED:
+            logger.info("Circuit breaker for %s closed", self.upstream)
+            self._set_state(CLOSED)
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_in_progress = False
+        if self.state == HALF_OPEN or (
+            self.state == CLOSED and self.failures >= self.failure_threshold
+        ):
+            logger.warning("Circuit breaker for %s opened", self.upstream)
+            self.opened_at = self.timer()
+            self._set_state(OPEN)
+            TRIPS.inc(upstream=self.upstream)
+
+    async def call(self, func: Callable[[], Awaitable[T]]) -> T:
+        """
+        Calls `func`, unless the breaker is open, in which case CircuitOpenError is
+        raised
+        """
+        if not self.allow_request():
+            REJECTIONS.inc(upstream=self.upstream)
+            raise CircuitOpenError(self.upstream)
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            # The upstream never answered, so this is neither a success nor a
+            # failure, but the trial request is over
+            self._trial_in_progress = False
+            raise
+        except Exception as e:
+            if is_retryable(e):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        self.record_success()
+        return result
+
+    def wrap(self, func: Callable[[], Awaitable[T]]) -> Callable[[], Awaitable[T]]:
+        """
+        Returns `func` guarded by this breaker, eg. for each attempt of a retry policy
+        """
+        return lambda: self.call(func)
+
+
+breakers: Dict[Text, CircuitBreaker] = {
+    upstream: CircuitBreaker(
+        upstream,
+        failure_threshold=config.CIRCUIT_BREAKER_FAILURES,
+        reset_timeout=config.CIRCUIT_BREAKER_RESET_TIMEOUT,
+    )
+    for upstream in (EVENTSTORE, GOOGLE_PLACES)
+}
@@ -0,0 +1,95 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Generic, Hashable, Iterator, Optional, Tuple, TypeVar
+
+from .metrics import REGISTRY
+
+REQUESTS = REGISTRY.counter(
+    "cache_requests_total", "Number of cache lookups", ["cache", "result"]
+)
+EVICTIONS = REGISTRY.counter(
+    "cache_evictions_total",
+    "Number of entries evicted to stay within the size",
+    ["cache"],
+)
+
+V = TypeVar("V")
+
+
+class TTLCache(Generic[V]):
+    """
+    A bounded cache, that evicts the least recently used entries when full, and
+    expires entries `ttl` seconds after they were set.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        maxsize: int = 1024,
+        ttl: Optional[float] = None,
+        timer: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = timer
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, Tuple[float, V]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and item[0] > self.timer():
+                self._data.move_to_end(key)
+                self.hits += 1
+                REQUESTS.inc(cache=self.name, result="hit")
+                return item[1]
+            if item is not None:
+                del self._data[key]
+            self.misses += 1
+            REQUESTS.inc(cache=self.name, result="miss")
+            return default
+
+    def set(self, key: Hashable, value: V, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires = float("inf") if ttl is None else self.timer() + ttl
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                EVICTIONS.inc(cache=self.name)
+
+    def items(self) -> Iterator[Tuple[Hashable, V, float]]:
+        """
+        Returns all the unexpired items, as (key, value, seconds until expiry)
+        """
+        now = self.timer()
+        with self._lock:
+            items = list(self._data.items())
+        for key, (expires, value) in items:
+            if expires > now:
+                yield key, value, expires - now
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        item = self._data.get(key)
+        return item is not None and item[0] > self.timer()
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+from typing import Dict, Optional, Text, Tuple
+
+import httpx
+
+from . import config
+from .metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+EVENTSTORE = "eventstore"
+GOOGLE_PLACES = "google_places"
+
+CONNECTIONS = REGISTRY.gauge(
+    "http_pool_connections",
+    "Number of connections in the HTTP connection pool",
+    ["upstream", "state"],
+)
+CLIENTS_CREATED = REGISTRY.counter(
+    "http_pool_clients_created_total",
+    "Number of pooled HTTP clients created",
+    ["upstream"],
+)
+
+if hasattr(httpx, "AsyncClient"):
+    # from httpx>=0.11.0, the async client is a different class
+    HTTPXClient = getattr(httpx, "AsyncClient")
+else:
+    HTTPXClient = getattr(httpx, "Client")
+
+
+def pool_limits(max_keepalive: int, max_connections: int) -> httpx.PoolLimits:
+    # The timeouts and pool limits are only set up for the pinned httpx version
+    return httpx.PoolLimits(soft_limit=max_keepalive, hard_limit=max_connections)
+
+
+def upstream_url(upstream: Text) -> Optional[Text]:
+    """
+    The base URL for the upstream, used to pre-warm connections
+    """
+    if upstream == EVENTSTORE:
+        return config.EVENTSTORE_URL
+    if upstream == GOOGLE_PLACES:
+        return config.GOOGLE_PLACES_URL
+    return None
+
+
+class ClientPool:
+    """
+    Keeps one connection pooled HTTP client per upstream, so that requests reuse
+    keep-alive connections instead of doing a new TCP and TLS handshake each time.
+
+    Clients are bound to an event loop, so a new client is created if the loop changes,
+    eg. in each action server worker process.
+    """
+
+    def __init__(self):
+        self._clients: Dict[Text, Tuple[asyncio.AbstractEventLoop, httpx.Client]] = {}
+
+    def get(self, upstream: Text) -> httpx.Client:
+        loop = asyncio.get_event_loop()
+        existing = self._clients.get(upstream)
+        if existing is not None and existing[0] is loop:
+            return existing[1]
+        client = HTTPXClient(
+            timeout=httpx.Timeout(
+                config.HTTP_TIMEOUT, connect_timeout=config.HTTP_CONNECT_TIMEOUT
+            ),
+            pool_limits=pool_limits(
+                config.HTTP_POOL_MAX_KEEPALIVE, config.HTTP_POOL_MAX_CONNECTIONS
+            ),
+        )
+        self._clients[upstream] = (loop, client)
+        CLIENTS_CREATED.inc(upstream=upstream)
+        return client
+
+    async def prewarm(self, upstream: Text, connections: int) -> None:
+        """
+        Opens `connections` keep-alive connections to the upstream
+        """
+        url = upstream_url(upstream)
+        if not url or connections < 1:
+            return
+        client = self.get(upstream)
+
+        async def connect():
+            try:
+                await client.head(url)
+            except httpx.HTTPError:
+                logger.warning("Unable to pre-warm connection to %s", upstream)
+
+        await asyncio.gather(*(connect() for _ in range(connections)))
+
+    async def close(self) -> None:
+        clients, self._clients = self._clients, {}
+        loop = asyncio.get_event_loop()
+        for client_loop, client in clients.values():
+            if client_loop is loop:
+                # httpx>=0.11.0 renamed close to aclose for the async client
+                await getattr(client, "aclose", client.close)()
+
+    def stats(self) -> Dict[Text, Dict[Text, int]]:
+        """
+        Returns the number of keep-alive and active connections for each upstream
+        """
+        result = {}
+        for upstream, (_, client) in self._clients.items():
+            dispatch = getattr(client, "dispatch", None)
+            keepalive = getattr(dispatch, "keepalive_connections", ())
+            active = getattr(dispatch, "active_connections", ())
+            result[upstream] = {"keepalive": len(keepalive), "active": len(active)}
+        return result
+
+    def collect_metrics(self) -> None:
+        for upstream, stats in self.stats().items():
+            for state, value in stats.items():
+                CONNECTIONS.set(value, upstream=upstream, state=state)
+
+
+clients = ClientPool()
+REGISTRY.add_collector(clients.collect_metrics)
+
+
+def get_client(upstream: Text):
+    return clients.get(upstream)
@@ -0,0 +1,35 @@
+"""
+JSON encoding and decoding for the action webhook and the upstream APIs, using orjson
+if it's installed and FAST_JSON is enabled, and the standard library otherwise.
+"""
+import json
+from typing import Any, Union
+
+from . import config
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore
+
+CONTENT_TYPE = "application/json"
+
+
+def fast_json_enabled() -> bool:
+    return orjson is not None and bool(config.FAST_JSON)
+
+
+def dumps(obj: Any) -> bytes:
+    if fast_json_enabled():
+        # The standard library converts non-string keys to strings, so we do too
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """
+    Raises a json.JSONDecodeError for invalid JSON, with either implementation
+    """
+    if fast_json_enabled():
+        return orjson.loads(data)
+    return json.loads(data)
@@ -8,3 +8,34 @@ HTTP_RETRIES = int(os.environ.get("HTTP_RETRIES", 3))
 SENTRY_DSN = os.environ.get("SENTRY_DSN", None)
 STUDY_A_MESSAGE_DELAY = float(os.environ.get("STUDY_A_MESSAGE_DELAY", 0.5))
 STUDY_B_ENABLED = strtobool(os.environ.get("STUDY_B_ENABLED", "0"))
+LOOKUP_TABLES_RELOAD_INTERVAL = float(
+    os.environ.get("LOOKUP_TABLES_RELOAD_INTERVAL", 60)
+)
+UNIVERSITY_CACHE_SIZE = int(os.environ.get("UNIVERSITY_CACHE_SIZE", 10000))
+UNIVERSITY_CACHE_TTL = float(os.environ.get("UNIVERSITY_CACHE_TTL", 3600))
+CAMPUS_MENU_PAGE_SIZE = int(os.environ.get("CAMPUS_MENU_PAGE_SIZE", 10))
+HTTP_TIMEOUT = float(os.environ.get("HTTP_TIMEOUT", 5))
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", 5))
+HTTP_POOL_MAX_KEEPALIVE = int(os.environ.get("HTTP_POOL_MAX_KEEPALIVE", 10))
+HTTP_POOL_MAX_CONNECTIONS = int(os.environ.get("HTTP_POOL_MAX_CONNECTIONS", 100))
+HTTP_PREWARM_CONNECTIONS = int(os.environ.get("HTTP_PREWARM_CONNECTIONS", 0))
+HTTP_RETRY_BACKOFF = float(os.environ.get("HTTP_RETRY_BACKOFF", 0.1))
+HTTP_RETRY_MAX_BACKOFF = float(os.environ.get("HTTP_RETRY_MAX_BACKOFF", 2))
+HTTP_RETRY_BUDGET_RATIO = float(os.environ.get("HTTP_RETRY_BUDGET_RATIO", 0.1))
+HTTP_RETRY_BUDGET_MINIMUM = int(os.environ.get("HTTP_RETRY_BUDGET_MINIMUM", 10))
+CIRCUIT_BREAKER_FAILURES = int(os.environ.get("CIRCUIT_BREAKER_FAILURES", 5))
+CIRCUIT_BREAKER_RESET_TIMEOUT = float(
+    os.environ.get("CIRCUIT_BREAKER_RESET_TIMEOUT", 30)
+)
+GOOGLE_PLACES_URL = os.environ.get("GOOGLE_PLACES_URL", "https://maps.googleapis.com/")
+EVENTSTORE_OUTBOX_PATH = os.environ.get("EVENTSTORE_OUTBOX_PATH", None)
+OUTBOX_BATCH_SIZE = int(os.environ.get("OUTBOX_BATCH_SIZE", 50))
+OUTBOX_CONCURRENCY = int(os.environ.get("OUTBOX_CONCURRENCY", 4))
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get("OUTBOX_MAX_ATTEMPTS", 20))
+OUTBOX_FLUSH_INTERVAL = float(os.environ.get("OUTBOX_FLUSH_INTERVAL", 5))
+PLACES_CACHE_SIZE = int(os.environ.get("PLACES_CACHE_SIZE", 10000))
+PLACES_CACHE_TTL = float(os.environ.get("PLACES_CACHE_TTL", 24 * 60 * 60))
+PLACES_CACHE_PATH = os.environ.get("PLACES_CACHE_PATH", None)
+LOCATION_DEADLINE = float(os.environ.get("LOCATION_DEADLINE", 1.5))
+STUDY_B_PREFETCH_TTL = float(os.environ.get("STUDY_B_PREFETCH_TTL", 60 * 60))
+FAST_JSON = strtobool(os.environ.get("FAST_JSON", "1"))
@@ -0,0 +1,48 @@
+import time
+from typing import Callable, Optional, Text
+
+from .metrics import REGISTRY
+
+EXCEEDED = REGISTRY.counter(
+    "deadline_exceeded_total",
+    "Number of operations that ran out of time and fell back",
+    ["operation"],
+)
+
+
+class Deadline:
+    """
+    A time budget for an operation, eg. a user's turn, that is shared by all the
+    requests made during the operation.
+
+    `seconds` of None means that there is no deadline.
+    """
+
+    def __init__(
+        self,
+        seconds: Optional[float],
+        timer: Callable[[], float] = time.monotonic,
+    ):
+        self.timer = timer
+        self.expires = float("inf") if seconds is None else timer() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires - self.timer())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, default: Optional[float] = None) -> Optional[float]:
+        """
+        Returns the timeout to use for a request, which is `default` if there's more
+        time than that left, or None if neither are set
+        """
+        remaining = self.remaining()
+        if default is not None:
+            remaining = min(default, remaining)
+        return None if remaining == float("inf") else remaining
+
+    @staticmethod
+    def record_exceeded(operation: Text) -> None:
+        EXCEEDED.inc(operation=operation)
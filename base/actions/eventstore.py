@@ -0,0 +1,85 @@
+import time
+from typing import Any, Dict, Optional, Text
+from urllib.parse import urljoin
+
+from . import codec, config
+from .breaker import breakers
+from .clients import EVENTSTORE, get_client
+from .metrics import REGISTRY
+from .retry import retry_policy
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "eventstore_request_seconds",
+    "Time taken for event store requests, including retries",
+    ["endpoint"],
+)
+
+TRIAGE = "/api/v5/covid19triage/"
+STUDY_B_ARM = "/api/v2/hcsstudybrandomarm/"
+TRIAGE_START = "/api/v2/covid19triagestart/"
+
+Payload = Dict[Text, Any]
+
+
+class EventStoreClient:
+    """
+    Makes requests to the event store, using the shared connection pool, retry
+    policy and circuit breaker.
+
+    The URL and token are read from the config for each request, so that they can be
+    changed at runtime, eg. in tests.
+    """
+
+    @property
+    def enabled(self) -> bool:
+        return bool(config.EVENTSTORE_URL and config.EVENTSTORE_TOKEN)
+
+    @property
+    def headers(self) -> Dict[Text, Text]:
+        return {
+            "Authorization": f"Token {config.EVENTSTORE_TOKEN}",
+            "Content-Type": codec.CONTENT_TYPE,
+            "User-Agent": "rasa/covid19-healthcheckbot",
+        }
+
+    async def post(self, path: Text, data: Payload, retry: bool = True) -> Payload:
+        """
+        POSTs `data` to the endpoint at `path`, returning the response body.
+
+        Failed requests are retried, unless `retry` is False, eg. for callers that do
+        their own retries.
+        """
+        url = urljoin(config.EVENTSTORE_URL or "", path)
+        client = get_client(EVENTSTORE)
+
+        async def post():
+            resp = await client.post(url, data=codec.dumps(data), headers=self.headers)
+            resp.raise_for_status()
+            return codec.loads(resp.content)
+
+        call = breakers[EVENTSTORE].wrap(post)
+        start = time.monotonic()
+        try:
+            if retry:
+                return await retry_policy.call(EVENTSTORE, call)
+            return await call()
+        finally:
+            REQUEST_SECONDS.observe(time.monotonic() - start, endpoint=path)
+
+    async def submit_triage(self, data: Payload) -> Optional[Payload]:
+        if not self.enabled:
+            return None
+        return await self.post(TRIAGE, data)
+
+    async def assign_study_b_arm(self, data: Payload) -> Optional[Payload]:
+        if not self.enabled:
+            return None
+        return await self.post(STUDY_B_ARM, data)
+
+    async def start_triage(self, data: Payload) -> Optional[Payload]:
+        if not self.enabled:
+            return None
+        return await self.post(TRIAGE_START, data)
+
+
+eventstore = EventStoreClient()
@@ -0,0 +1,76 @@
+"""
+The order that forms ask their questions in.
+
+Rasa wants to fill all the required slots with every message, so instead of listing
+all of a form's slots as required, we only list the first one that hasn't been
+filled yet. Which slots a form asks depends on earlier answers, eg. minors aren't
+asked for their location, so a `FormFlow` compiles the order of the slots for every
+combination of those answers once, when the form class is created.
+"""
+from typing import Any, Dict, Iterable, List, NamedTuple, Set, Text, Tuple
+
+from rasa_sdk import Tracker
+
+
+class Branch(NamedTuple):
+    """
+    Skips the `skip` slots if `slot` has been filled with `value`
+    """
+
+    name: Text
+    slot: Text
+    value: Any
+    skip: Tuple[Text, ...]
+
+
+Plan = Tuple[Text, ...]
+
+
+class FormFlow:
+    def __init__(self, slots: Iterable[Text], branches: Iterable[Branch] = ()):
+        self.slots: Plan = tuple(slots)
+        self.branches: Tuple[Branch, ...] = tuple(branches)
+        # Plans are keyed by a bitmask of the branches taken, bit i for branch i
+        self.plans: List[Plan] = []
+        for key in range(2 ** len(self.branches)):
+            skip: Set[Text] = set()
+            for branch in self.taken(key):
+                skip.update(branch.skip)
+            self.plans.append(tuple(s for s in self.slots if s not in skip))
+
+    def taken(self, key: int) -> List[Branch]:
+        return [b for i, b in enumerate(self.branches) if key & (1 << i)]
+
+    def plan(self, tracker: Tracker) -> Plan:
+        """
+        Returns the slots that the form asks, given the answers so far
+        """
+        slots = tracker.slots
+        key = 0
+        for i, branch in enumerate(self.branches):
+            if slots.get(branch.slot) == branch.value:
+                key |= 1 << i
+        return self.plans[key]
+
+    def next_slot(self, tracker: Tracker) -> List[Text]:
+        """
+        Returns the first slot that hasn't been filled yet, or an empty list if the
+        form is complete.
+
+        We have to check from the start, rather than carrying on from the requested
+        slot, because validation can clear earlier slots, eg. rejecting the location
+        """
+        slots = tracker.slots
+        for slot in self.plan(tracker):
+            if not slots.get(slot):
+                return [slot]
+        return []
+
+    def paths(self) -> Dict[Tuple[Text, ...], Plan]:
+        """
+        Returns every path through the form, keyed by the names of the branches taken
+        """
+        return {
+            tuple(b.name for b in self.taken(key)): plan
+            for key, plan in enumerate(self.plans)
+        }
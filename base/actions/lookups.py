@@ -0,0 +1,136 @@
+import logging
+import threading
+import time
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict, Mapping, NamedTuple, Optional, Text, Tuple
+
+from . import config
+from .metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+ROOT = Path(__file__).resolve().parents[2]
+LOOKUP_TABLES_GLOB = "*/data/lookup_tables/*.txt"
+
+LOAD_SECONDS = REGISTRY.gauge(
+    "lookup_tables_load_seconds", "Time taken for the last full load of the tables"
+)
+HITS = REGISTRY.counter(
+    "lookup_table_hits_total", "Number of lookup table reads", ["bot", "table"]
+)
+RELOADS = REGISTRY.counter(
+    "lookup_table_reloads_total",
+    "Number of times a lookup table was reloaded because it changed on disk",
+    ["bot", "table"],
+)
+
+
+class LookupTable(NamedTuple):
+    """
+    An immutable lookup table, in both directions
+    """
+
+    labels: Mapping[int, Text]
+    indexes: Mapping[Text, int]
+    mtime: float
+
+    @classmethod
+    def from_file(cls, path: Path) -> "LookupTable":
+        mtime = path.stat().st_mtime
+        with path.open() as f:
+            labels = dict(enumerate(f.read().splitlines(), start=1))
+        return cls(
+            labels=MappingProxyType(labels),
+            indexes=MappingProxyType({v: k for k, v in labels.items()}),
+            mtime=mtime,
+        )
+
+
+class LookupTableRegistry:
+    """
+    Loads all the lookup tables from disk once, and then serves them from memory.
+
+    Tables are keyed by (bot, table name), eg. ("base", "provinces") for
+    `base/data/lookup_tables/provinces.txt`. The files are checked for changes at most
+    once every `reload_interval` seconds, and reloaded if their mtime has changed.
+    """
+
+    def __init__(
+        self,
+        root: Path = ROOT,
+        pattern: Text = LOOKUP_TABLES_GLOB,
+        reload_interval: Optional[float] = 60.0,
+    ):
+        self.root = root
+        self.pattern = pattern
+        self.reload_interval = reload_interval
+        self._tables: Dict[Tuple[Text, Text], LookupTable] = {}
+        self._paths: Dict[Tuple[Text, Text], Path] = {}
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def load(self) -> None:
+        start = time.monotonic()
+        tables, paths = {}, {}
+        for path in sorted(self.root.glob(self.pattern)):
+            key = (path.relative_to(self.root).parts[0], path.stem)
+            tables[key] = LookupTable.from_file(path)
+            paths[key] = path
+        with self._lock:
+            self._tables, self._paths = tables, paths
+            self._checked_at = time.monotonic()
+        elapsed = time.monotonic() - start
+        LOAD_SECONDS.set(elapsed)
+        logger.info("Loaded %d lookup tables in %.4fs", len(tables), elapsed)
+
+    def reload_changed(self) -> None:
+        """
+        Reloads any tables whose files have been modified since they were loaded
+        """
+        with self._lock:
+            self._checked_at = time.monotonic()
+            items = list(self._paths.items())
+        for key, path in items:
+            try:
+                mtime = path.stat().st_mtime
+            except OSError:
+                logger.exception("Unable to check lookup table %s", path)
+                continue
+            if mtime != self._tables[key].mtime:
+                table = LookupTable.from_file(path)
+                with self._lock:
+                    self._tables[key] = table
+                RELOADS.inc(bot=key[0], table=key[1])
+                logger.info("Reloaded lookup table %s", path)
+
+    def _maybe_reload(self) -> None:
+        if self.reload_interval is None:
+            return
+        if time.monotonic() - self._checked_at >= self.reload_interval:
+            self.reload_changed()
+
+    def get(self, bot: Text, table: Text) -> LookupTable:
+        if not self._tables:
+            self.load()
+        else:
+            self._maybe_reload()
+        HITS.inc(bot=bot, table=table)
+        return self._tables[(bot, table)]
+
+    def labels(self, bot: Text, table: Text) -> Mapping[int, Text]:
+        """
+        Returns the index -> label mapping for the table, indexes starting at 1
+        """
+        return self.get(bot, table).labels
+
+    def indexes(self, bot: Text, table: Text) -> Mapping[Text, int]:
+        """
+        Returns the label -> index mapping for the table
+        """
+        return self.get(bot, table).indexes
+
+
+lookup_tables = LookupTableRegistry(
+    reload_interval=config.LOOKUP_TABLES_RELOAD_INTERVAL
+)
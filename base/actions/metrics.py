@@ -0,0 +1,189 @@
+import threading
+from collections import defaultdict
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Text,
+    Tuple,
+    TypeVar,
+    cast,
+)
+
+LabelValues = Tuple[Text, ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Metric:
+    """
+    Base class for the in-process metrics, keeping a value per set of label values
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: Text, documentation: Text, labels: Sequence[Text] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[Text, Text]) -> LabelValues:
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} expects labels {self.labels}, got {labels}")
+        return tuple(str(labels[label]) for label in self.labels)
+
+    def _format_labels(self, values: LabelValues, extra: Text = "") -> Text:
+        pairs = [f'{k}="{v}"' for k, v in zip(self.labels, values)]
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(pairs) + "}"
+
+    def samples(self) -> Iterable[Text]:
+        raise NotImplementedError()
+
+    def render(self) -> Text:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: Text, documentation: Text, labels: Sequence[Text] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = defaultdict(float)
+
+    def inc(self, amount: float = 1, **labels: Text) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] += amount
+
+    def get(self, **labels: Text) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> Iterable[Text]:
+        for key, value in sorted(self._values.items()):
+            yield f"{self.name}{self._format_labels(key)} {value}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: Text) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: Text,
+        documentation: Text,
+        labels: Sequence[Text] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = defaultdict(float)
+
+    def observe(self, value: float, **labels: Text) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * (len(self.buckets) + 1))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-1] += 1
+            self._sums[key] += value
+
+    def count(self, **labels: Text) -> int:
+        counts = self._counts.get(self._key(labels))
+        return counts[-1] if counts else 0
+
+    def sum(self, **labels: Text) -> float:
+        return self._sums.get(self._key(labels), 0)
+
+    def samples(self) -> Iterable[Text]:
+        for key, counts in sorted(self._counts.items()):
+            for bound, count in zip(self.buckets, counts):
+                labels = self._format_labels(key, f'le="{bound}"')
+                yield f"{self.name}_bucket{labels} {count}"
+            labels = self._format_labels(key, 'le="+Inf"')
+            yield f"{self.name}_bucket{labels} {counts[-1]}"
+            yield f"{self.name}_sum{self._format_labels(key)} {self._sums[key]}"
+            yield f"{self.name}_count{self._format_labels(key)} {counts[-1]}"
+
+
+M = TypeVar("M", bound=Metric)
+
+
+class Registry:
+    """
+    Holds all the metrics for this process, so that they can be exported together
+    """
+
+    def __init__(self):
+        self._metrics: Dict[Text, Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+
+    def _register(self, metric: M) -> M:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            if type(existing) is not type(metric) or existing.labels != metric.labels:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            return cast(M, existing)
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(
+        self, name: Text, documentation: Text, labels: Sequence[Text] = ()
+    ) -> Counter:
+        return self._register(Counter(name, documentation, labels))
+
+    def gauge(
+        self, name: Text, documentation: Text, labels: Sequence[Text] = ()
+    ) -> Gauge:
+        return self._register(Gauge(name, documentation, labels))
+
+    def histogram(
+        self,
+        name: Text,
+        documentation: Text,
+        labels: Sequence[Text] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """
+        Adds a function that is called to update metrics before they're rendered
+        """
+        self._collectors.append(collector)
+
+    def get(self, name: Text) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> Text:
+        """
+        Returns all the metrics in the Prometheus text exposition format
+        """
+        for collector in self._collectors:
+            collector()
+        return "\n".join(m.render() for _, m in sorted(self._metrics.items())) + "\n"
+
+
+REGISTRY = Registry()
@@ -0,0 +1,246 @@
+"""
+Rewrites the location_coords and city_location_coords slot events in the SQL tracker
+store, that were stored before the ISO6709 formatting bug was fixed, into the correct
+format.
+
+    python -m base.actions.migrate_locations sqlite:///rasa.db
+    python -m base.actions.migrate_locations postgresql://rasa@localhost/rasa
+
+The events table is walked in batches, in order of id, and each batch is committed
+along with a checkpoint of the last id that was processed, so that an interrupted
+migration can be resumed with `--resume`, and no event is rewritten twice.
+
+Rather than holding a server-side cursor open for the whole run, which Postgres would
+have to materialise to keep it open across the commits, each batch is a separate
+query that seeks to the last id on the primary key index.
+"""
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+from typing import Any, Iterable, List, NamedTuple, Optional, Sequence, Text, Tuple
+
+from .utils import fix_location_format
+
+try:
+    import psycopg2
+    import psycopg2.extras
+except ImportError:  # pragma: no cover
+    psycopg2 = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+LOCATION_SLOTS = frozenset(["location_coords", "city_location_coords"])
+
+# Matches the data of both slots
+DATA_PATTERN = "%location_coords%"
+
+
+class Stats(NamedTuple):
+    last_id: int = 0
+    scanned: int = 0
+    updated: int = 0
+    invalid: int = 0
+
+
+def connect(url: Text) -> Any:
+    """
+    Connects to the tracker store database, given as sqlite:///<path> or a
+    postgresql:// URL
+    """
+    if url.startswith("sqlite:///"):
+        return sqlite3.connect(url.replace("sqlite:///", "", 1))
+    if url.startswith(("postgres://", "postgresql://")):
+        if psycopg2 is None:
+            raise ValueError("psycopg2 is required to migrate a Postgres tracker store")
+        return psycopg2.connect(url)
+    raise ValueError(f"Unsupported database URL {url}")
+
+
+def placeholder(connection: Any) -> Text:
+    if isinstance(connection, sqlite3.Connection):
+        return "?"
+    return "%s"
+
+
+def migrate_event(data: Text) -> Optional[Text]:
+    """
+    Returns the event's data with the location fixed, or None if the event doesn't
+    need to be changed.
+
+    Raises ValueError if the location can't be parsed
+    """
+    event = json.loads(data)
+    if event.get("event") != "slot" or event.get("name") not in LOCATION_SLOTS:
+        return None
+    value = event.get("value")
+    if not value or not isinstance(value, str):
+        return None
+    fixed = fix_location_format(value)
+    if fixed == value:
+        return None
+    event["value"] = fixed
+    return json.dumps(event)
+
+
+def fetch_batch(connection: Any, after: int, size: int) -> List[Tuple[int, Text]]:
+    p = placeholder(connection)
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            "SELECT id, data FROM events "
+            f"WHERE id > {p} AND type_name = 'slot' AND data LIKE {p} "
+            f"ORDER BY id LIMIT {p}",
+            (after, DATA_PATTERN, size),
+        )
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def update_events(connection: Any, rows: Sequence[Tuple[Text, int]]) -> None:
+    p = placeholder(connection)
+    sql = f"UPDATE events SET data = {p} WHERE id = {p}"
+    cursor = connection.cursor()
+    try:
+        if psycopg2 is not None and not isinstance(connection, sqlite3.Connection):
+            # executemany makes a round trip per row with psycopg2
+            psycopg2.extras.execute_batch(cursor, sql, rows)
+        else:
+            cursor.executemany(sql, rows)
+    finally:
+        cursor.close()
+
+
+def migrate_batch(
+    rows: Iterable[Tuple[int, Text]], stats: Stats
+) -> Tuple[List[Tuple[Text, int]], Stats]:
+    """
+    Returns the updates for a batch of events, as (data, id), and the new stats
+    """
+    updates = []
+    last_id, scanned, updated, invalid = stats
+    for event_id, data in rows:
+        last_id = event_id
+        scanned += 1
+        try:
+            fixed = migrate_event(data)
+        except ValueError:
+            logger.warning(f"Skipping event {event_id}, with an invalid location")
+            invalid += 1
+            continue
+        if fixed is not None:
+            updates.append((fixed, event_id))
+    return updates, Stats(last_id, scanned, updated + len(updates), invalid)
+
+
+def read_checkpoint(path: Optional[Text]) -> int:
+    if not path or not os.path.exists(path):
+        return 0
+    with open(path) as f:
+        return int(f.read().strip() or 0)
+
+
+def write_checkpoint(path: Optional[Text], last_id: int) -> None:
+    if not path:
+        return
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(str(last_id))
+    os.replace(tmp_path, path)
+
+
+def migrate(
+    connection: Any,
+    batch_size: int = 5000,
+    after: int = 0,
+    checkpoint: Optional[Text] = None,
+    dry_run: bool = False,
+    progress=None,
+) -> Stats:
+    """
+    Fixes the location slot events with an id greater than `after`, committing each
+    batch, and writing the last id of each batch to `checkpoint`, if given.
+
+    `progress` is called with the stats after each batch
+    """
+    stats = Stats(last_id=after)
+    while True:
+        rows = fetch_batch(connection, stats.last_id, batch_size)
+        if not rows:
+            break
+        updates, stats = migrate_batch(rows, stats)
+        if updates and not dry_run:
+            update_events(connection, updates)
+        connection.commit()
+        if not dry_run:
+            write_checkpoint(checkpoint, stats.last_id)
+        if progress is not None:
+            progress(stats)
+    return stats
+
+
+def max_event_id(connection: Any) -> int:
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT MAX(id) FROM events")
+        return cursor.fetchone()[0] or 0
+    finally:
+        cursor.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("url", help="sqlite:///<path> or postgresql://...")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument(
+        "--checkpoint",
+        default="migrate_locations.checkpoint",
+        help="File to store the last migrated event id in",
+    )
+    parser.add_argument(
+        "--resume", action="store_true", help="Carry on from the checkpoint"
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Count the events without changing them"
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+
+    connection = connect(args.url)
+    after = read_checkpoint(args.checkpoint) if args.resume else 0
+    total = max_event_id(connection)
+    start = time.monotonic()
+
+    def progress(stats: Stats) -> None:
+        seconds = max(time.monotonic() - start, 1e-9)
+        print(
+            f"{stats.last_id}/{total} events ({stats.last_id / max(total, 1):.0%}), "
+            f"{stats.scanned} scanned ({stats.scanned / seconds:.0f}/s), "
+            f"{stats.updated} updated, {stats.invalid} invalid",
+            file=sys.stderr,
+        )
+
+    try:
+        stats = migrate(
+            connection,
+            batch_size=args.batch_size,
+            after=after,
+            checkpoint=args.checkpoint,
+            dry_run=args.dry_run,
+            progress=progress,
+        )
+    finally:
+        connection.close()
+    print(
+        f"Done: {stats.scanned} scanned, {stats.updated} "
+        f"{'to update' if args.dry_run else 'updated'}, {stats.invalid} invalid",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
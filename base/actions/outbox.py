@@ -0,0 +1,368 @@
+import asyncio
+import json
+import logging
+import random
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Text
+
+import httpx
+
+from . import config
+from .breaker import CircuitOpenError
+from .clients import EVENTSTORE
+from .eventstore import eventstore
+from .metrics import REGISTRY
+from .retry import is_retryable
+
+logger = logging.getLogger(__name__)
+
+PENDING = REGISTRY.gauge(
+    "outbox_pending", "Number of submissions waiting to be sent", ["outbox"]
+)
+SENT = REGISTRY.counter(
+    "outbox_sent_total", "Number of submissions sent from the outbox", ["outbox"]
+)
+FAILURES = REGISTRY.counter(
+    "outbox_failures_total",
+    "Number of failed attempts to send a submission from the outbox",
+    ["outbox"],
+)
+DEAD_LETTERS = REGISTRY.counter(
+    "outbox_dead_letters_total",
+    "Number of submissions that were given up on",
+    ["outbox"],
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    path TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outbox_next_attempt ON outbox (next_attempt);
+CREATE TABLE IF NOT EXISTS dead_letters (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    error TEXT,
+    created REAL NOT NULL,
+    failed REAL NOT NULL
+);
+"""
+
+
+class Message(NamedTuple):
+    id: int
+    path: Text
+    payload: Dict[Text, Any]
+    attempts: int
+
+
+class Outbox:
+    """
+    A durable queue of event store submissions, stored in SQLite.
+
+    Messages are claimed for `lease` seconds before they're sent, so that several
+    action server workers can share the same outbox without sending the same message
+    at the same time. If a worker dies while sending, the message is sent again once
+    the lease expires, which the event store deduplicates using the
+    `deduplication_id` in the payload.
+    """
+
+    def __init__(
+        self,
+        path: Text,
+        name: Text = EVENTSTORE,
+        max_attempts: int = 20,
+        lease: float = 60.0,
+        timer: Callable[[], float] = time.time,
+    ):
+        self.path = path
+        self.name = name
+        self.max_attempts = max_attempts
+        self.lease = lease
+        self.timer = timer
+        self.db = self._connect()
+        self.db.executescript(SCHEMA)
+        # Writes from actions are made on their own connection, in a single
+        # background thread, so that they don't block the event loop while SQLite
+        # commits
+        self._writer = ThreadPoolExecutor(max_workers=1)
+        self._writer_db: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    def close(self) -> None:
+        self._writer.submit(self._close_writer).result()
+        self._writer.shutdown()
+        self.db.close()
+
+    def _close_writer(self) -> None:
+        if self._writer_db is not None:
+            self._writer_db.close()
+            self._writer_db = None
+
+    def put(self, path: Text, payload: Dict[Text, Any]) -> None:
+        self._insert(self.db, path, payload)
+
+    async def put_async(self, path: Text, payload: Dict[Text, Any]) -> None:
+        """
+        Like put, but without blocking the event loop
+        """
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(self._writer, self._put_in_writer, path, payload)
+
+    def _put_in_writer(self, path: Text, payload: Dict[Text, Any]) -> None:
+        if self._writer_db is None:
+            self._writer_db = self._connect()
+        self._insert(self._writer_db, path, payload)
+
+    def _insert(
+        self, db: sqlite3.Connection, path: Text, payload: Dict[Text, Any]
+    ) -> None:
+        now = self.timer()
+        db.execute(
+            "INSERT INTO outbox (path, payload, next_attempt, created) "
+            "VALUES (?, ?, ?, ?)",
+            (path, json.dumps(payload), now, now),
+        )
+
+    def claim(self, limit: int) -> List[Message]:
+        """
+        Returns up to `limit` messages that are due to be sent, and leases them
+        """
+        now = self.timer()
+        with self.db:
+            self.db.execute("BEGIN IMMEDIATE")
+            rows = self.db.execute(
+                "SELECT id, path, payload, attempts FROM outbox "
+                "WHERE next_attempt <= ? ORDER BY next_attempt LIMIT ?",
+                (now, limit),
+            ).fetchall()
+            self.db.executemany(
+                "UPDATE outbox SET next_attempt = ? WHERE id = ?",
+                [(now + self.lease, row[0]) for row in rows],
+            )
+        return [Message(i, path, json.loads(p), a) for i, path, p, a in rows]
+
+    def delete(self, ids: List[int]) -> None:
+        with self.db:
+            self.db.execute("BEGIN IMMEDIATE")
+            self.db.executemany("DELETE FROM outbox WHERE id = ?", [(i,) for i in ids])
+
+    def retry_later(self, message: Message, error: Text, delay: float) -> None:
+        """
+        Schedules the message to be sent again after `delay` seconds, or moves it to
+        the dead letters if it has been tried `max_attempts` times
+        """
+        attempts = message.attempts + 1
+        if attempts >= self.max_attempts:
+            self.dead_letter(message, error)
+            return
+        self.db.execute(
+            "UPDATE outbox SET attempts = ?, next_attempt = ? WHERE id = ?",
+            (attempts, self.timer() + delay, message.id),
+        )
+
+    def release(self, message: Message, delay: float) -> None:
+        """
+        Schedules the message to be sent again after `delay` seconds, without counting
+        it as an attempt, eg. if it wasn't sent because the circuit breaker was open
+        """
+        self.db.execute(
+            "UPDATE outbox SET next_attempt = ? WHERE id = ?",
+            (self.timer() + delay, message.id),
+        )
+
+    def dead_letter(self, message: Message, error: Text) -> None:
+        logger.error("Giving up on outbox message %s: %s", message.id, error)
+        with self.db:
+            self.db.execute("BEGIN IMMEDIATE")
+            self.db.execute(
+                "INSERT INTO dead_letters "
+                "SELECT id, path, payload, attempts + 1, ?, created, ? "
+                "FROM outbox WHERE id = ?",
+                (error, self.timer(), message.id),
+            )
+            self.db.execute("DELETE FROM outbox WHERE id = ?", (message.id,))
+        DEAD_LETTERS.inc(outbox=self.name)
+
+    def dead_letters(self) -> List[Dict[Text, Any]]:
+        rows = self.db.execute(
+            "SELECT id, path, payload, attempts, error FROM dead_letters ORDER BY id"
+        ).fetchall()
+        return [
+            {
+                "id": i,
+                "path": path,
+                "payload": json.loads(payload),
+                "attempts": attempts,
+                "error": error,
+            }
+            for i, path, payload, attempts, error in rows
+        ]
+
+    def __len__(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def collect_metrics(self) -> None:
+        PENDING.set(len(self), outbox=self.name)
+
+
+async def post_to_eventstore(path: Text, payload: Dict[Text, Any]) -> None:
+    # The outbox does its own retries, with a much longer backoff
+    await eventstore.post(path, payload, retry=False)
+
+
+class OutboxFlusher:
+    """
+    Drains the outbox in the background, sending `batch_size` messages at a time with
+    at most `concurrency` requests in flight.
+
+    Failures that might succeed later are retried with exponential backoff, anything
+    else (eg. the event store rejecting the payload) is dead lettered immediately.
+    """
+
+    def __init__(
+        self,
+        outbox: Outbox,
+        send: Callable[[Text, Dict[Text, Any]], Awaitable[None]] = post_to_eventstore,
+        batch_size: int = 50,
+        concurrency: int = 4,
+        interval: float = 5.0,
+        backoff: float = 1.0,
+        max_backoff: float = 300.0,
+    ):
+        self.outbox = outbox
+        self.send = send
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.interval = interval
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def backoff_delay(self, attempts: int) -> float:
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2**attempts))
+
+    async def flush_batch(self) -> int:
+        """
+        Sends one batch of due messages, returning the number of messages claimed
+        """
+        messages = self.outbox.claim(self.batch_size)
+        if not messages:
+            return 0
+        semaphore = asyncio.Semaphore(self.concurrency)
+        sent: List[int] = []
+
+        async def send(message: Message) -> None:
+            async with semaphore:
+                try:
+                    await self.send(message.path, message.payload)
+                except CircuitOpenError:
+                    self.outbox.release(message, self.interval)
+                    return
+                except Exception as e:
+                    FAILURES.inc(outbox=self.outbox.name)
+                    if is_retryable(e):
+                        delay = self.backoff_delay(message.attempts)
+                        self.outbox.retry_later(message, repr(e), delay)
+                    else:
+                        self.outbox.dead_letter(message, repr(e))
+                    return
+                sent.append(message.id)
+
+        await asyncio.gather(*(send(message) for message in messages))
+        self.outbox.delete(sent)
+        SENT.inc(len(sent), outbox=self.outbox.name)
+        return len(messages)
+
+    async def flush(self) -> None:
+        """
+        Sends batches until there are no more messages due
+        """
+        while await self.flush_batch() == self.batch_size:
+            pass
+
+    def wake(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def run(self) -> None:
+        self._wakeup = asyncio.Event()
+        while True:
+            try:
+                await self.flush()
+            except (sqlite3.Error, httpx.HTTPError):
+                logger.exception("Error flushing outbox")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def start(self) -> None:
+        """
+        Starts the flusher on the current event loop, if it isn't already running
+        """
+        loop = asyncio.get_event_loop()
+        if self.task is not None and not self.task.done() and self._loop is loop:
+            return
+        self._loop = loop
+        self.task = loop.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self.task is None:
+            return
+        task, self.task = self.task, None
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+
+_flusher: Optional[OutboxFlusher] = None
+
+
+def get_flusher() -> Optional[OutboxFlusher]:
+    """
+    Returns the event store outbox flusher, or None if the outbox isn't enabled
+    """
+    global _flusher
+    if not config.EVENTSTORE_OUTBOX_PATH:
+        return None
+    if _flusher is None:
+        outbox = Outbox(
+            config.EVENTSTORE_OUTBOX_PATH, max_attempts=config.OUTBOX_MAX_ATTEMPTS
+        )
+        REGISTRY.add_collector(outbox.collect_metrics)
+        _flusher = OutboxFlusher(
+            outbox,
+            batch_size=config.OUTBOX_BATCH_SIZE,
+            concurrency=config.OUTBOX_CONCURRENCY,
+            interval=config.OUTBOX_FLUSH_INTERVAL,
+        )
+    return _flusher
+
+
+async def enqueue(path: Text, payload: Dict[Text, Any]) -> None:
+    """
+    Adds the payload to the outbox, and makes sure that the flusher is running
+    """
+    flusher = get_flusher()
+    assert flusher is not None, "The outbox isn't enabled"
+    await flusher.outbox.put_async(path, payload)
+    flusher.start()
+    flusher.wake()
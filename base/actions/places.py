@@ -0,0 +1,139 @@
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Text, Tuple, cast
+
+from . import config
+from .cache import TTLCache
+from .metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+LOOKUP_SECONDS = REGISTRY.histogram(
+    "places_lookup_seconds", "Time taken to look up a location with Google Places"
+)
+SAVED_SECONDS = REGISTRY.counter(
+    "places_cache_saved_seconds_total",
+    "Estimated time saved by looking up locations in the cache instead of Google",
+)
+
+WHITESPACE_RE = re.compile(r"\s+")
+
+Location = Dict[Text, Any]
+
+
+def normalize(text: Text) -> Text:
+    return WHITESPACE_RE.sub(" ", text).strip().lower()
+
+
+class PlacesCache:
+    """
+    Caches the Google Places result for each (province, search text), so that we don't
+    have to do the autocomplete and details requests for common locations.
+
+    The cache can be saved to, and loaded from, a file, so that it survives restarts.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 10000,
+        ttl: Optional[float] = None,
+        timer: Callable[[], float] = time.monotonic,
+    ):
+        self.cache: TTLCache[Location] = TTLCache(
+            "places", maxsize=maxsize, ttl=ttl, timer=timer
+        )
+        self.timer = timer
+        # Exponentially weighted moving average of how long a lookup takes
+        self.average_lookup_seconds = 0.0
+
+    @staticmethod
+    def key(province: Optional[Text], text: Text) -> Tuple[Optional[Text], Text]:
+        return (province, normalize(text))
+
+    def get(self, province: Optional[Text], text: Text) -> Optional[Location]:
+        location = self.cache.get(self.key(province, text))
+        if location is not None:
+            SAVED_SECONDS.inc(self.average_lookup_seconds)
+        return location
+
+    def set(self, province: Optional[Text], text: Text, location: Location) -> None:
+        self.cache.set(self.key(province, text), location)
+
+    async def lookup(
+        self,
+        province: Optional[Text],
+        text: Text,
+        func: Callable[[], Awaitable[Optional[Location]]],
+    ) -> Optional[Location]:
+        """
+        Returns the cached location for the search text, or looks it up using `func`
+        """
+        location = self.get(province, text)
+        if location is not None:
+            return location
+        start = self.timer()
+        location = await func()
+        self.observe_lookup(self.timer() - start)
+        if location is not None:
+            self.set(province, text, location)
+        return location
+
+    def observe_lookup(self, seconds: float) -> None:
+        LOOKUP_SECONDS.observe(seconds)
+        if self.average_lookup_seconds:
+            self.average_lookup_seconds += 0.1 * (seconds - self.average_lookup_seconds)
+        else:
+            self.average_lookup_seconds = seconds
+
+    def save(self, path: Text) -> None:
+        """
+        Writes the unexpired entries to `path`, one JSON object per line.
+
+        Every worker saves its cache when it stops, so each writes to its own
+        temporary file, and the last one to finish replaces the file.
+        """
+        with tempfile.NamedTemporaryFile(
+            "w", dir=os.path.dirname(os.path.abspath(path)), delete=False
+        ) as f:
+            for key, location, ttl in self.cache.items():
+                province, text = cast(Tuple[Optional[Text], Text], key)
+                entry: Dict[Text, Any] = {
+                    "province": province,
+                    "text": text,
+                    "location": location,
+                }
+                if ttl != float("inf"):
+                    entry["ttl"] = ttl
+                f.write(json.dumps(entry))
+                f.write("\n")
+        os.replace(f.name, path)
+
+    def load(self, path: Text) -> int:
+        """
+        Loads the entries saved by `save`, returning the number of entries loaded
+        """
+        count = 0
+        try:
+            with open(path) as f:
+                for line in f:
+                    entry = json.loads(line)
+                    self.cache.set(
+                        (entry["province"], entry["text"]),
+                        entry["location"],
+                        ttl=entry.get("ttl"),
+                    )
+                    count += 1
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError):
+            logger.exception("Unable to load places cache from %s", path)
+        return count
+
+
+places_cache = PlacesCache(
+    maxsize=config.PLACES_CACHE_SIZE, ttl=config.PLACES_CACHE_TTL
+)
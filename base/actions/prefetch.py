@@ -0,0 +1,84 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Hashable, Optional, Text, TypeVar
+
+from .cache import TTLCache
+from .metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+REQUESTS = REGISTRY.counter(
+    "prefetch_requests_total",
+    "Number of prefetched results asked for, by whether they were ready yet",
+    ["name", "result"],
+)
+
+T = TypeVar("T")
+
+
+class Prefetcher:
+    """
+    Starts requests in the background before their results are needed, eg. as soon
+    as we know the user's province, so that the result is ready by the time the
+    conversation gets to the action that needs it.
+
+    Requests are keyed by eg. the sender ID, and forgotten after `ttl` seconds.
+    """
+
+    def __init__(self, name: Text, maxsize: int = 10000, ttl: float = 600):
+        self.name = name
+        self._tasks: TTLCache[asyncio.Future] = TTLCache(
+            f"prefetch_{name}", maxsize=maxsize, ttl=ttl
+        )
+
+    def start(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> bool:
+        """
+        Starts `func` in the background, unless there's already a request for `key`.
+        Does nothing if there's no running event loop to run it on.
+        """
+        loop = asyncio.get_event_loop()
+        if not loop.is_running():
+            return False
+        task = self._tasks.get((loop, key))
+        if task is not None and not (
+            task.done() and (task.cancelled() or task.exception())
+        ):
+            return False
+        task = asyncio.ensure_future(func())
+        task.add_done_callback(self._done)
+        self._tasks.set((loop, key), task)
+        return True
+
+    def _done(self, task: asyncio.Future) -> None:
+        if not task.cancelled() and task.exception():
+            logger.warning(f"{self.name} prefetch failed: {task.exception()!r}")
+
+    async def get(self, key: Hashable) -> Optional[T]:
+        """
+        Returns the result of the request for `key`. If the request is still in
+        flight, waits for it rather than making the same request again, eg. assigning
+        the user to a second study arm. Returns None if there's no request, or it
+        failed, so that the caller can fall back to making the request itself.
+        """
+        call_key = (asyncio.get_event_loop(), key)
+        task = self._tasks.get(call_key)
+        if task is None:
+            REQUESTS.inc(name=self.name, result="miss")
+            return None
+        result = "hit" if task.done() else "wait"
+        try:
+            # Shielded, so that the request carries on if the caller is cancelled
+            value = await asyncio.shield(task)
+        except (Exception, asyncio.CancelledError):
+            if not task.done():
+                # The caller was cancelled, rather than the request
+                raise
+            REQUESTS.inc(name=self.name, result="error")
+            self._tasks.delete(call_key)
+            return None
+        REQUESTS.inc(name=self.name, result=result)
+        self._tasks.delete(call_key)
+        return value
+
+    def clear(self) -> None:
+        self._tasks.clear()
@@ -0,0 +1,184 @@
+"""
+Re-scores the risk level of historical triage data, eg. when the risk rules change.
+
+Takes a CSV or JSONL export of the event store's triage table on stdin, and writes it
+to stdout with a `rescored_risk` column added. The export is processed in chunks, so
+that memory use stays bounded for large exports.
+
+    python -m base.actions.rescore --format csv < triages.csv > rescored.csv
+
+Scoring is vectorized with NumPy if it's installed, and falls back to pure Python if
+it isn't.
+"""
+import argparse
+import csv
+import json
+import sys
+import time
+from itertools import islice
+from typing import (
+    IO,
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Sequence,
+    Text,
+    Tuple,
+)
+
+from . import risk
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None  # type: ignore
+
+RISK_LEVELS = ("low", "moderate", "high")
+
+# The symptom columns in the event store
+SYMPTOMS = ("fever", "cough", "sore_throat", "difficulty_breathing", "smell")
+
+# The last row of the rules is for that many symptoms or more
+MAX_SYMPTOMS = len(risk.RULES) - 1
+
+TRUE_VALUES = frozenset(["true", "t", "1", "yes"])
+
+
+def build_table() -> List[List[List[int]]]:
+    """
+    Arranges the risk rules as [symptoms][exposure][over 65] -> index into
+    RISK_LEVELS, so that they can be looked up for whole columns at once
+    """
+    return [
+        [
+            [RISK_LEVELS.index(row[2 * exposure + over_65]) for over_65 in (0, 1)]
+            for exposure in (0, 1)
+        ]
+        for row in risk.RULES
+    ]
+
+
+TABLE = build_table()
+if numpy is not None:
+    NUMPY_TABLE = numpy.array(TABLE, dtype=numpy.int8)
+    NUMPY_RISK_LEVELS = numpy.array(RISK_LEVELS)
+
+
+class Columns(NamedTuple):
+    """
+    The inputs to the risk rules, one item per row. Each can be a list, or a NumPy
+    array.
+    """
+
+    symptoms: Sequence[int]
+    exposure: Sequence[bool]
+    over_65: Sequence[bool]
+
+
+def is_true(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in TRUE_VALUES
+    return bool(value)
+
+
+def columns_from_rows(rows: Sequence[Mapping[Text, Any]]) -> Columns:
+    """
+    Extracts the columns from event store triage rows, as dicts from CSV or JSON
+    """
+    return Columns(
+        symptoms=[sum(is_true(row.get(s)) for s in SYMPTOMS) for row in rows],
+        exposure=[row.get("exposure") == "yes" for row in rows],
+        over_65=[row.get("age") == ">65" for row in rows],
+    )
+
+
+def score_python(columns: Columns) -> List[Text]:
+    return [
+        RISK_LEVELS[TABLE[min(s, MAX_SYMPTOMS)][e][o]]
+        for s, e, o in zip(columns.symptoms, columns.exposure, columns.over_65)
+    ]
+
+
+def score_numpy(columns: Columns) -> List[Text]:
+    symptoms = numpy.minimum(numpy.asarray(columns.symptoms), MAX_SYMPTOMS)
+    exposure = numpy.asarray(columns.exposure, dtype=numpy.intp)
+    over_65 = numpy.asarray(columns.over_65, dtype=numpy.intp)
+    return NUMPY_RISK_LEVELS[NUMPY_TABLE[symptoms, exposure, over_65]].tolist()
+
+
+def score(columns: Columns, use_numpy: bool = True) -> List[Text]:
+    """
+    Returns the risk level for each row, the same as get_risk_level would
+    """
+    if use_numpy and numpy is not None:
+        return score_numpy(columns)
+    return score_python(columns)
+
+
+def chunks(rows: Iterable[Dict[Text, Any]], size: int) -> Iterator[List[Dict]]:
+    iterator = iter(rows)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def rescore(
+    rows: Iterable[Dict[Text, Any]], chunk_size: int = 10000, use_numpy: bool = True
+) -> Iterator[Tuple[Dict[Text, Any], Text]]:
+    """
+    Yields each row with its new risk level, scoring `chunk_size` rows at a time
+    """
+    for chunk in chunks(rows, chunk_size):
+        yield from zip(chunk, score(columns_from_rows(chunk), use_numpy))
+
+
+def read_rows(f: IO[Text], fmt: Text) -> Iterator[Dict[Text, Any]]:
+    if fmt == "csv":
+        yield from csv.DictReader(f)
+    else:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--format", choices=["csv", "jsonl"], default="csv")
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    parser.add_argument(
+        "--no-numpy", action="store_true", help="Use pure Python, even with NumPy"
+    )
+    args = parser.parse_args(argv)
+
+    start = time.monotonic()
+    total = changed = 0
+    writer = None
+    rows = read_rows(sys.stdin, args.format)
+    for row, level in rescore(rows, args.chunk_size, not args.no_numpy):
+        total += 1
+        changed += level != row.get("risk")
+        row["rescored_risk"] = level
+        if args.format == "jsonl":
+            sys.stdout.write(json.dumps(row) + "\n")
+            continue
+        if writer is None:
+            writer = csv.DictWriter(sys.stdout, fieldnames=list(row))
+            writer.writeheader()
+        writer.writerow(row)
+
+    seconds = max(time.monotonic() - start, 1e-9)
+    print(
+        f"Rescored {total} rows with version {risk.VERSION} of the risk rules in "
+        f"{seconds:.2f}s ({total / seconds:.0f} rows/s), {changed} changed",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
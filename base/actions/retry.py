@@ -0,0 +1,206 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Deque, Optional, Text, TypeVar
+
+import httpx
+
+from . import config
+from .deadline import Deadline
+from .metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+REQUESTS = REGISTRY.counter(
+    "http_requests_total", "Number of HTTP requests, excluding retries", ["upstream"]
+)
+RETRIES = REGISTRY.counter(
+    "http_retries_total", "Number of HTTP requests that were retried", ["upstream"]
+)
+GIVE_UPS = REGISTRY.counter(
+    "http_retries_abandoned_total",
+    "Number of retryable HTTP requests that weren't retried",
+    ["upstream", "reason"],
+)
+
+# Status codes that indicate a temporary problem, that might succeed if we try again
+RETRYABLE_STATUS_CODES = frozenset([408, 425, 429, 500, 502, 503, 504])
+
+# Errors from a request that failed without a response, that are safe to retry. The
+# names of these differ between httpx versions, so only use the ones that exist.
+RETRYABLE_ERRORS = (OSError,) + tuple(
+    getattr(httpx, name)
+    for name in (
+        "TimeoutException",
+        "ProtocolError",
+        "ConnectionClosed",
+        "NetworkError",
+    )
+    if hasattr(httpx, name)
+)
+
+T = TypeVar("T")
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Whether the request that raised `error` can safely be tried again
+    """
+    if isinstance(error, RETRYABLE_ERRORS):
+        return True
+    if isinstance(error, httpx.HTTPError) and error.response is not None:
+        return error.response.status_code in RETRYABLE_STATUS_CODES
+    return False
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """
+    The number of seconds that the server asked us to wait in its Retry-After header
+    """
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return max(0.0, (date - datetime.now(timezone.utc)).total_seconds())
+
+
+class RetryBudget:
+    """
+    Limits retries to a `ratio` of the requests made in the last `window` seconds, so
+    that retries can't multiply the load on a service that is already failing.
+
+    `minimum` retries are always allowed per window, so that a low volume of requests
+    can still be retried.
+    """
+
+    def __init__(
+        self,
+        ratio: float = 0.1,
+        minimum: int = 10,
+        window: float = 10.0,
+        timer: Callable[[], float] = time.monotonic,
+    ):
+        self.ratio = ratio
+        self.minimum = minimum
+        self.window = window
+        self.timer = timer
+        self._requests: Deque[float] = deque()
+        self._retries: Deque[float] = deque()
+
+    def reset(self) -> None:
+        self._requests.clear()
+        self._retries.clear()
+
+    def _expire(self, now: float) -> None:
+        for times in (self._requests, self._retries):
+            while times and times[0] <= now - self.window:
+                times.popleft()
+
+    def record_request(self) -> None:
+        now = self.timer()
+        self._expire(now)
+        self._requests.append(now)
+
+    def try_retry(self) -> bool:
+        """
+        Withdraws a retry from the budget, returning False if there are none left
+        """
+        now = self.timer()
+        self._expire(now)
+        if len(self._retries) >= self.minimum + self.ratio * len(self._requests):
+            return False
+        self._retries.append(now)
+        return True
+
+
+class RetryPolicy:
+    """
+    Retries retryable errors up to `attempts` times in total, with exponential backoff
+    and full jitter between attempts, and honouring any Retry-After header.
+    """
+
+    def __init__(
+        self,
+        attempts: int = 3,
+        backoff: float = 0.1,
+        max_backoff: float = 2.0,
+        budget: Optional[RetryBudget] = None,
+        sleep: Callable[[float], Awaitable] = asyncio.sleep,
+    ):
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.budget = budget
+        self.sleep = sleep
+
+    def delay(self, attempt: int, error: BaseException) -> Optional[float]:
+        """
+        How long to wait before retrying after the `attempt`th attempt failed, or None
+        if the server asked us to wait longer than `max_backoff`
+        """
+        requested = retry_after(error)
+        if requested is not None:
+            return requested if requested <= self.max_backoff else None
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+
+    async def call(
+        self,
+        upstream: Text,
+        func: Callable[[], Awaitable[T]],
+        deadline: Optional[Deadline] = None,
+    ) -> T:
+        """
+        Calls `func` until it succeeds, raising the last error if it doesn't, or if
+        there isn't enough time left before the deadline to try again
+        """
+        REQUESTS.inc(upstream=upstream)
+        if self.budget is not None:
+            self.budget.record_request()
+        attempt = 0
+        while True:
+            try:
+                return await func()
+            except Exception as e:
+                attempt += 1
+                if not is_retryable(e) or attempt >= self.attempts:
+                    raise
+                if self.budget is not None and not self.budget.try_retry():
+                    GIVE_UPS.inc(upstream=upstream, reason="budget")
+                    raise
+                delay = self.delay(attempt - 1, e)
+                if delay is None:
+                    GIVE_UPS.inc(upstream=upstream, reason="retry_after")
+                    raise
+                if deadline is not None and delay >= deadline.remaining():
+                    GIVE_UPS.inc(upstream=upstream, reason="deadline")
+                    raise
+                logger.info("Retrying %s request in %.2fs: %r", upstream, delay, e)
+                RETRIES.inc(upstream=upstream)
+                await self.sleep(delay)
+
+
+budget = RetryBudget(
+    ratio=config.HTTP_RETRY_BUDGET_RATIO, minimum=config.HTTP_RETRY_BUDGET_MINIMUM
+)
+retry_policy = RetryPolicy(
+    attempts=config.HTTP_RETRIES,
+    backoff=config.HTTP_RETRY_BACKOFF,
+    max_backoff=config.HTTP_RETRY_MAX_BACKOFF,
+    budget=budget,
+)
@@ -0,0 +1,67 @@
+"""
+The risk rules, as a versioned decision table.
+
+The rules only depend on a handful of yes/no answers, so rather than evaluating them
+on each submission, the risk level for every combination of answers is compiled once,
+into a table indexed by a bitmask of the answers.
+
+Whenever the rules change, VERSION must be incremented, so that the event store
+records which version of the rules each risk level was assessed with.
+"""
+from typing import Any, Mapping, Sequence, Text, Tuple
+
+VERSION = 1
+
+SYMPTOMS = (
+    "symptoms_fever",
+    "symptoms_cough",
+    "symptoms_sore_throat",
+    "symptoms_difficulty_breathing",
+    "symptoms_taste_smell",
+)
+
+# Bit i is set if symptom i is present, followed by the exposure and age bits
+EXPOSURE_BIT = 1 << len(SYMPTOMS)
+OVER_65_BIT = EXPOSURE_BIT << 1
+
+# The risk level for each number of symptoms, with the last row for that many or more.
+# The columns are:
+#   no exposure and 65 or under, no exposure and over 65,
+#   exposure and 65 or under, exposure and over 65
+RULES: Tuple[Tuple[Text, Text, Text, Text], ...] = (
+    ("low", "low", "moderate", "moderate"),
+    ("moderate", "moderate", "high", "high"),
+    ("moderate", "high", "high", "high"),
+    ("high", "high", "high", "high"),
+)
+
+
+def compile_rules(rules: Sequence[Sequence[Text]]) -> Tuple[Text, ...]:
+    table = []
+    for key in range(OVER_65_BIT << 1):
+        symptoms = bin(key & (EXPOSURE_BIT - 1)).count("1")
+        column = 2 * bool(key & EXPOSURE_BIT) + bool(key & OVER_65_BIT)
+        table.append(rules[min(symptoms, len(rules) - 1)][column])
+    return tuple(table)
+
+
+TABLE = compile_rules(RULES)
+
+
+def pack(answers: Mapping[Text, Any]) -> int:
+    """
+    Packs the answers that the rules use, as slot -> value, into the table index
+    """
+    key = 0
+    for bit, slot in enumerate(SYMPTOMS):
+        if answers.get(slot) == "yes":
+            key |= 1 << bit
+    if answers.get("exposure") == "yes":
+        key |= EXPOSURE_BIT
+    if answers.get("age") == ">65":
+        key |= OVER_65_BIT
+    return key
+
+
+def get_risk_level(answers: Mapping[Text, Any]) -> Text:
+    return TABLE[pack(answers)]
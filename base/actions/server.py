@@ -0,0 +1,161 @@
+"""
+Runs the rasa_sdk action server, with the shared HTTP clients opened when each worker
+starts, and closed when it stops, and a /metrics endpoint.
+
+The endpoints are the same as rasa_sdk's, but use our JSON codec, since decoding the
+tracker and encoding the response is a large part of the time spent on each request.
+"""
+import logging
+import sys
+import types
+from typing import Any, List, Optional, Text, Union
+
+from rasa_sdk import utils
+from rasa_sdk.constants import DEFAULT_SERVER_PORT
+from rasa_sdk.endpoint import configure_cors, create_argument_parser, create_ssl_context
+from rasa_sdk.executor import ActionExecutor
+from rasa_sdk.interfaces import ActionExecutionRejection, ActionNotFoundException
+from sanic import Sanic, response
+from sanic.request import Request
+from sanic.response import HTTPResponse
+
+from . import codec, config, outbox
+from .clients import EVENTSTORE, GOOGLE_PLACES, clients
+from .metrics import REGISTRY
+from .places import places_cache
+
+logger = logging.getLogger(__name__)
+
+
+def json_response(body: Any, status: int = 200) -> HTTPResponse:
+    return response.raw(
+        codec.dumps(body), status=status, content_type=codec.CONTENT_TYPE
+    )
+
+
+def create_app(
+    action_package_name: Union[Text, types.ModuleType],
+    cors_origins: Union[Text, List[Text], None] = "*",
+    auto_reload: bool = False,
+) -> Sanic:
+    app = Sanic(__name__, configure_logging=False)
+    configure_cors(app, cors_origins)
+
+    executor = ActionExecutor()
+    executor.register_package(action_package_name)
+
+    @app.get("/health")
+    async def health(_: Request) -> HTTPResponse:
+        return json_response({"status": "ok"})
+
+    @app.post("/webhook")
+    async def webhook(request: Request) -> HTTPResponse:
+        try:
+            action_call = codec.loads(request.body)
+        except ValueError:
+            action_call = None
+        if not isinstance(action_call, dict):
+            return json_response({"error": "Invalid body request"}, status=400)
+
+        utils.check_version_compatibility(action_call.get("version"))
+
+        if auto_reload:
+            executor.reload()
+
+        try:
+            result = await executor.run(action_call)
+        except ActionExecutionRejection as e:
+            logger.error(e)
+            body = {"error": e.message, "action_name": e.action_name}
+            return json_response(body, status=400)
+        except ActionNotFoundException as e:
+            logger.error(e)
+            body = {"error": e.message, "action_name": e.action_name}
+            return json_response(body, status=404)
+
+        return json_response(result)
+
+    @app.get("/actions")
+    async def actions(_: Request) -> HTTPResponse:
+        if auto_reload:
+            executor.reload()
+        return json_response([{"name": k} for k in executor.actions.keys()])
+
+    @app.listener("after_server_start")
+    async def start_clients(app, loop):
+        for upstream in (EVENTSTORE, GOOGLE_PLACES):
+            await clients.prewarm(upstream, config.HTTP_PREWARM_CONNECTIONS)
+        # Start sending anything that was left in the outbox when we last stopped
+        flusher = outbox.get_flusher()
+        if flusher is not None:
+            flusher.start()
+
+    @app.listener("before_server_stop")
+    async def stop_clients(app, loop):
+        flusher = outbox.get_flusher()
+        if flusher is not None:
+            await flusher.stop()
+        await clients.close()
+        if config.PLACES_CACHE_PATH:
+            places_cache.save(config.PLACES_CACHE_PATH)
+
+    @app.get("/metrics")
+    async def metrics(_: Request) -> HTTPResponse:
+        return response.text(
+            REGISTRY.render(), content_type="text/plain; version=0.0.4"
+        )
+
+    return app
+
+
+def run(
+    action_package_name: Union[Text, types.ModuleType],
+    port: Union[Text, int] = DEFAULT_SERVER_PORT,
+    cors_origins: Union[Text, List[Text], None] = "*",
+    ssl_certificate: Optional[Text] = None,
+    ssl_keyfile: Optional[Text] = None,
+    ssl_password: Optional[Text] = None,
+    auto_reload: bool = False,
+) -> None:
+    logger.info("Starting action endpoint server...")
+    app = create_app(
+        action_package_name, cors_origins=cors_origins, auto_reload=auto_reload
+    )
+    ssl_context = create_ssl_context(ssl_certificate, ssl_keyfile, ssl_password)
+    protocol = "https" if ssl_context else "http"
+
+    logger.info(f"Action endpoint is up and running on {protocol}://localhost:{port}")
+    app.run("0.0.0.0", port, ssl=ssl_context, workers=utils.number_of_sanic_workers())
+
+
+def parse_args(argv: List[Text]) -> Any:
+    """
+    Takes the same arguments as `python -m rasa_sdk`. The rasa_sdk image's
+    entrypoint is given a `start` command first, so that's accepted too, for
+    deployments that still pass it.
+    """
+    if argv[:1] == ["start"]:
+        argv = argv[1:]
+    return create_argument_parser().parse_args(argv)
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+
+    logging.basicConfig(level=logging.DEBUG)
+    utils.configure_colored_logging(args.loglevel)
+    utils.update_sanic_log_level()
+
+    run(
+        args.actions,
+        args.port,
+        args.cors,
+        args.ssl_certificate,
+        args.ssl_keyfile,
+        args.ssl_password,
+        args.auto_reload,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, Text, Tuple, TypeVar
+
+from .metrics import REGISTRY
+
+COALESCED = REGISTRY.counter(
+    "singleflight_coalesced_total",
+    "Number of calls that waited for an identical call already in flight",
+    ["name"],
+)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Makes concurrent calls with the same key share a single call, eg. so that many
+    users sending the same text at the same time only result in one upstream request.
+
+    Callers are shielded from each other, so if one caller is cancelled (eg. by its
+    deadline), the shared call carries on for the others.
+    """
+
+    def __init__(self, name: Text):
+        self.name = name
+        self._calls: Dict[
+            Tuple[asyncio.AbstractEventLoop, Hashable], asyncio.Future
+        ] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        loop = asyncio.get_event_loop()
+        call_key = (loop, key)
+        future = self._calls.get(call_key)
+        if future is None:
+            future = self._calls[call_key] = asyncio.ensure_future(func())
+            future.add_done_callback(lambda f: self._done(call_key, f))
+        else:
+            COALESCED.inc(name=self.name)
+        return await asyncio.shield(future)
+
+    def _done(self, call_key: Tuple[asyncio.AbstractEventLoop, Hashable], future):
+        if self._calls.get(call_key) is future:
+            del self._calls[call_key]
+        if not future.cancelled():
+            # Retrieve the exception, in case all the callers were cancelled
+            future.exception()
@@ -0,0 +1,202 @@
+"""
+Declarative slot schemas for the forms.
+
+Each form lists its slots as `SlotSchema`s, giving the choices that the slot accepts,
+and which entities and intents fill it. These are compiled once, when the form class
+is created, into the form's slot mappings, and a `validate_<slot>` method for each slot
+that has choices, so that no work is repeated on each turn.
+"""
+from types import MappingProxyType
+from typing import (
+    AbstractSet,
+    Any,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Text,
+    Tuple,
+    Union,
+)
+
+from rasa_sdk import Tracker
+from rasa_sdk.executor import CollectingDispatcher
+
+from .lookups import LookupTable, lookup_tables
+
+Result = Dict[Text, Any]
+PostHook = Callable[[Result, CollectingDispatcher, Tracker], Result]
+
+
+class Choices(NamedTuple):
+    """
+    The choices for a slot, as number -> value, and the set of values that may be
+    typed out instead of the number
+    """
+
+    values: Mapping[int, Text]
+    labels: AbstractSet[Text]
+
+    @classmethod
+    def from_mapping(cls, data: Mapping[int, Text]) -> "Choices":
+        return cls(MappingProxyType(dict(data)), frozenset(data.values()))
+
+    def get(self) -> "Choices":
+        return self
+
+
+class LookupChoices:
+    """
+    The choices from a lookup table. Lookup tables are reloaded when they change on
+    disk, so these are looked up on each use, and only recompiled when the table
+    changes.
+    """
+
+    def __init__(self, bot: Text, table: Text):
+        self.bot = bot
+        self.table = table
+        self._compiled: Optional[Tuple[LookupTable, Choices]] = None
+
+    def get(self) -> Choices:
+        table = lookup_tables.get(self.bot, self.table)
+        compiled = self._compiled
+        if compiled is None or compiled[0] is not table:
+            compiled = self._compiled = (
+                table,
+                Choices(table.labels, table.indexes.keys()),
+            )
+        return compiled[1]
+
+
+YES_NO = Choices.from_mapping({1: "yes", 2: "no"})
+YES_NO_MAYBE = Choices.from_mapping({1: "yes", 2: "no", 3: "not sure"})
+
+YES_NO_INTENTS = MappingProxyType({"affirm": "yes", "deny": "no"})
+YES_NO_MAYBE_INTENTS = MappingProxyType(
+    {"affirm": "yes", "deny": "no", "maybe": "not sure"}
+)
+
+
+class Entity(NamedTuple):
+    name: Text
+    intent: Optional[Text] = None
+
+
+class SlotSchema(NamedTuple):
+    """
+    A slot in a form.
+
+    The slot is filled from the first of `entities`, `intents` (intent -> value), or
+    the text of the message, that matches. If it has `choices`, the value is
+    validated against them, and then passed through `post`, if given.
+    """
+
+    name: Text
+    choices: Union[Choices, LookupChoices, None] = None
+    entities: Tuple[Entity, ...] = (Entity("number"),)
+    intents: Mapping[Text, Text] = MappingProxyType({})
+    text: bool = True
+    post: Optional[PostHook] = None
+
+
+def yes_no(name: Text, post: Optional[PostHook] = None) -> SlotSchema:
+    return SlotSchema(name, YES_NO, intents=YES_NO_INTENTS, post=post)
+
+
+def yes_no_maybe(name: Text, post: Optional[PostHook] = None) -> SlotSchema:
+    return SlotSchema(name, YES_NO_MAYBE, intents=YES_NO_MAYBE_INTENTS, post=post)
+
+
+def schema(*slots: SlotSchema) -> Dict[Text, SlotSchema]:
+    return {slot.name: slot for slot in slots}
+
+
+def from_entity(entity: Text, intent: Optional[Text] = None) -> Dict[Text, Any]:
+    """
+    The same as FormAction.from_entity, so that the mappings can be built without an
+    instance of the form
+    """
+    return {
+        "type": "from_entity",
+        "entity": entity,
+        "intent": [intent] if intent else [],
+        "not_intent": [],
+        "role": None,
+        "group": None,
+    }
+
+
+def from_intent(intent: Text, value: Any) -> Dict[Text, Any]:
+    return {"type": "from_intent", "value": value, "intent": [intent], "not_intent": []}
+
+
+def from_text() -> Dict[Text, Any]:
+    return {"type": "from_text", "intent": [], "not_intent": []}
+
+
+def compile_mappings(slot: SlotSchema) -> List[Dict[Text, Any]]:
+    mappings = [from_entity(e.name, e.intent) for e in slot.entities]
+    mappings.extend(from_intent(i, v) for i, v in slot.intents.items())
+    if slot.text:
+        mappings.append(from_text())
+    return mappings
+
+
+def as_int(value: Any) -> Optional[int]:
+    if not isinstance(value, str):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+def validate_choice(
+    field: Text,
+    dispatcher: CollectingDispatcher,
+    value: Any,
+    choices: Choices,
+    accept_labels: bool = True,
+) -> Result:
+    """
+    Validates that the value is either:
+    - One of the values, in which case the value is returned as given
+    - An integer that is one of the numbers, in which case its value is returned
+    """
+    if accept_labels and value and isinstance(value, str):
+        if value.lower() in choices.labels:
+            return {field: value}
+    index = as_int(value)
+    if index is not None and index in choices.values:
+        return {field: choices.values[index]}
+    dispatcher.utter_message(template="utter_incorrect_selection")
+    return {field: None}
+
+
+def validate_slot(
+    slot: SlotSchema, value: Any, dispatcher: CollectingDispatcher, tracker: Tracker
+) -> Result:
+    assert slot.choices is not None
+    result = validate_choice(slot.name, dispatcher, value, slot.choices.get())
+    if slot.post is not None:
+        result = slot.post(result, dispatcher, tracker)
+    return result
+
+
+def make_validator(slot: SlotSchema) -> Callable:
+    def validate(
+        self,
+        value: Text,
+        dispatcher: CollectingDispatcher,
+        tracker: Tracker,
+        domain: Dict[Text, Any],
+    ) -> Result:
+        return validate_slot(slot, value, dispatcher, tracker)
+
+    validate.__name__ = validate.__qualname__ = f"validate_{slot.name}"
+    validate.__doc__ = f"Validates {slot.name} against its choices"
+    # So that forms can tell generated validators apart from hand written ones
+    validate.generated = True  # type: ignore
+    return validate
@@ -1,5 +1,28 @@
+import re
 from typing import Any, Dict, Text
 
+LOCATION_REGEX = re.compile(
+    r"""
+    ^
+    (?P<latitude>[\+|-]\d+\.?\d*)
+    (?P<longitude>[\+|-]\d+\.?\d*)
+    """,
+    flags=re.VERBOSE,
+)
+
+# Locations that format_location would return unchanged. The fractional parts can't
+# have trailing zeros, or more digits than a float keeps, and values between -1 and 0,
+# or very close to 0, aren't formatted as given.
+CANONICAL_LOCATION_REGEX = re.compile(
+    r"""
+    ^
+    (?!\+00\.0000)(?:\+\d{2}|-(?!00)\d{2})(?:\.\d{0,11}[1-9])?
+    (?!\+000\.0000)(?:\+\d{3}|-(?!000)\d{3})(?:\.\d{0,11}[1-9])?
+    /$
+    """,
+    flags=re.VERBOSE,
+)
+
 
 def get_risk_level(data: Dict[Any, Any]) -> Text:
     symptoms = 0
@@ -24,3 +47,45 @@ def get_risk_level(data: Dict[Any, Any]) -> Text:
             return "moderate"
         else:
             return "low"
+
+
+def format_location(latitude: float, longitude: float) -> Text:
+    """
+    Returns the location in ISO6709 format
+    """
+
+    def fractional_part(f):
+        if not f % 1:
+            return ""
+        parts = str(f).split(".")
+        return f".{parts[1]}"
+
+    # latitude integer part must be fixed width 2, longitude 3
+    return (
+        f"{int(latitude):+03d}"
+        f"{fractional_part(latitude)}"
+        f"{int(longitude):+04d}"
+        f"{fractional_part(longitude)}"
+        "/"
+    )
+
+
+def fix_location_format(text: Text) -> Text:
+    """
+    Previously there was a bug that caused the location to not be stored in
+    proper ISO6709 format. This function extracts the latitude and longitude from
+    either the incorrect or correct format, and then returns a properly formatted
+    ISO6709 string.
+
+    Locations that are already in the correct format are returned as is, which is
+    all of them once the tracker store has been migrated with
+    `python -m base.actions.migrate_locations`
+    """
+    if not text:
+        return ""
+    if CANONICAL_LOCATION_REGEX.match(text):
+        return text
+    match = LOCATION_REGEX.match(text)
+    if not match:
+        raise ValueError(f"Invalid location {text}")
+    return format_location(float(match["latitude"]), float(match["longitude"]))
@@ -0,0 +1,245 @@
+"""
+NLU pipeline components that skip the model for replies that don't need it.
+
+FastPathClassifier parses bare menu numbers and lookup table labels (see
+`base.nlu.fastpath`), and marks the message as parsed. The Gated components are the
+standard Rasa ones, that do nothing for marked messages, so that the featurizers and
+classifiers only run for the messages that need them:
+
+    pipeline:
+      - name: WhitespaceTokenizer
+      - name: base.nlu.components.FastPathClassifier
+      - name: base.nlu.components.ParseCacheLookup
+      - name: base.nlu.components.GatedRegexFeaturizer
+      ...
+      - name: base.nlu.components.GatedDIETClassifier
+      ...
+      - name: base.nlu.components.ParseCacheStore
+
+ParseCacheLookup and ParseCacheStore cache the full parse results of the other
+messages (see `base.nlu.parsecache`), and messages with a cached parse are marked as
+parsed in the same way.
+
+At training time, any numbers or labels that the training data gives a different
+intent are blocked from the fast path, so that it never disagrees with the model.
+
+A model trained with them can only be loaded by a Rasa server that has this package
+on its Python path, so models trained with config.yml are served by the image built
+from nlu.Dockerfile.
+"""
+import json
+import logging
+import os
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Optional, Text
+
+from rasa.nlu.classifiers.diet_classifier import DIETClassifier
+from rasa.nlu.components import Component
+from rasa.nlu.extractors.extractor import EntityExtractor
+from rasa.nlu.featurizers.sparse_featurizer.count_vectors_featurizer import (
+    CountVectorsFeaturizer,
+)
+from rasa.nlu.featurizers.sparse_featurizer.lexical_syntactic_featurizer import (
+    LexicalSyntacticFeaturizer,
+)
+from rasa.nlu.featurizers.sparse_featurizer.regex_featurizer import RegexFeaturizer
+from rasa.nlu.selectors.response_selector import ResponseSelector
+
+from .fastpath import ROOT, FastPath, read_labels
+from .parsecache import CACHED_ATTRIBUTES, ParseCache, model_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Set on messages that have been parsed by the fast path, or from the parse cache
+FAST_PATH = "fast_path"
+
+# The pipeline context key for ParseCacheLookup's cache
+PARSE_CACHE = "parse_cache"
+
+# How often to log the fraction of messages that took the fast path
+LOG_INTERVAL = 1000
+
+
+class FastPathClassifier(EntityExtractor):
+    defaults = {
+        # The intent for numbers and labels
+        "intent": "inform",
+        # The entity for numbers
+        "entity": "number",
+        # Globs, relative to the root of the repo, of the lookup tables for labels
+        "lookup_tables": ["*/data/lookup_tables/*.txt"],
+    }
+
+    def __init__(
+        self,
+        component_config: Optional[Dict[Text, Any]] = None,
+        blocked: Optional[list] = None,
+    ):
+        super().__init__(component_config)
+        labels = read_labels(
+            path
+            for pattern in self.component_config["lookup_tables"]
+            for path in sorted(ROOT.glob(pattern))
+        )
+        self.fast_path = FastPath(
+            intent=self.component_config["intent"],
+            entity=self.component_config["entity"],
+            labels=labels,
+            blocked=blocked or (),
+        )
+        self.processed = 0
+        self.short_circuited = 0
+
+    def train(self, training_data, config=None, **kwargs: Any) -> None:
+        conflicts = self.fast_path.find_conflicts(
+            (example.text, example.get("intent"))
+            for example in training_data.training_examples
+        )
+        if conflicts:
+            logger.info(f"Blocking {len(conflicts)} conflicting texts from fast path")
+        self.fast_path.blocked = frozenset(conflicts)
+
+    def process(self, message, **kwargs: Any) -> None:
+        self.processed += 1
+        parse = self.fast_path.match(message.text)
+        if parse is not None:
+            self.short_circuited += 1
+            intent = {"name": parse.intent, "confidence": 1.0}
+            entities = self.add_extractor_name([dict(e) for e in parse.entities])
+            message.set("intent", intent, add_to_output=True)
+            message.set("intent_ranking", [intent], add_to_output=True)
+            message.set(
+                "entities", message.get("entities", []) + entities, add_to_output=True
+            )
+            message.set(FAST_PATH, True)
+        if self.processed % LOG_INTERVAL == 0:
+            logger.info(
+                f"Fast path parsed {self.short_circuited / self.processed:.1%} of "
+                f"{self.processed} messages"
+            )
+
+    def persist(self, file_name: Text, model_dir: Text) -> Optional[Dict[Text, Any]]:
+        file_name = f"{file_name}.json"
+        with open(os.path.join(model_dir, file_name), "w") as f:
+            json.dump({"blocked": sorted(self.fast_path.blocked)}, f)
+        return {"file": file_name}
+
+    @classmethod
+    def load(
+        cls,
+        meta: Dict[Text, Any],
+        model_dir: Optional[Text] = None,
+        model_metadata=None,
+        cached_component: Optional["FastPathClassifier"] = None,
+        **kwargs: Any,
+    ) -> "FastPathClassifier":
+        if cached_component:
+            return cached_component
+        blocked = []
+        if model_dir and meta.get("file"):
+            path = Path(model_dir) / meta["file"]
+            if path.exists():
+                blocked = json.loads(path.read_text())["blocked"]
+        return cls(meta, blocked)
+
+
+class ParseCacheLookup(Component):
+    """
+    Sets the cached parse result on messages that have one, and marks them as parsed.
+    The cache belongs to this pipeline, and is passed to ParseCacheStore through the
+    pipeline context.
+    """
+
+    defaults = {"maxsize": 10000}
+
+    def __init__(
+        self,
+        component_config: Optional[Dict[Text, Any]] = None,
+        fingerprint: Optional[Text] = None,
+    ):
+        super().__init__(component_config)
+        self.parse_cache = ParseCache(maxsize=self.component_config["maxsize"])
+        # A model that's just been trained doesn't have a fingerprint yet
+        self.parse_cache.use_model(fingerprint or uuid.uuid4().hex)
+
+    def provide_context(self) -> Dict[Text, Any]:
+        return {PARSE_CACHE: self.parse_cache}
+
+    def process(self, message, **kwargs: Any) -> None:
+        if message.get(FAST_PATH):
+            return
+        parse = self.parse_cache.get(message.text)
+        if parse is not None:
+            for attribute, value in parse.items():
+                message.set(attribute, value, add_to_output=True)
+            message.set(FAST_PATH, True)
+        cache = self.parse_cache.cache
+        if (cache.hits + cache.misses) % LOG_INTERVAL == 0:
+            logger.info(
+                f"Parse cache hit rate {cache.hit_rate:.1%}, "
+                f"{len(cache)}/{cache.maxsize} entries"
+            )
+
+    @classmethod
+    def load(
+        cls,
+        meta: Dict[Text, Any],
+        model_dir: Optional[Text] = None,
+        model_metadata=None,
+        cached_component: Optional["ParseCacheLookup"] = None,
+        **kwargs: Any,
+    ) -> "ParseCacheLookup":
+        trained_at = model_metadata.get("trained_at") if model_metadata else None
+        return cls(meta, model_fingerprint(model_dir, trained_at))
+
+
+class ParseCacheStore(Component):
+    """
+    Caches the parse results of messages that weren't already parsed, in the cache
+    of the pipeline's ParseCacheLookup. This must be the last component in the
+    pipeline.
+    """
+
+    def process(self, message, **kwargs: Any) -> None:
+        parse_cache = kwargs.get(PARSE_CACHE)
+        if parse_cache is None or message.get(FAST_PATH):
+            return
+        parse = {
+            attribute: message.get(attribute)
+            for attribute in CACHED_ATTRIBUTES
+            if message.get(attribute) is not None
+        }
+        parse_cache.set(message.text, parse)
+
+
+class GatedComponent:
+    """
+    Skips processing messages that have been parsed by the fast path, or from the
+    parse cache
+    """
+
+    def process(self, message, **kwargs: Any) -> None:
+        if message.get(FAST_PATH):
+            return
+        super().process(message, **kwargs)  # type: ignore
+
+
+class GatedRegexFeaturizer(GatedComponent, RegexFeaturizer):
+    pass
+
+
+class GatedLexicalSyntacticFeaturizer(GatedComponent, LexicalSyntacticFeaturizer):
+    pass
+
+
+class GatedCountVectorsFeaturizer(GatedComponent, CountVectorsFeaturizer):
+    pass
+
+
+class GatedDIETClassifier(GatedComponent, DIETClassifier):
+    pass
+
+
+class GatedResponseSelector(GatedComponent, ResponseSelector):
+    pass
@@ -0,0 +1,112 @@
+"""
+Recognises the replies that don't need the NLU model.
+
+Most replies to the forms are a bare menu number, eg. "2", or one of the labels from
+a lookup table, eg. "male". The slot mappings only need the number entity, or the
+text, for these, so they can be parsed without running the featurizers and the
+classifier. This module has no Rasa imports, so that it can be used and tested
+without Rasa installed; see `base.nlu.components` for the pipeline component.
+"""
+import re
+from pathlib import Path
+from typing import (
+    Any,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Text,
+    Tuple,
+)
+
+# A number, optionally followed by a full stop, eg. "2."
+NUMBER_REGEX = re.compile(r"(\d{1,3})\.?")
+
+ROOT = Path(__file__).resolve().parents[2]
+LOOKUP_TABLES_GLOB = "*/data/lookup_tables/*.txt"
+
+
+class Parse(NamedTuple):
+    intent: Text
+    entities: List[Dict[Text, Any]]
+
+
+def normalise(text: Text) -> Text:
+    return " ".join(text.lower().split())
+
+
+def read_labels(paths: Iterable[Path]) -> FrozenSet[Text]:
+    labels: Set[Text] = set()
+    for path in paths:
+        with path.open() as f:
+            labels.update(normalise(line) for line in f if line.strip())
+    return frozenset(labels)
+
+
+def lookup_table_labels(
+    root: Path = ROOT, pattern: Text = LOOKUP_TABLES_GLOB
+) -> FrozenSet[Text]:
+    return read_labels(sorted(root.glob(pattern)))
+
+
+class FastPath:
+    """
+    Parses numbers and labels into `intent`, with numbers as an `entity`.
+
+    `blocked` are texts that shouldn't be parsed, because the training data gives
+    them a different intent.
+    """
+
+    def __init__(
+        self,
+        intent: Text = "inform",
+        entity: Text = "number",
+        labels: Iterable[Text] = (),
+        blocked: Iterable[Text] = (),
+    ):
+        self.intent = intent
+        self.entity = entity
+        self.labels = frozenset(normalise(label) for label in labels)
+        self.blocked = frozenset(normalise(text) for text in blocked)
+
+    def is_candidate(self, text: Text) -> bool:
+        """
+        Whether the text is a number or a label, whether or not it's blocked
+        """
+        text = normalise(text)
+        return bool(NUMBER_REGEX.fullmatch(text)) or text in self.labels
+
+    def find_conflicts(
+        self, examples: Iterable[Tuple[Text, Optional[Text]]]
+    ) -> Set[Text]:
+        """
+        Returns the candidate texts in the (text, intent) training examples, that are
+        given a different intent
+        """
+        return {
+            normalise(text)
+            for text, intent in examples
+            if intent != self.intent and self.is_candidate(text)
+        }
+
+    def match(self, text: Text) -> Optional[Parse]:
+        stripped = text.strip()
+        normalised = normalise(stripped)
+        if normalised in self.blocked:
+            return None
+        number = NUMBER_REGEX.fullmatch(stripped)
+        if number:
+            start = text.index(stripped)
+            entity = {
+                "entity": self.entity,
+                "value": number.group(1),
+                "start": start,
+                "end": start + number.end(1),
+            }
+            return Parse(self.intent, [entity])
+        if normalised in self.labels:
+            return Parse(self.intent, [])
+        return None
@@ -0,0 +1,71 @@
+"""
+A cache of full parse results, for the texts that users send most often.
+
+A small set of texts, eg. "hi", "yes" and "ok thanks", make up much of the traffic
+that isn't a menu number, so their parse results are kept in a least recently used
+cache, keyed by the model's fingerprint and the normalised text. The cache is cleared
+when a different model is loaded. Like `base.nlu.fastpath`, this has no Rasa imports;
+see `base.nlu.components` for the pipeline components.
+"""
+import copy
+import hashlib
+from pathlib import Path
+from typing import Any, Dict, Optional, Text, Tuple
+
+from base.actions.cache import TTLCache
+
+from .fastpath import normalise
+
+# The message attributes that the pipeline outputs
+CACHED_ATTRIBUTES = ("intent", "intent_ranking", "entities", "response_selector")
+
+Parse = Dict[Text, Any]
+
+
+def model_fingerprint(model_dir: Optional[Text], trained_at: Optional[Text]) -> Text:
+    """
+    Returns the fingerprint of the model in `model_dir`. Rasa writes a fingerprint of
+    the training data and config next to the NLU model, otherwise we fall back to
+    when the model was trained.
+    """
+    if model_dir:
+        path = Path(model_dir).parent / "fingerprint.json"
+        if path.exists():
+            return hashlib.sha1(path.read_bytes()).hexdigest()
+    return f"{model_dir}:{trained_at}"
+
+
+class ParseCache:
+    def __init__(self, maxsize: int = 10000):
+        self.fingerprint: Optional[Text] = None
+        # (fingerprint, normalised text) -> (text, parse)
+        self.cache: TTLCache[Tuple[Text, Parse]] = TTLCache(
+            "nlu_parse", maxsize=maxsize
+        )
+
+    def use_model(self, fingerprint: Text) -> None:
+        """
+        Clears the cache if the model has changed
+        """
+        if fingerprint != self.fingerprint:
+            self.cache.clear()
+            self.fingerprint = fingerprint
+
+    def get(self, text: Text) -> Optional[Parse]:
+        """
+        Returns a copy of the cached parse for the text, if there is one.
+
+        Entities refer to their position in the text, so parses with entities are
+        only returned for exactly the same text.
+        """
+        item = self.cache.get((self.fingerprint, normalise(text)))
+        if item is None:
+            return None
+        cached_text, parse = item
+        if parse.get("entities") and cached_text != text:
+            return None
+        return copy.deepcopy(parse)
+
+    def set(self, text: Text, parse: Parse) -> None:
+        key = (self.fingerprint, normalise(text))
+        self.cache.set(key, (text, copy.deepcopy(parse)))
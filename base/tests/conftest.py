@@ -0,0 +1,18 @@
+import pytest
+
+from base.actions.breaker import breakers
+from base.actions.places import places_cache
+from base.actions.retry import budget
+
+
+@pytest.fixture(autouse=True)
+def reset_shared_state():
+    """
+    Circuit breakers, the retry budget, and the places cache are shared by the whole
+    process, so reset them between tests to stop one test from affecting the next
+    """
+    yield
+    for breaker in breakers.values():
+        breaker.reset()
+    budget.reset()
+    places_cache.cache.clear()
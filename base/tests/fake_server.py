@@ -0,0 +1,147 @@
+import asyncio
+import json
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set, Text, Union
+
+
+class Request(NamedTuple):
+    method: Text
+    path: Text
+    headers: Dict[Text, Text]
+    body: bytes
+
+
+class Response(NamedTuple):
+    status: int = 200
+    body: Any = None
+    headers: Dict[Text, Text] = {}
+    delay: float = 0
+    # Close the connection without sending a response
+    drop: bool = False
+
+
+Handler = Callable[[Request], Union[Response, None]]
+
+
+class FakeServer:
+    """
+    A minimal HTTP/1.1 server on localhost, that stands in for an upstream service
+    so that we can inject failures, delays, and dropped connections.
+
+    Responses are taken from `responses` in order, then `handler` is called, falling
+    back to an empty 200 response.
+    """
+
+    def __init__(self, handler: Optional[Handler] = None):
+        self.handler = handler
+        self.responses: List[Response] = []
+        self.requests: List[Request] = []
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.connections: Set[asyncio.Task] = set()
+
+    @property
+    def url(self) -> Text:
+        assert self.server is not None and self.server.sockets
+        host, port = self.server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    async def __aenter__(self) -> "FakeServer":
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        assert self.server is not None
+        self.server.close()
+        await self.server.wait_closed()
+        # Keep-alive connections from pooled clients would otherwise stay open
+        for task in self.connections:
+            task.cancel()
+        await asyncio.gather(*self.connections, return_exceptions=True)
+
+    def respond(self, *responses: Response) -> None:
+        self.responses.extend(responses)
+
+    def get_response(self, request: Request) -> Response:
+        if self.responses:
+            return self.responses.pop(0)
+        if self.handler is not None:
+            response = self.handler(request)
+            if response is not None:
+                return response
+        return Response()
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        task = asyncio.current_task()
+        assert task is not None
+        self.connections.add(task)
+        try:
+            while True:
+                request = await self.read_request(reader)
+                if request is None:
+                    break
+                self.requests.append(request)
+                response = self.get_response(request)
+                if response.delay:
+                    await asyncio.sleep(response.delay)
+                if response.drop:
+                    break
+                writer.write(self.encode_response(response))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            self.connections.discard(task)
+
+    async def read_request(self, reader: asyncio.StreamReader) -> Optional[Request]:
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        method, path, _ = request_line.decode("latin-1").split(" ", 2)
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1").rstrip("\r\n")
+            if not line:
+                break
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+        body = await reader.readexactly(int(headers.get("content-length", 0)))
+        return Request(method, path, headers, body)
+
+    def encode_response(self, response: Response) -> bytes:
+        body = b""
+        headers = dict(response.headers)
+        if response.body is not None:
+            body = json.dumps(response.body).encode("utf-8")
+            headers.setdefault("Content-Type", "application/json")
+        headers["Content-Length"] = str(len(body))
+        lines = [f"HTTP/1.1 {response.status} Fake"]
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+
+class FakeEventStore:
+    """
+    A handler for FakeServer that stands in for the event store endpoints
+    """
+
+    def __init__(self, latency: float = 0, study_a_arm: Text = "T1"):
+        self.latency = latency
+        self.study_a_arm = study_a_arm
+        self.submissions: List[Dict[Text, Any]] = []
+
+    def __call__(self, request: Request) -> Response:
+        if request.headers.get("authorization") != "Token token":
+            return Response(401, {"detail": "Invalid token."})
+        data = json.loads(request.body or b"{}")
+        self.submissions.append(data)
+        if request.path == "/api/v5/covid19triage/":
+            body = dict(data, profile={"hcs_study_a_arm": self.study_a_arm})
+            return Response(201, body, delay=self.latency)
+        if request.path == "/api/v2/hcsstudybrandomarm/":
+            return Response(200, dict(data, study_b_arm="T2"), delay=self.latency)
+        if request.path == "/api/v2/covid19triagestart/":
+            body = dict(data, timestamp="2021-01-01T00:00:00Z")
+            return Response(201, body, delay=self.latency)
+        return Response(404, {"detail": "Not found."})
@@ -0,0 +1,232 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from rasa_sdk import Tracker
+from rasa_sdk.events import SlotSet
+from rasa_sdk.executor import CollectingDispatcher
+
+from base.actions import config
+from base.actions.actions import HealthCheckForm, HealthCheckProfileForm
+from base.actions.breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    breakers,
+)
+from base.actions.clients import EVENTSTORE, GOOGLE_PLACES
+from base.actions.metrics import REGISTRY
+from base.tests import utils
+from base.tests.fake_server import FakeServer, Response
+from base.tests.test_retry import FakeTimer, failing, http_error
+
+
+class TestCircuitBreaker:
+    @pytest.mark.asyncio
+    async def test_opens_after_failures(self):
+        breaker = CircuitBreaker("breaker_test", failure_threshold=2, timer=FakeTimer())
+        for _ in range(2):
+            try:
+                await breaker.call(failing(httpx.ReadTimeout("")))
+            except httpx.HTTPError:
+                pass
+        assert breaker.state == OPEN
+        assert REGISTRY.get("circuit_breaker_state").get(upstream="breaker_test") == 1
+        assert REGISTRY.get("circuit_breaker_trips_total").get(upstream="breaker_test")
+
+        func = failing()
+        error = None
+        try:
+            await breaker.call(func)
+        except CircuitOpenError as e:
+            error = e
+        assert error
+        assert func.calls == []
+
+    @pytest.mark.asyncio
+    async def test_success_resets_failures(self):
+        """
+        Only consecutive failures should open the breaker
+        """
+        breaker = CircuitBreaker("test", failure_threshold=2, timer=FakeTimer())
+        for func in [failing(http_error(503)), failing(), failing(http_error(503))]:
+            try:
+                await breaker.call(func)
+            except httpx.HTTPError:
+                pass
+        assert breaker.state == CLOSED
+
+    @pytest.mark.asyncio
+    async def test_ignores_client_errors(self):
+        """
+        Errors that don't mean the upstream is unhealthy shouldn't open the breaker
+        """
+        breaker = CircuitBreaker("test", failure_threshold=1, timer=FakeTimer())
+        try:
+            await breaker.call(failing(http_error(400)))
+        except httpx.HTTPError:
+            pass
+        assert breaker.state == CLOSED
+
+    @pytest.mark.asyncio
+    async def test_half_open(self):
+        """
+        After the reset timeout, a single trial request should be allowed, which
+        closes the breaker if it succeeds, and opens it again if it fails
+        """
+        timer = FakeTimer()
+        breaker = CircuitBreaker(
+            "test", failure_threshold=1, reset_timeout=30, timer=timer
+        )
+        breaker.record_failure()
+        assert not breaker.allow_request()
+
+        timer.time = 30
+        assert breaker.allow_request()
+        assert breaker.state == HALF_OPEN
+        assert not breaker.allow_request()
+        breaker.record_failure()
+        assert breaker.state == OPEN
+
+        timer.time = 60
+        assert await breaker.call(failing()) == "ok"
+        assert breaker.state == CLOSED
+
+    @pytest.mark.asyncio
+    async def test_half_open_cancelled(self):
+        """
+        If the trial request is cancelled, the breaker should stay half open, and
+        allow another trial
+        """
+        timer = FakeTimer()
+        breaker = CircuitBreaker(
+            "test", failure_threshold=1, reset_timeout=30, timer=timer
+        )
+        breaker.record_failure()
+        timer.time = 30
+
+        task = asyncio.ensure_future(breaker.call(lambda: asyncio.sleep(10)))
+        await asyncio.sleep(0)
+        assert breaker.state == HALF_OPEN
+        task.cancel()
+        error = None
+        try:
+            await task
+        except asyncio.CancelledError as e:
+            error = e
+        assert error
+        assert breaker.state == HALF_OPEN
+        assert breaker.allow_request()
+
+
+class TestUpstreamFailures:
+    """
+    Tests the breakers against a local server that fails like the upstream would
+    """
+
+    @pytest.mark.asyncio
+    async def test_google_places_degrades_to_free_text(self):
+        timer = FakeTimer()
+        breaker = breakers[GOOGLE_PLACES]
+        breaker.failure_threshold, breaker.timer = 3, timer
+        config.GOOGLE_PLACES_API_KEY = "test_key"
+        form = HealthCheckProfileForm()
+        tracker = Tracker(
+            "default",
+            {"requested_slot": "location", "province": "wc"},
+            {"text": "Cape Town"},
+            [{"event": "user", "metadata": {}}],
+            False,
+            None,
+            {},
+            "action_listen",
+        )
+
+        async with FakeServer() as server:
+            config.GOOGLE_PLACES_URL = server.url
+            server.respond(Response(503), Response(drop=True), Response(500))
+            dispatcher = CollectingDispatcher()
+            events = await form.validate(dispatcher, tracker, {})
+            assert events == [SlotSet("location", None)]
+            assert len(server.requests) == 3
+            assert breaker.state == OPEN
+
+            # While open, accept the location as typed, without calling the server
+            events = await form.validate(CollectingDispatcher(), tracker, {})
+            assert events == [SlotSet("location", "Cape Town")]
+            assert len(server.requests) == 3
+
+            # After the reset timeout, a successful lookup closes the breaker
+            timer.time = breaker.reset_timeout
+            server.respond(
+                Response(body={"predictions": [{"place_id": "placeid"}]}),
+                Response(
+                    body={
+                        "result": {
+                            "formatted_address": "Cape Town, South Africa",
+                            "geometry": {"location": {"lat": 1.23, "lng": 4.56}},
+                        }
+                    }
+                ),
+            )
+            events = await form.validate(CollectingDispatcher(), tracker, {})
+            assert SlotSet("location", "Cape Town, South Africa") in events
+            assert breaker.state == CLOSED
+
+        config.GOOGLE_PLACES_URL = "https://maps.googleapis.com/"
+        config.GOOGLE_PLACES_API_KEY = None
+        breaker.failure_threshold = config.CIRCUIT_BREAKER_FAILURES
+        breaker.timer = time.monotonic
+
+    @pytest.mark.asyncio
+    async def test_eventstore_fails_fast(self):
+        breaker = breakers[EVENTSTORE]
+        breaker.failure_threshold = 3
+        form = HealthCheckForm()
+        tracker = utils.get_tracker_for_slot_from_intent(
+            form,
+            "tracing",
+            "affirm",
+            {
+                "province": "wc",
+                "age": "18-39",
+                "symptoms_fever": "no",
+                "symptoms_cough": "no",
+                "symptoms_sore_throat": "yes",
+                "symptoms_difficulty_breathing": "no",
+                "symptoms_taste_smell": "no",
+                "exposure": "not sure",
+                "tracing": "yes",
+                "gender": "RATHER NOT SAY",
+                "medical_condition": "not sure",
+                "city_location_coords": "+1.2-3.4",
+                "location_coords": "+3.4-1.2",
+                "location": "Cape Town, South Africa",
+            },
+        )
+
+        async with FakeServer(lambda request: Response(503)) as server:
+            config.EVENTSTORE_URL = server.url
+            config.EVENTSTORE_TOKEN = "token"
+            error = None
+            try:
+                await form.submit(CollectingDispatcher(), tracker, {})
+            except httpx.HTTPError as e:
+                error = e
+            assert error
+            assert len(server.requests) == 3
+
+            error = None
+            try:
+                await form.submit(CollectingDispatcher(), tracker, {})
+            except CircuitOpenError as e:
+                error = e
+            assert error
+            assert len(server.requests) == 3
+
+        config.EVENTSTORE_URL = None
+        config.EVENTSTORE_TOKEN = None
+        breaker.failure_threshold = config.CIRCUIT_BREAKER_FAILURES
@@ -0,0 +1,50 @@
+from base.actions.cache import TTLCache
+
+
+class FakeTimer:
+    def __init__(self):
+        self.time = 0.0
+
+    def __call__(self):
+        return self.time
+
+
+def test_get_set():
+    cache: TTLCache[str] = TTLCache("test")
+    assert cache.get("key") is None
+    cache.set("key", "value")
+    assert cache.get("key") == "value"
+    assert "key" in cache
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.hit_rate == 0.5
+
+
+def test_lru_eviction():
+    """
+    Should evict the least recently used item when full
+    """
+    cache: TTLCache[int] = TTLCache("test", maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_ttl():
+    """
+    Should expire items after the ttl
+    """
+    timer = FakeTimer()
+    cache: TTLCache[int] = TTLCache("test", ttl=10, timer=timer)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=20)
+    timer.time = 15
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert list(cache.items()) == [("b", 2, 5)]
+    timer.time = 20
+    assert "b" not in cache
@@ -0,0 +1,153 @@
+import csv
+import io
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "clean_data"))
+import clean  # noqa: E402 isort:skip
+
+TRAINING_DATA = clean.get_training_data("base/data/nlu/*.md")
+
+# Like an export from the query in clean_data/README.md
+EXPORT = [
+    ["hi"],
+    ["Hi "],
+    ["1"],
+    [""],
+    [" 2 "],
+    ["yes"],
+    ["YES please"],
+    ["yes please"],
+    ["Soweto,protea south"],
+    ["soweto, protea south"],
+    ["what is covid?"],
+    ["What is COVID?"],
+    ["12b"],
+    ["ok, thanks"],
+    ["ok thanks"],
+    ["Ngiyabonga 🙏"],
+    ["ngiyabonga 🙏"],
+    ["3.5"],
+    ["-4"],
+    ["multi\nline"],
+    ["Multi\nline "],
+] + [[f"message {i % 500}"] for i in range(2000)]
+
+
+def old_clean(rows, training_data):
+    """
+    What clean.py used to do, before it was streamed
+    """
+    existing = set()
+    output = []
+    for (text,) in rows:
+        if clean.is_number(text):
+            continue
+        if not text:
+            continue
+        if text.lower().strip() in training_data:
+            continue
+        if text.lower().strip() in existing:
+            continue
+        output.append([text])
+        existing.add(text.lower().strip())
+    return output
+
+
+def run_clean(monkeypatch, capsys, rows, *args):
+    stdin = io.StringIO()
+    csv.writer(stdin).writerows(rows)
+    stdin.seek(0)
+    monkeypatch.setattr(sys, "stdin", stdin)
+    clean.main(list(args))
+    return list(csv.reader(io.StringIO(capsys.readouterr().out)))
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        [],
+        ["--dedup", "memory"],
+        ["--dedup", "disk"],
+        ["--dedup", "bloom", "--capacity", "10000", "--error-rate", "0.000001"],
+    ],
+)
+def test_same_as_old_script(monkeypatch, capsys, tmp_path, args):
+    """
+    Every dedup mode should give the same output as the old script
+    """
+    if "disk" in args:
+        args = args + ["--tmpdir", str(tmp_path)]
+    output = run_clean(monkeypatch, capsys, EXPORT, *args)
+    assert output == old_clean(EXPORT, TRAINING_DATA)
+    assert ["yes"] not in output
+    assert ["message 499"] in output
+
+
+def test_training_data_same_as_rasa():
+    """
+    The training data should be read the same as the old script read it with Rasa
+    """
+    pytest.importorskip("rasa")
+    import asyncio
+
+    from rasa.importers.importer import TrainingDataImporter
+
+    importer = TrainingDataImporter.load_from_config(
+        str(clean.ROOT / "config.yml"),
+        str(clean.ROOT / "base/domain-eng.yml"),
+        [str(clean.ROOT / "base/data")],
+    )
+    data = asyncio.get_event_loop().run_until_complete(importer.get_nlu_data())
+    assert TRAINING_DATA == set(i.text.lower().strip() for i in data.intent_examples)
+
+
+def test_streamed():
+    """
+    Texts should be yielded as they're read, rather than after reading all of them
+    """
+    read = []
+
+    def rows():
+        for i in range(1000):
+            read.append(i)
+            yield [f"message {i}"]
+
+    cleaned = clean.clean(rows(), set(), clean.MemorySet())
+    assert next(cleaned) == "message 0"
+    assert len(read) == 1
+
+
+@pytest.mark.parametrize("dedup", ["memory", "disk", "bloom"])
+def test_seen(tmp_path, dedup):
+    if dedup == "disk":
+        seen = clean.DiskSet(str(tmp_path))
+    elif dedup == "bloom":
+        seen = clean.BloomFilter(1000, 0.001)
+    else:
+        seen = clean.MemorySet()
+    assert seen.add("hi")
+    assert not seen.add("hi")
+    assert seen.add("hello")
+    seen.close()
+
+
+def test_disk_set_cleanup(tmp_path):
+    seen = clean.DiskSet(str(tmp_path))
+    seen.add("hi")
+    seen.close()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_bloom_filter_bounded():
+    """
+    The Bloom filter should have a fixed size, and drop about `error_rate` of the
+    unique texts at its capacity
+    """
+    seen = clean.BloomFilter(10000, 0.01)
+    size = len(seen.bits)
+    dropped = sum(not seen.add(f"message {i}") for i in range(10000))
+    assert len(seen.bits) == size
+    assert dropped < 10000 * 0.01 * 2
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+from asynctest import CoroutineMock, mock
+from sanic import Sanic
+
+from base.actions import config
+from base.actions.clients import EVENTSTORE, GOOGLE_PLACES, ClientPool
+from base.actions.metrics import REGISTRY
+from base.actions.server import create_app
+
+
+class TestClientPool:
+    @pytest.mark.asyncio
+    async def test_same_client(self):
+        """
+        Should reuse the same client for an upstream within an event loop
+        """
+        pool = ClientPool()
+        client = pool.get(EVENTSTORE)
+        assert pool.get(EVENTSTORE) is client
+        assert pool.get(GOOGLE_PLACES) is not client
+        await pool.close()
+
+    def test_new_client_per_loop(self):
+        """
+        Clients can't be shared between event loops, so should create a new one
+        """
+        pool = ClientPool()
+        clients = []
+        for _ in range(2):
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            clients.append(pool.get(EVENTSTORE))
+            loop.run_until_complete(pool.close())
+            loop.close()
+        assert clients[0] is not clients[1]
+
+    @pytest.mark.asyncio
+    async def test_close(self):
+        pool = ClientPool()
+        client = pool.get(EVENTSTORE)
+        await pool.close()
+        assert pool.stats() == {}
+        assert pool.get(EVENTSTORE) is not client
+        await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_stats(self):
+        pool = ClientPool()
+        pool.get(EVENTSTORE)
+        assert pool.stats() == {EVENTSTORE: {"keepalive": 0, "active": 0}}
+        await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_prewarm(self):
+        """
+        Should make a request for every connection to pre-warm
+        """
+        config.EVENTSTORE_URL = "https://eventstore"
+        pool = ClientPool()
+        client = pool.get(EVENTSTORE)
+        with mock.patch.object(client, "head", CoroutineMock()) as head:
+            await pool.prewarm(EVENTSTORE, 3)
+            assert head.call_count == 3
+            head.assert_called_with("https://eventstore")
+            await pool.prewarm(EVENTSTORE, 0)
+            assert head.call_count == 3
+        await pool.close()
+        config.EVENTSTORE_URL = None
+
+    @pytest.mark.asyncio
+    async def test_metrics(self):
+        pool = ClientPool()
+        pool.get(EVENTSTORE)
+        pool.collect_metrics()
+        metric = REGISTRY.get("http_pool_connections")
+        assert metric.get(upstream=EVENTSTORE, state="keepalive") == 0
+        await pool.close()
+
+
+def test_server_metrics():
+    Sanic.test_mode = True
+    app = create_app("base.actions.actions")
+    _, response = app.test_client.get("/metrics")
+    assert response.status == 200
+    assert "# TYPE http_pool_connections gauge" in response.text
@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+from base.actions import codec, config
+
+
+@pytest.fixture(params=[True, False], ids=["fast", "stdlib"])
+def fast_json(request):
+    if request.param and codec.orjson is None:
+        pytest.skip("orjson is not installed")
+    original = config.FAST_JSON
+    config.FAST_JSON = request.param
+    yield request.param
+    config.FAST_JSON = original
+
+
+class TestCodec:
+    def test_enabled(self, fast_json):
+        assert codec.fast_json_enabled() == fast_json
+
+    def test_round_trip(self, fast_json):
+        """
+        Should decode to what the standard library would, for either implementation
+        """
+        obj = {
+            "sender_id": "27820001001",
+            "slots": {"province": "gt", "age": None, "terms": "yes"},
+            "events": [{"event": "user", "text": "Jöhannesburg ✓", "timestamp": 1.5}],
+            "paused": False,
+        }
+        data = codec.dumps(obj)
+        assert isinstance(data, bytes)
+        assert json.loads(data) == obj
+        assert codec.loads(data) == obj
+        assert codec.loads(data.decode()) == obj
+
+    def test_non_string_keys(self, fast_json):
+        """
+        Non-string keys should be converted to strings, like the standard library does
+        """
+        assert json.loads(codec.dumps({1: "yes"})) == {"1": "yes"}
+
+    def test_invalid(self, fast_json):
+        error = None
+        try:
+            codec.loads(b"{invalid")
+        except json.JSONDecodeError as e:
+            error = e
+        assert error
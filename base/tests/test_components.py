@@ -0,0 +1,112 @@
+import pytest
+
+pytest.importorskip("rasa")
+
+from rasa.nlu.config import RasaNLUModelConfig  # noqa: E402 isort:skip
+from rasa.nlu.model import Interpreter, Trainer  # noqa: E402 isort:skip
+from rasa.nlu.training_data import Message, TrainingData  # noqa: E402 isort:skip
+
+from base.nlu.components import (  # noqa: E402 isort:skip
+    FAST_PATH,
+    FastPathClassifier,
+    GatedLexicalSyntacticFeaturizer,
+    ParseCacheLookup,
+    ParseCacheStore,
+)
+
+PIPELINE = [
+    {"name": "WhitespaceTokenizer"},
+    {"name": "base.nlu.components.FastPathClassifier"},
+    {"name": "base.nlu.components.ParseCacheLookup"},
+    {"name": "base.nlu.components.GatedRegexFeaturizer"},
+    {"name": "base.nlu.components.GatedLexicalSyntacticFeaturizer"},
+    {"name": "base.nlu.components.GatedCountVectorsFeaturizer"},
+    {
+        "name": "base.nlu.components.GatedCountVectorsFeaturizer",
+        "analyzer": "char_wb",
+        "min_ngram": 1,
+        "max_ngram": 4,
+    },
+    {"name": "base.nlu.components.GatedDIETClassifier", "epochs": 1},
+    {"name": "EntitySynonymMapper"},
+    {"name": "base.nlu.components.ParseCacheStore"},
+]
+
+
+def training_data():
+    examples = [
+        ("hi", "greet"),
+        ("hello", "greet"),
+        ("good morning", "greet"),
+        ("bye", "goodbye"),
+        ("goodbye", "goodbye"),
+        ("see you later", "goodbye"),
+    ]
+    return TrainingData(
+        [Message(text, data={"intent": intent}) for text, intent in examples]
+    )
+
+
+def test_fast_path():
+    """
+    Bare menu numbers should be parsed, and marked so that the gated components skip
+    them
+    """
+    message = Message("2")
+    FastPathClassifier().process(message)
+    assert message.get("intent") == {"name": "inform", "confidence": 1.0}
+    [entity] = message.get("entities")
+    assert entity["entity"] == "number"
+    assert entity["value"] == "2"
+    assert entity["extractor"] == "FastPathClassifier"
+    assert message.get(FAST_PATH)
+
+    # The message isn't tokenized, so this would fail if it didn't skip it
+    GatedLexicalSyntacticFeaturizer({}).process(message)
+    assert message.get("text_sparse_features") is None
+
+
+def test_parse_cache():
+    """
+    Parses stored at the end of the pipeline should be returned by the lookup for
+    the same text, from the cache of that pipeline only
+    """
+    lookup = ParseCacheLookup({})
+    store = ParseCacheStore({})
+    context = lookup.provide_context()
+    intent = {"name": "greet", "confidence": 0.9}
+
+    message = Message("hello")
+    lookup.process(message, **context)
+    assert not message.get(FAST_PATH)
+    message.set("intent", intent, add_to_output=True)
+    store.process(message, **context)
+
+    message = Message("Hello")
+    lookup.process(message, **context)
+    assert message.get(FAST_PATH)
+    assert message.get("intent") == intent
+
+    message = Message("hello")
+    ParseCacheLookup({}).process(message)
+    assert not message.get(FAST_PATH)
+
+
+def test_pipeline(tmp_path):
+    """
+    The pipeline should train, persist, and load, and parse messages on both the
+    fast path and through the model
+    """
+    trainer = Trainer(RasaNLUModelConfig({"language": "en", "pipeline": PIPELINE}))
+    trainer.train(training_data())
+    interpreter = Interpreter.load(trainer.persist(str(tmp_path)))
+
+    result = interpreter.parse("1")
+    assert result["intent"] == {"name": "inform", "confidence": 1.0}
+    assert [e["value"] for e in result["entities"]] == ["1"]
+
+    result = interpreter.parse("hello there")
+    assert result["intent"]["name"] in ("greet", "goodbye")
+    assert interpreter.parse("hello there") == result
+    [lookup] = [c for c in interpreter.pipeline if isinstance(c, ParseCacheLookup)]
+    assert lookup.parse_cache.cache.hits == 1
@@ -0,0 +1,68 @@
+import time
+
+import pytest
+from rasa_sdk import Tracker
+from rasa_sdk.executor import CollectingDispatcher
+
+from base.actions import config
+from base.actions.actions import HealthCheckProfileForm
+from base.actions.deadline import Deadline
+from base.actions.metrics import REGISTRY
+from base.tests.fake_server import FakeServer, Response
+from base.tests.test_retry import FakeTimer
+
+
+class TestDeadline:
+    def test_remaining(self):
+        timer = FakeTimer()
+        deadline = Deadline(1.5, timer=timer)
+        assert deadline.remaining() == 1.5
+        assert deadline.timeout(5) == 1.5
+        timer.time = 1
+        assert deadline.timeout(5) == 0.5
+        assert not deadline.expired
+        timer.time = 2
+        assert deadline.remaining() == 0
+        assert deadline.expired
+
+    def test_no_deadline(self):
+        deadline = Deadline(None)
+        assert not deadline.expired
+        assert deadline.timeout() is None
+        assert deadline.timeout(5) == 5
+
+
+@pytest.mark.asyncio
+async def test_validate_location_deadline():
+    """
+    If Google Places is too slow, should accept the location as the user typed it
+    """
+    config.GOOGLE_PLACES_API_KEY = "test_key"
+    config.LOCATION_DEADLINE = 0.2
+    form = HealthCheckProfileForm()
+    tracker = Tracker(
+        "default",
+        {"requested_slot": "location", "province": "wc"},
+        {"text": "Cape Town"},
+        [{"event": "user", "metadata": {}}],
+        False,
+        None,
+        {},
+        "action_listen",
+    )
+    exceeded = REGISTRY.get("deadline_exceeded_total")
+    before = exceeded.get(operation="validate_location")
+
+    async with FakeServer(lambda request: Response(delay=5)) as server:
+        config.GOOGLE_PLACES_URL = server.url
+        start = time.monotonic()
+        result = await form.validate_location(
+            "Cape Town", CollectingDispatcher(), tracker, {}
+        )
+        assert time.monotonic() - start < 1
+        assert result == {"location": "Cape Town"}
+        assert exceeded.get(operation="validate_location") == before + 1
+
+    config.GOOGLE_PLACES_URL = "https://maps.googleapis.com/"
+    config.GOOGLE_PLACES_API_KEY = None
+    config.LOCATION_DEADLINE = 1.5
@@ -0,0 +1,85 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from base.actions import config
+from base.actions.eventstore import STUDY_B_ARM, TRIAGE, EventStoreClient
+from base.actions.metrics import REGISTRY
+from base.tests.fake_server import FakeEventStore, FakeServer, Response
+
+
+class TestEventStoreClient:
+    @pytest.mark.asyncio
+    async def test_disabled(self):
+        """
+        If the event store isn't configured, shouldn't make any requests
+        """
+        client = EventStoreClient()
+        assert not client.enabled
+        assert await client.submit_triage({}) is None
+        assert await client.assign_study_b_arm({}) is None
+        assert await client.start_triage({}) is None
+
+    @pytest.mark.asyncio
+    async def test_endpoints(self):
+        async with FakeServer(FakeEventStore()) as server:
+            config.EVENTSTORE_URL = server.url
+            config.EVENTSTORE_TOKEN = "token"
+            client = EventStoreClient()
+            triage = await client.submit_triage({"msisdn": "+27820001001"})
+            arm = await client.assign_study_b_arm({"msisdn": "+27820001001"})
+            start = await client.start_triage({"msisdn": "+27820001001"})
+
+        assert triage["profile"] == {"hcs_study_a_arm": "T1"}
+        assert arm["study_b_arm"] == "T2"
+        assert start["timestamp"] == "2021-01-01T00:00:00Z"
+        assert [r.path for r in server.requests] == [
+            "/api/v5/covid19triage/",
+            "/api/v2/hcsstudybrandomarm/",
+            "/api/v2/covid19triagestart/",
+        ]
+        histogram = REGISTRY.get("eventstore_request_seconds")
+        assert histogram.count(endpoint=STUDY_B_ARM) >= 1
+
+        config.EVENTSTORE_URL = None
+        config.EVENTSTORE_TOKEN = None
+
+    @pytest.mark.asyncio
+    async def test_concurrent(self):
+        """
+        Independent requests shouldn't wait for each other
+        """
+        async with FakeServer(FakeEventStore(latency=0.1)) as server:
+            config.EVENTSTORE_URL = server.url
+            config.EVENTSTORE_TOKEN = "token"
+            client = EventStoreClient()
+            start = time.monotonic()
+            triage, arm = await asyncio.gather(
+                client.submit_triage({"msisdn": "+27820001001"}),
+                client.assign_study_b_arm({"msisdn": "+27820001001"}),
+            )
+            assert time.monotonic() - start < 0.19
+        assert triage["profile"] == {"hcs_study_a_arm": "T1"}
+        assert arm["study_b_arm"] == "T2"
+
+        config.EVENTSTORE_URL = None
+        config.EVENTSTORE_TOKEN = None
+
+    @pytest.mark.asyncio
+    async def test_no_retry(self):
+        async with FakeServer() as server:
+            server.respond(Response(503), Response(503))
+            config.EVENTSTORE_URL = server.url
+            config.EVENTSTORE_TOKEN = "token"
+            error = None
+            try:
+                await EventStoreClient().post(TRIAGE, {}, retry=False)
+            except httpx.HTTPError as e:
+                error = e
+            assert error
+            assert len(server.requests) == 1
+
+        config.EVENTSTORE_URL = None
+        config.EVENTSTORE_TOKEN = None
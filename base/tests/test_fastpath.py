@@ -0,0 +1,41 @@
+from base.nlu.fastpath import FastPath, Parse, lookup_table_labels
+
+
+def test_number():
+    fast_path = FastPath()
+    assert fast_path.match("2") == Parse(
+        "inform", [{"entity": "number", "value": "2", "start": 0, "end": 1}]
+    )
+    assert fast_path.match(" 12. ") == Parse(
+        "inform", [{"entity": "number", "value": "12", "start": 1, "end": 3}]
+    )
+
+
+def test_label():
+    fast_path = FastPath(labels=["MALE", "<18"])
+    assert fast_path.match("Male ") == Parse("inform", [])
+    assert fast_path.match("<18") == Parse("inform", [])
+
+
+def test_no_match():
+    fast_path = FastPath(labels=["MALE"])
+    for text in ["", "2 but I'm doing it for my brother", "1234", "male please", "¹"]:
+        assert fast_path.match(text) is None
+
+
+def test_blocked():
+    """
+    Texts that the training data gives a different intent shouldn't be matched
+    """
+    fast_path = FastPath(labels=["other"])
+    examples = [("1", "inform"), ("3", "deny"), ("Other", "chitchat"), ("hi", "greet")]
+    assert fast_path.find_conflicts(examples) == {"3", "other"}
+    fast_path = FastPath(labels=["other"], blocked=["3", "other"])
+    assert fast_path.match("3") is None
+    assert fast_path.match("OTHER") is None
+    assert fast_path.match("1") is not None
+
+
+def test_lookup_table_labels():
+    labels = lookup_table_labels()
+    assert {"<18", "male", "gt", "campus"} <= labels
@@ -0,0 +1,125 @@
+from itertools import combinations
+
+from rasa_sdk import Tracker
+
+from base.actions.actions import (
+    HealthCheckForm,
+    HealthCheckProfileForm,
+    HealthCheckTermsForm,
+)
+from base.actions.flows import Branch, FormFlow
+
+
+def get_tracker(slots):
+    return Tracker("default", slots, {}, [], False, None, {}, "action_listen")
+
+
+def legacy_required_slots(cls, tracker):
+    """
+    How HealthCheckProfileForm.required_slots used to work, to check against
+    """
+    slots = cls.SLOTS + cls.PERSISTED_SLOTS
+    if tracker.get_slot("medical_condition") != "no":
+        slots = cls.SLOTS + cls.PERSISTED_SLOTS + cls.CONDITIONS
+    if tracker.get_slot("age") == "<18":
+        for slot in cls.MINOR_SKIP_SLOTS:
+            if slot in slots:
+                slots.remove(slot)
+    for slot in slots:
+        if not tracker.get_slot(slot):
+            return [slot]
+    return []
+
+
+def answers(branches):
+    """
+    Answers that take the given branches
+    """
+    return {
+        "age": "<18" if "minor" in branches else "18-39",
+        "medical_condition": "no" if "no_conditions" in branches else "yes",
+    }
+
+
+def walk(form, branches, plan):
+    """
+    Answers the form's questions one at a time, checking that they're asked in the
+    order of the plan
+    """
+    slots = {}
+    for slot in plan:
+        assert form.required_slots(get_tracker(slots)) == [slot]
+        slots[slot] = answers(branches).get(slot, "yes")
+    assert form.required_slots(get_tracker(slots)) == []
+
+
+class TestFormFlow:
+    def test_plans(self):
+        flow = FormFlow(
+            ["a", "b", "c", "d"],
+            [
+                Branch("skip_b", "a", "no", ("b",)),
+                Branch("skip_cd", "b", "no", ("c", "d")),
+            ],
+        )
+        assert flow.paths() == {
+            (): ("a", "b", "c", "d"),
+            ("skip_b",): ("a", "c", "d"),
+            ("skip_cd",): ("a", "b"),
+            ("skip_b", "skip_cd"): ("a",),
+        }
+        assert flow.next_slot(get_tracker({})) == ["a"]
+        assert flow.next_slot(get_tracker({"a": "no"})) == ["c"]
+        assert flow.next_slot(get_tracker({"a": "yes", "b": "no"})) == []
+
+    def test_earlier_slot_cleared(self):
+        """
+        If an earlier slot is cleared, it should be asked again
+        """
+        flow = FormFlow(["a", "b", "c"])
+        assert flow.next_slot(get_tracker({"a": "yes", "c": "yes"})) == ["b"]
+
+    def test_simple_forms(self):
+        for form in [HealthCheckTermsForm, HealthCheckForm]:
+            assert form.FLOW.paths() == {(): tuple(form.SLOTS)}
+            walk(form, (), form.SLOTS)
+
+
+class TestHealthCheckProfileFormFlow:
+    def test_paths(self):
+        paths = HealthCheckProfileForm.FLOW.paths()
+        assert set(paths) == {
+            (),
+            ("no_conditions",),
+            ("minor",),
+            ("no_conditions", "minor"),
+        }
+        assert paths[("no_conditions", "minor")] == (
+            "age",
+            "gender",
+            "province",
+            "medical_condition",
+        )
+        for branches, plan in paths.items():
+            walk(HealthCheckProfileForm, branches, plan)
+
+    def test_same_as_legacy(self):
+        """
+        For every combination of filled slots and answers that change the flow,
+        should ask the same question as the old implementation
+        """
+        form = HealthCheckProfileForm
+        slots = form.SLOTS + form.PERSISTED_SLOTS + form.CONDITIONS
+        for n in range(len(slots) + 1):
+            for filled in combinations(slots, n):
+                for age in ["<18", "18-39"]:
+                    for condition in ["no", "yes", "not sure"]:
+                        values = {slot: "yes" for slot in filled}
+                        if "age" in values:
+                            values["age"] = age
+                        if "medical_condition" in values:
+                            values["medical_condition"] = condition
+                        tracker = get_tracker(values)
+                        assert form.required_slots(tracker) == legacy_required_slots(
+                            form, tracker
+                        )
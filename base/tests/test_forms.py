@@ -1,4 +1,6 @@
 import json
+import re
+from datetime import datetime, timezone
 from typing import Any, Dict, Optional, Text
 from urllib.parse import urlencode
 
@@ -12,6 +14,7 @@ from rasa_sdk.executor import CollectingDispatcher
 import base.actions.actions
 from base.actions.actions import (
     ActionExit,
+    ActionSendStudyAMessage,
     ActionSendStudyMessages,
     ActionSessionStart,
     HealthCheckForm,
@@ -310,12 +313,12 @@ class TestHealthCheckProfileForm:
     @pytest.mark.asyncio
     async def test_validate_location_google_places_error(self):
         """
-        Errors should be retried 3 times
+        Retryable errors should be retried 3 times
         """
         base.actions.actions.config.GOOGLE_PLACES_API_KEY = "test_key"
         form = HealthCheckProfileForm()
         form.places_lookup = utils.AsyncMock()
-        form.places_lookup.side_effect = Exception()
+        form.places_lookup.side_effect = httpx.ReadTimeout("")
 
         tracker = self.get_tracker_for_text_slot_with_message(
             "location",
@@ -335,6 +338,80 @@ class TestHealthCheckProfileForm:
 
         base.actions.actions.config.GOOGLE_PLACES_API_KEY = None
 
+    @pytest.mark.asyncio
+    async def test_validate_location_google_places_bug(self):
+        """
+        Errors that aren't retryable, like a response in an unexpected format,
+        shouldn't be retried, and the user should be asked again
+        """
+        base.actions.actions.config.GOOGLE_PLACES_API_KEY = "test_key"
+        form = HealthCheckProfileForm()
+        form.places_lookup = utils.AsyncMock()
+        form.places_lookup.side_effect = KeyError("predictions")
+
+        tracker = self.get_tracker_for_text_slot_with_message(
+            "location",
+            "Cape Town",
+        )
+
+        dispatcher = CollectingDispatcher()
+        events = await form.validate(dispatcher, tracker, {})
+        assert events == [SlotSet("location", None)]
+        [message] = dispatcher.messages
+        assert message["template"] == "utter_incorrect_location"
+        assert form.places_lookup.call_count == 1
+
+        base.actions.actions.config.GOOGLE_PLACES_API_KEY = None
+
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_validate_location_google_places_missing_key(self):
+        """
+        A successful response that's missing the data we need should ask the user
+        again, rather than failing the action
+        """
+        base.actions.actions.config.GOOGLE_PLACES_API_KEY = "test_key"
+        form = HealthCheckProfileForm()
+        request = respx.get(
+            re.compile(r"https://maps.googleapis.com/maps/api/place/autocomplete/"),
+            content=json.dumps({"status": "OK"}),
+        )
+
+        tracker = self.get_tracker_for_text_slot_with_message(
+            "location",
+            "Somewhere with no predictions",
+        )
+        tracker.slots["province"] = "wc"
+
+        dispatcher = CollectingDispatcher()
+        events = await form.validate(dispatcher, tracker, {})
+        assert events == [SlotSet("location", None)]
+        [message] = dispatcher.messages
+        assert message["template"] == "utter_incorrect_location"
+        assert request.call_count == 1
+
+        base.actions.actions.config.GOOGLE_PLACES_API_KEY = None
+
+    @pytest.mark.asyncio
+    async def test_validate_location_google_places_missing_geometry(self):
+        base.actions.actions.config.GOOGLE_PLACES_API_KEY = "test_key"
+        form = HealthCheckProfileForm()
+        form.places_lookup = utils.AsyncMock()
+        form.places_lookup.return_value = {"formatted_address": "Cape Town"}
+
+        tracker = self.get_tracker_for_text_slot_with_message(
+            "location",
+            "Cape Town, no geometry",
+        )
+
+        dispatcher = CollectingDispatcher()
+        events = await form.validate(dispatcher, tracker, {})
+        assert events == [SlotSet("location", None)]
+        [message] = dispatcher.messages
+        assert message["template"] == "utter_incorrect_location"
+
+        base.actions.actions.config.GOOGLE_PLACES_API_KEY = None
+
     @respx.mock
     @pytest.mark.asyncio
     async def test_places_lookup(self):
@@ -647,6 +724,7 @@ class TestHealthCheckForm:
                 "diabetes": None,
                 "hypertension": None,
                 "obesity": None,
+                "risk_version": 1,
             },
         }
 
@@ -881,40 +959,81 @@ class TestActionSendStudyMessages:
             "action_listen",
         )
 
-    @pytest.mark.asyncio
-    async def test_send_study_a_message(self):
+    def test_send_study_a_message(self):
+        """
+        Should schedule the study A message if the slot is set
+        """
+        tracker = self.get_tracker_with_slot({"study_a_arm": "T1"})
+        [reminder] = ActionSendStudyMessages().get_study_a_reminder(tracker)
+
+        assert reminder["event"] == "reminder"
+        assert reminder["intent"] == "EXTERNAL_study_a_message"
+        assert reminder["entities"] == [{"entity": "study_a_arm", "value": "T1"}]
+        assert reminder["kill_on_user_msg"] is False
+        trigger = datetime.fromisoformat(reminder["date_time"])
+        assert trigger > datetime.now(timezone.utc)
+
+    def test_run(self):
         """
-        Should send the study A message if the slot is set
+        The action itself shouldn't schedule anything, because the session is
+        restarted straight afterwards
         """
         tracker = self.get_tracker_with_slot({"study_a_arm": "T1"})
         dispatcher = CollectingDispatcher()
-        actions = await ActionSendStudyMessages().run(dispatcher, tracker, {})
+        actions = ActionSendStudyMessages().run(dispatcher, tracker, {})
 
         assert actions == []
+        assert dispatcher.messages == []
 
-        [message] = dispatcher.messages
-        assert message["template"] == "utter_study_a_T1"
-
-    @pytest.mark.asyncio
-    async def test_send_study_a_message_not_set(self):
+    def test_send_study_a_message_not_set(self):
         """
         Should not send the study A message if the slot is not set
         """
         tracker = self.get_tracker_with_slot({})
+        assert ActionSendStudyMessages().get_study_a_reminder(tracker) == []
+
+    def test_send_study_a_message_control(self):
+        """
+        Should not send the study A message if arm is Control
+        """
+        tracker = self.get_tracker_with_slot({"study_a_arm": "C"})
+        assert ActionSendStudyMessages().get_study_a_reminder(tracker) == []
+
+
+class TestActionSendStudyAMessage:
+    def get_tracker_with_entities(self, entities):
+        return Tracker(
+            "default",
+            {},
+            {"intent": {"name": "EXTERNAL_study_a_message"}, "entities": entities},
+            [],
+            False,
+            None,
+            {},
+            "action_listen",
+        )
+
+    def test_send_message(self):
+        """
+        Should send the study A message for the arm in the reminder
+        """
+        tracker = self.get_tracker_with_entities(
+            [{"entity": "study_a_arm", "value": "T3"}]
+        )
         dispatcher = CollectingDispatcher()
-        actions = await ActionSendStudyMessages().run(dispatcher, tracker, {})
+        actions = ActionSendStudyAMessage().run(dispatcher, tracker, {})
 
         assert actions == []
-        assert dispatcher.messages == []
+        [message] = dispatcher.messages
+        assert message["template"] == "utter_study_a_T3"
 
-    @pytest.mark.asyncio
-    async def test_send_study_a_message_control(self):
+    def test_no_arm(self):
         """
-        Should not send the study A message if arm is Control
+        Should not send anything if there's no arm
         """
-        tracker = self.get_tracker_with_slot({"study_a_arm": "C"})
+        tracker = self.get_tracker_with_entities([])
         dispatcher = CollectingDispatcher()
-        actions = await ActionSendStudyMessages().run(dispatcher, tracker, {})
+        actions = ActionSendStudyAMessage().run(dispatcher, tracker, {})
 
         assert actions == []
         assert dispatcher.messages == []
@@ -931,6 +1050,64 @@ class TestActionSessionStart:
         assert actions[0] == SessionStarted()
         assert actions[-1] == ActionExecuted("action_listen")
         assert len(actions) > 2
+        assert not [a for a in actions if a["event"] == "reminder"]
+
+    def get_tracker(self, latest_action_name):
+        return Tracker(
+            "default",
+            {"study_a_arm": "T2"},
+            {},
+            [],
+            False,
+            None,
+            {},
+            latest_action_name,
+        )
+
+    def applied_events(self, events):
+        """
+        Like Rasa, only the events since the session last started are applied, and
+        reminders that aren't applied are dropped when they trigger
+        """
+        for i, event in reversed(list(enumerate(events))):
+            if event["event"] in ("session_started", "restart"):
+                return events[i:]
+        return events
+
+    def test_study_a_message(self):
+        """
+        After a check, the study A message should be scheduled after the session
+        restart, so that it isn't dropped
+        """
+        dispatcher = CollectingDispatcher()
+        tracker = self.get_tracker("action_send_study_messages")
+        events = ActionSendStudyMessages().run(dispatcher, tracker, {})
+        events += ActionSessionStart().run(dispatcher, tracker, {})
+
+        [reminder] = [
+            e for e in self.applied_events(events) if e["event"] == "reminder"
+        ]
+        trigger = Tracker(
+            "default",
+            {},
+            {"intent": {"name": reminder["intent"]}, "entities": reminder["entities"]},
+            [],
+            False,
+            None,
+            {},
+            "action_listen",
+        )
+        ActionSendStudyAMessage().run(dispatcher, trigger, {})
+        [message] = dispatcher.messages
+        assert message["template"] == "utter_study_a_T2"
+
+    def test_no_study_a_message(self):
+        """
+        Other session starts shouldn't send the study A message again
+        """
+        tracker = self.get_tracker("action_listen")
+        actions = ActionSessionStart().run(CollectingDispatcher(), tracker, {})
+        assert not [a for a in actions if a["event"] == "reminder"]
 
 
 class TestActionExit:
@@ -0,0 +1,162 @@
+import asyncio
+import csv
+import io
+import json
+import random
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+from base.tests.fake_server import FakeServer, Response
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "clean_data"))
+import get_classification  # noqa: E402 isort:skip
+
+
+def confidence(text):
+    return int(text.split()[-1]) * 37 % 100 / 100
+
+
+def parse(fail=()):
+    def handler(request):
+        text = json.loads(request.body)["text"]
+        if text in fail:
+            return Response(500)
+        return Response(
+            200,
+            {"text": text, "intent": {"name": "greet", "confidence": confidence(text)}},
+        )
+
+    return handler
+
+
+def expected(texts, k):
+    return sorted((confidence(t), "greet", t) for t in texts)[:k]
+
+
+class TestLowest:
+    def test_lowest(self):
+        """
+        Should keep only the k lowest results
+        """
+        results = [(random.random(), "greet", str(i)) for i in range(1000)]
+        lowest = get_classification.Lowest(10)
+        for result in results:
+            lowest.push(result)
+        assert lowest.results() == sorted(results)[:10]
+
+    def test_initial_results(self):
+        """
+        Results from a checkpoint should be kept, eg. as lists from the JSON
+        """
+        lowest = get_classification.Lowest(
+            2, [[0.5, "greet", "a"], [0.1, "greet", "b"]]
+        )
+        lowest.push((0.3, "greet", "c"))
+        lowest.push((0.9, "greet", "d"))
+        assert lowest.results() == [(0.1, "greet", "b"), (0.3, "greet", "c")]
+
+
+class TestClassifyAll:
+    """
+    Against a local stand-in for the Rasa parse endpoint
+    """
+
+    @pytest.mark.asyncio
+    async def test_classify_all(self, tmp_path):
+        """
+        Should classify all the texts concurrently, skipping blank rows, and keep the
+        lowest results
+        """
+        texts = [f"message {i}" for i in range(200)]
+        rows = [[t] for t in texts[:100]] + [[""], []] + [[t] for t in texts[100:]]
+        lowest = get_classification.Lowest(20)
+        checkpoint = str(tmp_path / "checkpoint.json")
+
+        async with FakeServer(parse()) as server:
+            done = await get_classification.classify_all(
+                rows,
+                lowest,
+                f"{server.url}/model/parse",
+                concurrency=8,
+                checkpoint=checkpoint,
+            )
+        assert done == len(rows)
+        assert len(server.requests) == len(texts)
+        assert lowest.results() == expected(texts, 20)
+        rows_done, results = get_classification.read_checkpoint(checkpoint)
+        assert rows_done == len(rows)
+        assert [tuple(r) for r in results] == expected(texts, 20)
+
+    @pytest.mark.asyncio
+    async def test_error_and_resume(self, tmp_path):
+        """
+        If a request fails, the error should be raised, with the rows classified so
+        far saved in the checkpoint, and resuming should carry on from there
+        """
+        texts = [f"message {i}" for i in range(100)]
+        rows = [[t] for t in texts]
+        checkpoint = str(tmp_path / "checkpoint.json")
+
+        async with FakeServer(parse(fail={"message 50"})) as server:
+            error = None
+            try:
+                await get_classification.classify_all(
+                    rows,
+                    get_classification.Lowest(10),
+                    f"{server.url}/model/parse",
+                    concurrency=4,
+                    checkpoint=checkpoint,
+                    checkpoint_interval=10,
+                )
+            except httpx.HTTPError as e:
+                error = e
+            assert error
+
+        start, results = get_classification.read_checkpoint(checkpoint)
+        assert 0 < start <= 50
+        assert [tuple(r) for r in results] == expected(texts[:start], 10)
+
+        lowest = get_classification.Lowest(10, results)
+        async with FakeServer(parse()) as server:
+            done = await get_classification.classify_all(
+                rows,
+                lowest,
+                f"{server.url}/model/parse",
+                concurrency=4,
+                start=start,
+                checkpoint=checkpoint,
+            )
+        assert done == len(rows)
+        assert len(server.requests) == len(rows) - start
+        assert lowest.results() == expected(texts, 10)
+
+
+@pytest.mark.asyncio
+async def test_main(monkeypatch, capsys, tmp_path):
+    """
+    Should write the lowest confidence texts as a CSV, carrying on from the
+    checkpoint when resuming
+    """
+    texts = [f"message {i}" for i in range(50)]
+    stdin = io.StringIO()
+    csv.writer(stdin).writerows([t] for t in texts)
+    stdin.seek(0)
+    monkeypatch.setattr(sys, "stdin", stdin)
+    checkpoint = str(tmp_path / "checkpoint.json")
+    get_classification.write_checkpoint(
+        checkpoint, 10, get_classification.Lowest(5, expected(texts[:10], 5))
+    )
+
+    async with FakeServer(parse()) as server:
+        argv = ["--url", f"{server.url}/model/parse", "--top", "5"]
+        argv += ["--checkpoint", checkpoint, "--resume"]
+        # main runs its own event loop
+        await asyncio.get_event_loop().run_in_executor(
+            None, get_classification.main, argv
+        )
+    assert len(server.requests) == 40
+    output = list(csv.reader(io.StringIO(capsys.readouterr().out)))
+    assert output == [[str(c), i, t] for c, i, t in expected(texts, 5)]
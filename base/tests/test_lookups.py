@@ -0,0 +1,73 @@
+import os
+
+from base.actions.lookups import LookupTableRegistry
+
+
+def write_table(root, bot, name, lines):
+    directory = root / bot / "data" / "lookup_tables"
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{name}.txt"
+    path.write_text("\n".join(lines) + "\n")
+    return path
+
+
+def test_load(tmp_path):
+    """
+    Should load all the lookup tables, keyed by bot and table name
+    """
+    write_table(tmp_path, "base", "provinces", ["ec", "fs"])
+    write_table(tmp_path, "hh", "reasons", ["student", "staff"])
+    registry = LookupTableRegistry(root=tmp_path)
+    registry.load()
+
+    assert dict(registry.labels("base", "provinces")) == {1: "ec", 2: "fs"}
+    assert dict(registry.indexes("hh", "reasons")) == {"student": 1, "staff": 2}
+
+
+def test_tables_immutable(tmp_path):
+    """
+    The returned tables should not be modifiable
+    """
+    write_table(tmp_path, "base", "ages", ["<18"])
+    registry = LookupTableRegistry(root=tmp_path)
+    error = None
+    try:
+        registry.labels("base", "ages")[2] = "18-39"  # type: ignore
+    except TypeError as e:
+        error = e
+    assert error
+
+
+def test_reload_changed(tmp_path):
+    """
+    Should reload a table if the file's mtime changes, but only after the interval
+    """
+    path = write_table(tmp_path, "base", "gender", ["MALE"])
+    registry = LookupTableRegistry(root=tmp_path, reload_interval=0)
+    registry.load()
+    assert dict(registry.labels("base", "gender")) == {1: "MALE"}
+
+    path.write_text("MALE\nFEMALE\n")
+    stat = path.stat()
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+    assert dict(registry.labels("base", "gender")) == {1: "MALE", 2: "FEMALE"}
+
+
+def test_no_reload_within_interval(tmp_path):
+    path = write_table(tmp_path, "base", "gender", ["MALE"])
+    registry = LookupTableRegistry(root=tmp_path, reload_interval=3600)
+    registry.load()
+
+    path.write_text("MALE\nFEMALE\n")
+    stat = path.stat()
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+    assert dict(registry.labels("base", "gender")) == {1: "MALE"}
+
+
+def test_repo_tables():
+    """
+    Should find the lookup tables for all the bots in this repo
+    """
+    registry = LookupTableRegistry()
+    assert registry.labels("base", "provinces")[9] == "wc"
+    assert registry.labels("hh", "destinations")[1] == "campus"
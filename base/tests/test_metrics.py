@@ -0,0 +1,52 @@
+from base.actions.metrics import Registry
+
+
+def test_counter():
+    registry = Registry()
+    counter = registry.counter("test_total", "A test counter", ["kind"])
+    counter.inc(kind="a")
+    counter.inc(2, kind="a")
+    counter.inc(kind="b")
+    assert counter.get(kind="a") == 3
+    assert counter.get(kind="c") == 0
+    assert registry.render() == "\n".join(
+        [
+            "# HELP test_total A test counter",
+            "# TYPE test_total counter",
+            'test_total{kind="a"} 3.0',
+            'test_total{kind="b"} 1.0',
+            "",
+        ]
+    )
+
+
+def test_register_existing():
+    """
+    Registering the same metric twice should return the existing metric
+    """
+    registry = Registry()
+    counter = registry.counter("test_total", "A test counter")
+    assert registry.counter("test_total", "A test counter") is counter
+
+    error = None
+    try:
+        registry.gauge("test_total", "A test gauge")
+    except ValueError as e:
+        error = e
+    assert error
+
+
+def test_histogram():
+    registry = Registry()
+    histogram = registry.histogram("test_seconds", "A histogram", buckets=[0.1, 1])
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    assert histogram.count() == 2
+    assert histogram.sum() == 0.55
+    assert list(histogram.samples()) == [
+        'test_seconds_bucket{le="0.1"} 1',
+        'test_seconds_bucket{le="1"} 2',
+        'test_seconds_bucket{le="+Inf"} 2',
+        "test_seconds_sum 0.55",
+        "test_seconds_count 2",
+    ]
@@ -0,0 +1,124 @@
+import json
+import sqlite3
+
+from base.actions import migrate_locations
+
+# The events table that Rasa's SQLTrackerStore creates
+SCHEMA = """
+CREATE TABLE events (
+    id INTEGER PRIMARY KEY,
+    sender_id VARCHAR(255) NOT NULL,
+    type_name VARCHAR(255) NOT NULL,
+    timestamp FLOAT,
+    intent_name VARCHAR(255),
+    action_name VARCHAR(255),
+    data TEXT
+)
+"""
+
+
+def slot_event(name, value):
+    return {"event": "slot", "timestamp": 1.0, "name": name, "value": value}
+
+
+EVENTS = [
+    slot_event("location_coords", "+1.234-5.678/"),
+    {"event": "user", "timestamp": 1.0, "text": "location_coords"},
+    slot_event("city_location_coords", "+51.481845+7.216236/"),
+    slot_event("location_coords", "-12.34+123.456/"),
+    slot_event("location", "+1+1/"),
+    slot_event("location_coords", None),
+    slot_event("city_location_coords", "invalid"),
+    slot_event("location_coords", "-1-1/"),
+]
+
+MIGRATED = {
+    1: "+01.234-005.678/",
+    3: "+51.481845+007.216236/",
+    4: "-12.34+123.456/",
+    6: None,
+    7: "invalid",
+    8: "-01-001/",
+}
+
+
+def create_store(path):
+    connection = sqlite3.connect(str(path))
+    connection.execute(SCHEMA)
+    connection.executemany(
+        "INSERT INTO events (sender_id, type_name, timestamp, data) "
+        "VALUES ('27820001001', ?, 1.0, ?)",
+        [(e["event"], json.dumps(e)) for e in EVENTS],
+    )
+    connection.commit()
+    return connection
+
+
+def slot_values(connection):
+    return {
+        event_id: json.loads(data).get("value")
+        for event_id, data in connection.execute("SELECT id, data FROM events")
+        if event_id in MIGRATED
+    }
+
+
+def test_migrate(tmp_path):
+    """
+    Should fix the location slots in batches, and leave everything else alone
+    """
+    connection = create_store(tmp_path / "rasa.db")
+    checkpoint = str(tmp_path / "checkpoint")
+    batches = []
+    stats = migrate_locations.migrate(
+        connection, batch_size=2, checkpoint=checkpoint, progress=batches.append
+    )
+    assert stats == migrate_locations.Stats(last_id=8, scanned=6, updated=3, invalid=1)
+    assert [s.last_id for s in batches] == [3, 6, 8]
+    assert slot_values(connection) == MIGRATED
+    assert json.loads(connection.execute("SELECT data FROM events").fetchone()[0]) == {
+        **EVENTS[0],
+        "value": "+01.234-005.678/",
+    }
+    assert migrate_locations.read_checkpoint(checkpoint) == 8
+
+    # Running it again shouldn't change anything
+    stats = migrate_locations.migrate(connection)
+    assert stats.updated == 0
+
+
+def test_resume(tmp_path):
+    """
+    Should only migrate events after the checkpoint
+    """
+    path = tmp_path / "rasa.db"
+    create_store(path).close()
+    checkpoint = tmp_path / "checkpoint"
+    checkpoint.write_text("3")
+    migrate_locations.main(
+        [f"sqlite:///{path}", "--resume", "--checkpoint", str(checkpoint)]
+    )
+    values = slot_values(sqlite3.connect(str(path)))
+    assert values[1] == "+1.234-5.678/"
+    assert values[8] == "-01-001/"
+    assert checkpoint.read_text() == "8"
+
+
+def test_dry_run(tmp_path, capsys):
+    path = tmp_path / "rasa.db"
+    create_store(path).close()
+    checkpoint = tmp_path / "checkpoint"
+    migrate_locations.main(
+        [f"sqlite:///{path}", "--dry-run", "--checkpoint", str(checkpoint)]
+    )
+    assert "3 to update, 1 invalid" in capsys.readouterr().err
+    assert slot_values(sqlite3.connect(str(path)))[1] == "+1.234-5.678/"
+    assert not checkpoint.exists()
+
+
+def test_unsupported_url():
+    error = None
+    try:
+        migrate_locations.connect("mysql://localhost/rasa")
+    except ValueError as e:
+        error = e
+    assert error
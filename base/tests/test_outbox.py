@@ -0,0 +1,202 @@
+import asyncio
+import json
+
+import pytest
+from rasa_sdk.events import SlotSet
+from rasa_sdk.executor import CollectingDispatcher
+
+from base.actions import config, outbox
+from base.actions.actions import HealthCheckForm
+from base.actions.breaker import CircuitOpenError
+from base.actions.outbox import Outbox, OutboxFlusher
+from base.tests import utils
+from base.tests.fake_server import FakeServer, Response
+from base.tests.test_retry import FakeTimer, http_error
+
+
+class TestOutbox:
+    def test_claim(self, tmp_path):
+        """
+        Claimed messages should be leased, so that they aren't claimed again
+        """
+        timer = FakeTimer()
+        box = Outbox(str(tmp_path / "outbox.db"), lease=60, timer=timer)
+        box.put("/api/", {"id": 1})
+        box.put("/api/", {"id": 2})
+        [first] = box.claim(1)
+        assert first.payload == {"id": 1}
+        [second] = box.claim(10)
+        assert second.payload == {"id": 2}
+        assert box.claim(10) == []
+        assert len(box) == 2
+
+        timer.time = 60
+        assert len(box.claim(10)) == 2
+
+    def test_durable(self, tmp_path):
+        """
+        Messages should still be there after the outbox is reopened
+        """
+        path = str(tmp_path / "outbox.db")
+        box = Outbox(path)
+        box.put("/api/", {"id": 1})
+        box.close()
+        [message] = Outbox(path).claim(10)
+        assert message.payload == {"id": 1}
+
+    @pytest.mark.asyncio
+    async def test_put_async(self, tmp_path):
+        """
+        Messages written in the background should be claimable straight away
+        """
+        box = Outbox(str(tmp_path / "outbox.db"))
+        await box.put_async("/api/", {"id": 1})
+        await box.put_async("/api/", {"id": 2})
+        assert [m.payload for m in box.claim(10)] == [{"id": 1}, {"id": 2}]
+        box.close()
+
+    def test_retry_later(self, tmp_path):
+        timer = FakeTimer()
+        box = Outbox(str(tmp_path / "outbox.db"), max_attempts=2, timer=timer)
+        box.put("/api/", {"id": 1})
+        [message] = box.claim(10)
+        box.retry_later(message, "error", 10)
+        timer.time = 9
+        assert box.claim(10) == []
+        timer.time = 10
+        [message] = box.claim(10)
+        assert message.attempts == 1
+
+        box.retry_later(message, "error", 10)
+        assert len(box) == 0
+        [dead_letter] = box.dead_letters()
+        assert dead_letter["payload"] == {"id": 1}
+        assert dead_letter["attempts"] == 2
+        assert dead_letter["error"] == "error"
+
+
+class TestOutboxFlusher:
+    @pytest.mark.asyncio
+    async def test_flush(self, tmp_path):
+        box = Outbox(str(tmp_path / "outbox.db"))
+        sent = []
+
+        async def send(path, payload):
+            sent.append(payload["id"])
+
+        for i in range(5):
+            box.put("/api/", {"id": i})
+        await OutboxFlusher(box, send, batch_size=2).flush()
+        assert sorted(sent) == [0, 1, 2, 3, 4]
+        assert len(box) == 0
+
+    @pytest.mark.asyncio
+    async def test_concurrency(self, tmp_path):
+        """
+        Should have at most `concurrency` requests in flight
+        """
+        box = Outbox(str(tmp_path / "outbox.db"))
+        in_flight, max_in_flight = 0, 0
+
+        async def send(path, payload):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+
+        for i in range(10):
+            box.put("/api/", {"id": i})
+        await OutboxFlusher(box, send, batch_size=10, concurrency=3).flush()
+        assert max_in_flight == 3
+        assert len(box) == 0
+
+    @pytest.mark.asyncio
+    async def test_failures(self, tmp_path):
+        """
+        Retryable failures should be retried later, anything else dead lettered, and
+        messages that weren't sent because the breaker is open shouldn't count as an
+        attempt
+        """
+        box = Outbox(str(tmp_path / "outbox.db"))
+        errors = {
+            "retry": http_error(503),
+            "reject": http_error(400),
+            "open": CircuitOpenError("eventstore"),
+        }
+
+        async def send(path, payload):
+            raise errors[payload["id"]]
+
+        for i in errors:
+            box.put("/api/", {"id": i})
+        await OutboxFlusher(box, send).flush()
+
+        assert [d["payload"]["id"] for d in box.dead_letters()] == ["reject"]
+        attempts = dict(box.db.execute("SELECT payload, attempts FROM outbox"))
+        assert attempts == {
+            json.dumps({"id": "retry"}): 1,
+            json.dumps({"id": "open"}): 0,
+        }
+
+
+class TestSubmitToOutbox:
+    @pytest.mark.asyncio
+    async def test_submit(self, tmp_path):
+        """
+        Should return the risk to the user without waiting for the event store, and
+        send the submission in the background
+        """
+        form = HealthCheckForm()
+        tracker = utils.get_tracker_for_slot_from_intent(
+            form,
+            "tracing",
+            "affirm",
+            {
+                "province": "wc",
+                "age": "18-39",
+                "symptoms_fever": "no",
+                "symptoms_cough": "no",
+                "symptoms_sore_throat": "yes",
+                "symptoms_difficulty_breathing": "no",
+                "symptoms_taste_smell": "no",
+                "exposure": "not sure",
+                "tracing": "yes",
+                "gender": "RATHER NOT SAY",
+                "medical_condition": "not sure",
+                "city_location_coords": "+1.2-3.4",
+                "location_coords": "+3.4-1.2",
+                "location": "Cape Town, South Africa",
+            },
+        )
+
+        async with FakeServer() as server:
+            server.respond(Response(503), Response(201, {"id": "1"}))
+            config.EVENTSTORE_URL = server.url
+            config.EVENTSTORE_TOKEN = "token"
+            config.EVENTSTORE_OUTBOX_PATH = str(tmp_path / "outbox.db")
+
+            dispatcher = CollectingDispatcher()
+            actions = await form.submit(dispatcher, tracker, {})
+            assert actions == [SlotSet("study_a_arm", None)]
+            assert dispatcher.messages[0]["template"] == "utter_risk_moderate"
+
+            flusher = outbox.get_flusher()
+            flusher.backoff = 0
+            for _ in range(100):
+                if len(flusher.outbox) == 0:
+                    break
+                await asyncio.sleep(0.01)
+                flusher.wake()
+            await flusher.stop()
+
+            assert len(flusher.outbox) == 0
+            first, second = server.requests
+            assert first.path == second.path == "/api/v5/covid19triage/"
+            assert first.body == second.body
+            assert json.loads(second.body)["deduplication_id"]
+
+        config.EVENTSTORE_URL = None
+        config.EVENTSTORE_TOKEN = None
+        config.EVENTSTORE_OUTBOX_PATH = None
+        outbox._flusher = None
@@ -0,0 +1,75 @@
+from base.nlu.parsecache import ParseCache, model_fingerprint
+
+GREET = {"intent": {"name": "greet", "confidence": 0.9}, "entities": []}
+PROVINCE = {
+    "intent": {"name": "inform", "confidence": 0.8},
+    "entities": [{"entity": "province", "value": "gt", "start": 0, "end": 7}],
+}
+
+
+def test_normalised():
+    """
+    Texts that only differ by case or whitespace should share a parse
+    """
+    cache = ParseCache()
+    cache.use_model("model1")
+    cache.set("Hi ", GREET)
+    assert cache.get("hi") == GREET
+    assert cache.get("HI  ") == GREET
+    assert cache.get("hello") is None
+    assert cache.cache.hit_rate == 2 / 3
+
+
+def test_entities():
+    """
+    Parses with entities should only be returned for exactly the same text
+    """
+    cache = ParseCache()
+    cache.use_model("model1")
+    cache.set("gauteng", PROVINCE)
+    assert cache.get("gauteng") == PROVINCE
+    assert cache.get(" Gauteng") is None
+
+
+def test_copies():
+    cache = ParseCache()
+    cache.use_model("model1")
+    cache.set("gauteng", PROVINCE)
+    cache.get("gauteng")["entities"][0]["value"] = "changed"
+    assert cache.get("gauteng") == PROVINCE
+
+
+def test_new_model():
+    """
+    Loading a different model should clear the cache, but not loading the same one
+    """
+    cache = ParseCache()
+    cache.use_model("model1")
+    cache.set("hi", GREET)
+    cache.use_model("model1")
+    assert cache.get("hi") == GREET
+    cache.use_model("model2")
+    assert cache.get("hi") is None
+    assert len(cache.cache) == 0
+
+
+def test_lru():
+    cache = ParseCache(maxsize=2)
+    cache.use_model("model1")
+    cache.set("hi", GREET)
+    cache.set("hello", GREET)
+    cache.get("hi")
+    cache.set("hey", GREET)
+    assert cache.get("hello") is None
+    assert cache.get("hi") == GREET
+
+
+def test_model_fingerprint(tmp_path):
+    nlu = tmp_path / "nlu"
+    nlu.mkdir()
+    assert model_fingerprint(str(nlu), "20200101") == f"{nlu}:20200101"
+    (tmp_path / "fingerprint.json").write_text('{"config": "abc"}')
+    fingerprint = model_fingerprint(str(nlu), "20200101")
+    assert len(fingerprint) == 40
+    (tmp_path / "fingerprint.json").write_text('{"config": "def"}')
+    assert model_fingerprint(str(nlu), "20200101") != fingerprint
@@ -0,0 +1,140 @@
+import os
+
+import pytest
+from rasa_sdk import Tracker
+from rasa_sdk.executor import CollectingDispatcher
+
+from base.actions import config
+from base.actions.actions import HealthCheckProfileForm
+from base.actions.metrics import REGISTRY
+from base.actions.places import PlacesCache, normalize
+from base.tests import utils
+from base.tests.test_retry import FakeTimer
+
+CAPE_TOWN = {
+    "formatted_address": "Cape Town, South Africa",
+    "geometry": {"location": {"lat": 1.23, "lng": 4.56}},
+}
+
+
+def test_normalize():
+    assert normalize("  Cape   Town ") == "cape town"
+    assert normalize("SOWETO") == "soweto"
+
+
+class TestPlacesCache:
+    @pytest.mark.asyncio
+    async def test_lookup(self):
+        """
+        Should only look up each location once, and record the time saved
+        """
+        timer = FakeTimer()
+        cache = PlacesCache(timer=timer)
+        lookups = []
+
+        async def lookup():
+            lookups.append(1)
+            timer.time += 0.5
+            return CAPE_TOWN
+
+        saved = REGISTRY.get("places_cache_saved_seconds_total")
+        before = saved.get()
+        assert await cache.lookup("wc", "Cape Town", lookup) == CAPE_TOWN
+        assert await cache.lookup("wc", " cape  town", lookup) == CAPE_TOWN
+        assert len(lookups) == 1
+        assert saved.get() - before == 0.5
+
+        # Different provinces have different location bias, so different results
+        await cache.lookup("gt", "Cape Town", lookup)
+        assert len(lookups) == 2
+
+    @pytest.mark.asyncio
+    async def test_no_results(self):
+        """
+        Shouldn't cache locations that weren't found
+        """
+        cache = PlacesCache()
+        lookups = []
+
+        async def lookup():
+            lookups.append(1)
+            return None
+
+        assert await cache.lookup("wc", "asdf", lookup) is None
+        assert await cache.lookup("wc", "asdf", lookup) is None
+        assert len(lookups) == 2
+
+    def test_save_load(self, tmp_path):
+        """
+        Should save the unexpired entries, with their remaining TTL
+        """
+        path = str(tmp_path / "places.jsonl")
+        timer = FakeTimer()
+        cache = PlacesCache(ttl=100, timer=timer)
+        cache.set("wc", "Cape Town", CAPE_TOWN)
+        timer.time = 60
+        cache.set("gt", "Soweto", {"formatted_address": "Soweto"})
+        cache.cache.set(("gt", "expired"), {}, ttl=10)
+        timer.time = 80
+        cache.save(path)
+
+        timer = FakeTimer()
+        loaded = PlacesCache(ttl=100, timer=timer)
+        assert loaded.load(path) == 2
+        assert loaded.get("wc", "cape town") == CAPE_TOWN
+        timer.time = 20
+        assert loaded.get("wc", "cape town") is None
+        assert loaded.get("gt", "soweto") == {"formatted_address": "Soweto"}
+
+    def test_save_concurrently(self, tmp_path):
+        """
+        Each worker should save to its own temporary file, so that workers saving at
+        the same time don't mix their entries
+        """
+        path = tmp_path / "places.jsonl"
+        # Another worker that's in the middle of saving
+        other = tmp_path / "places.jsonl.tmp"
+        other.write_text("in progress")
+        cache = PlacesCache()
+        cache.set("wc", "Cape Town", CAPE_TOWN)
+        cache.save(str(path))
+
+        assert other.read_text() == "in progress"
+        assert PlacesCache().load(str(path)) == 1
+        assert sorted(os.listdir(str(tmp_path))) == [path.name, other.name]
+
+    def test_load_missing(self, tmp_path):
+        assert PlacesCache().load(str(tmp_path / "missing.jsonl")) == 0
+
+    def test_load_invalid(self, tmp_path):
+        path = tmp_path / "places.jsonl"
+        path.write_text("invalid\n")
+        assert PlacesCache().load(str(path)) == 0
+
+
+@pytest.mark.asyncio
+async def test_validate_location_cached():
+    """
+    Should only look up the same location with Google Places once
+    """
+    config.GOOGLE_PLACES_API_KEY = "test_key"
+    form = HealthCheckProfileForm()
+    form.places_lookup = utils.AsyncMock()
+    form.places_lookup.return_value = CAPE_TOWN
+
+    for text in ["Cape Town", "cape town "]:
+        tracker = Tracker(
+            "default",
+            {"requested_slot": "location", "province": "wc"},
+            {"text": text},
+            [{"event": "user", "metadata": {}}],
+            False,
+            None,
+            {},
+            "action_listen",
+        )
+        result = await form.validate_location(text, CollectingDispatcher(), tracker, {})
+        assert result["location"] == "Cape Town, South Africa"
+
+    assert form.places_lookup.call_count == 1
+    config.GOOGLE_PLACES_API_KEY = None
@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from base.actions.metrics import REGISTRY
+from base.actions.prefetch import Prefetcher
+
+
+def counting(result="ok", delay=0.01, error=None):
+    calls = []
+
+    async def func():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return result
+
+    func.calls = calls
+    return func
+
+
+class TestPrefetcher:
+    @pytest.mark.asyncio
+    async def test_prefetch(self):
+        """
+        The result of the background request should be returned, and only one
+        request made for each key
+        """
+        prefetcher = Prefetcher("test_prefetch")
+        func = counting()
+        assert prefetcher.start("key", func)
+        assert not prefetcher.start("key", func)
+        await asyncio.sleep(0.02)
+        assert await prefetcher.get("key") == "ok"
+        assert len(func.calls) == 1
+        requests = REGISTRY.get("prefetch_requests_total")
+        assert requests.get(name="test_prefetch", result="hit") == 1
+
+        # Once the result has been used, it should be forgotten
+        assert await prefetcher.get("key") is None
+        assert requests.get(name="test_prefetch", result="miss") == 1
+
+    @pytest.mark.asyncio
+    async def test_in_flight(self):
+        """
+        If the result isn't ready yet, we should wait for it, rather than making the
+        request again
+        """
+        prefetcher = Prefetcher("test_prefetch_in_flight")
+        func = counting(delay=0.1)
+        prefetcher.start("key", func)
+        assert await prefetcher.get("key") == "ok"
+        assert len(func.calls) == 1
+        requests = REGISTRY.get("prefetch_requests_total")
+        assert requests.get(name="test_prefetch_in_flight", result="wait") == 1
+
+    @pytest.mark.asyncio
+    async def test_error(self):
+        """
+        If the request fails, None should be returned, and a new request can be
+        started
+        """
+        prefetcher = Prefetcher("test_prefetch_error")
+        func = counting(error=ValueError())
+        prefetcher.start("key", func)
+        await asyncio.sleep(0.02)
+        assert prefetcher.start("key", func)
+        assert await prefetcher.get("key") is None
+        assert len(func.calls) == 2
+        requests = REGISTRY.get("prefetch_requests_total")
+        assert requests.get(name="test_prefetch_error", result="error") == 1
+
+    @pytest.mark.asyncio
+    async def test_cancelled(self):
+        """
+        If the request was cancelled, a new request can be started
+        """
+        prefetcher = Prefetcher("test_prefetch_cancelled")
+        func = counting(delay=10)
+        prefetcher.start("key", func)
+        await asyncio.sleep(0)
+        prefetcher._tasks.get((asyncio.get_event_loop(), "key")).cancel()
+        assert await prefetcher.get("key") is None
+
+        prefetcher.start("key", func)
+        await asyncio.sleep(0)
+        prefetcher._tasks.get((asyncio.get_event_loop(), "key")).cancel()
+        await asyncio.sleep(0)
+        assert prefetcher.start("key", counting())
+        assert await prefetcher.get("key") == "ok"
+
+    def test_no_event_loop(self):
+        """
+        Without a running event loop, nothing should be started
+        """
+        prefetcher = Prefetcher("test")
+        func = counting()
+        assert not prefetcher.start("key", func)
+        assert func.calls == []
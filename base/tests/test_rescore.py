@@ -0,0 +1,106 @@
+import io
+import json
+import sys
+from itertools import product
+
+import pytest
+
+from base.actions import rescore
+from base.actions.utils import get_risk_level
+
+EXPOSURES = ["yes", "no", "not_sure"]
+AGES = ["<18", "18-40", "40-65", ">65"]
+TRACKER_AGES = {"<18": "<18", "18-40": "18-39", "40-65": "40-65", ">65": ">65"}
+
+
+def all_rows():
+    """
+    Every combination of the event store fields that the risk level depends on
+    """
+    for symptoms in product([True, False], repeat=len(rescore.SYMPTOMS)):
+        for exposure, age in product(EXPOSURES, AGES):
+            row = dict(zip(rescore.SYMPTOMS, symptoms))
+            row.update({"exposure": exposure, "age": age})
+            yield row
+
+
+def expected_risk(row):
+    data = {f"symptoms_{s}": "yes" if row[s] else "no" for s in rescore.SYMPTOMS}
+    data["exposure"] = "not sure" if row["exposure"] == "not_sure" else row["exposure"]
+    data["age"] = TRACKER_AGES[row["age"]]
+    return get_risk_level(data)
+
+
+@pytest.fixture(params=[True, False], ids=["numpy", "python"])
+def use_numpy(request):
+    if request.param and rescore.numpy is None:
+        pytest.skip("NumPy is not installed")
+    return request.param
+
+
+class TestScore:
+    def test_same_as_get_risk_level(self, use_numpy):
+        """
+        Should give the same risk level as get_risk_level, for every combination
+        """
+        rows = list(all_rows())
+        risks = rescore.score(rescore.columns_from_rows(rows), use_numpy)
+        assert list(risks) == [expected_risk(row) for row in rows]
+
+    def test_csv_values(self):
+        """
+        Booleans from CSV exports should be parsed
+        """
+        rows = [
+            {"fever": "true", "cough": "t", "smell": "True", "exposure": "no"},
+            {"fever": "false", "cough": "f", "smell": "", "exposure": "yes"},
+        ]
+        assert rescore.score(rescore.columns_from_rows(rows), False) == [
+            "high",
+            "moderate",
+        ]
+
+    def test_numpy_arrays(self):
+        if rescore.numpy is None:
+            pytest.skip("NumPy is not installed")
+        numpy = rescore.numpy
+        columns = rescore.Columns(
+            symptoms=numpy.array([0, 2, 2, 5]),
+            exposure=numpy.array([True, False, False, False]),
+            over_65=numpy.array([False, False, True, False]),
+        )
+        assert list(rescore.score(columns)) == ["moderate", "moderate", "high", "high"]
+
+
+class TestRescore:
+    def test_chunks(self, use_numpy):
+        """
+        Should yield every row, in order, however they're chunked
+        """
+        rows = list(all_rows())
+        result = list(rescore.rescore(rows, chunk_size=7, use_numpy=use_numpy))
+        assert [row for row, _ in result] == rows
+        assert [risk for _, risk in result] == [expected_risk(row) for row in rows]
+
+    def run(self, monkeypatch, capsys, stdin, *args):
+        monkeypatch.setattr(sys, "stdin", io.StringIO(stdin))
+        rescore.main(list(args))
+        return capsys.readouterr()
+
+    def test_cli_csv(self, monkeypatch, capsys):
+        stdin = "id,fever,cough,exposure,age,risk\n1,True,True,yes,>65,low\n"
+        output = self.run(monkeypatch, capsys, stdin, "--chunk-size", "1")
+        assert output.out.splitlines() == [
+            "id,fever,cough,exposure,age,risk,rescored_risk",
+            "1,True,True,yes,>65,low,high",
+        ]
+        assert "Rescored 1 rows" in output.err
+        assert "1 changed" in output.err
+
+    def test_cli_jsonl(self, monkeypatch, capsys):
+        rows = [{"id": 1, "fever": False, "exposure": "no", "risk": "low"}] * 3
+        stdin = "".join(json.dumps(row) + "\n" for row in rows)
+        output = self.run(monkeypatch, capsys, stdin, "--format", "jsonl")
+        lines = [json.loads(line) for line in output.out.splitlines()]
+        assert lines == [dict(row, rescored_risk="low") for row in rows]
+        assert "0 changed" in output.err
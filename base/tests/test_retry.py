@@ -0,0 +1,210 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import httpx
+import pytest
+
+from base.actions.deadline import Deadline
+from base.actions.metrics import REGISTRY
+from base.actions.retry import RetryBudget, RetryPolicy, is_retryable, retry_after
+
+
+def http_error(status_code, headers=None):
+    response = httpx.Response(status_code, headers=headers or {})
+    return httpx.HTTPError("error", response=response)
+
+
+class FakeSleep:
+    def __init__(self):
+        self.delays = []
+
+    async def __call__(self, delay):
+        self.delays.append(delay)
+
+
+class FakeTimer:
+    def __init__(self):
+        self.time = 0.0
+
+    def __call__(self):
+        return self.time
+
+
+def failing(*errors, result="ok"):
+    """
+    Returns a function that raises each of `errors` in turn, then returns `result`
+    """
+    errors = list(errors)
+    calls = []
+
+    async def func():
+        calls.append(1)
+        if errors:
+            raise errors.pop(0)
+        return result
+
+    func.calls = calls
+    return func
+
+
+def test_is_retryable():
+    assert is_retryable(httpx.ReadTimeout(""))
+    assert is_retryable(ConnectionRefusedError())
+    assert is_retryable(http_error(503))
+    assert is_retryable(http_error(429))
+    assert not is_retryable(http_error(400))
+    assert not is_retryable(http_error(404))
+    assert not is_retryable(KeyError("predictions"))
+    assert not is_retryable(ValueError())
+
+
+def test_retry_after():
+    assert retry_after(http_error(503)) is None
+    assert retry_after(http_error(503, {"Retry-After": "2"})) == 2
+    assert retry_after(http_error(503, {"Retry-After": "invalid"})) is None
+    date = datetime.now(timezone.utc) + timedelta(seconds=30)
+    seconds = retry_after(http_error(503, {"Retry-After": format_datetime(date)}))
+    assert 28 < seconds <= 30
+    assert retry_after(ValueError()) is None
+
+
+class TestRetryBudget:
+    def test_minimum(self):
+        """
+        Should allow the minimum number of retries even if there are no requests
+        """
+        budget = RetryBudget(ratio=0.1, minimum=2, timer=FakeTimer())
+        assert budget.try_retry()
+        assert budget.try_retry()
+        assert not budget.try_retry()
+
+    def test_ratio(self):
+        """
+        Should allow retries for the ratio of requests
+        """
+        budget = RetryBudget(ratio=0.1, minimum=0, timer=FakeTimer())
+        for _ in range(20):
+            budget.record_request()
+        assert budget.try_retry()
+        assert budget.try_retry()
+        assert not budget.try_retry()
+
+    def test_window(self):
+        """
+        Retries outside of the window shouldn't count against the budget
+        """
+        timer = FakeTimer()
+        budget = RetryBudget(ratio=0.1, minimum=1, window=10, timer=timer)
+        assert budget.try_retry()
+        assert not budget.try_retry()
+        timer.time = 10
+        assert budget.try_retry()
+
+
+class TestRetryPolicy:
+    @pytest.mark.asyncio
+    async def test_success(self):
+        sleep = FakeSleep()
+        policy = RetryPolicy(attempts=3, sleep=sleep)
+        func = failing(httpx.ReadTimeout(""), http_error(502))
+        assert await policy.call("test", func) == "ok"
+        assert len(func.calls) == 3
+        assert len(sleep.delays) == 2
+
+    @pytest.mark.asyncio
+    async def test_attempts(self):
+        """
+        Should raise the last error once all attempts have failed
+        """
+        policy = RetryPolicy(attempts=2, sleep=FakeSleep())
+        last_error = http_error(500)
+        func = failing(http_error(500), last_error)
+        error = None
+        try:
+            await policy.call("test", func)
+        except httpx.HTTPError as e:
+            error = e
+        assert error is last_error
+        assert len(func.calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_not_retryable(self):
+        """
+        Errors that aren't retryable should be raised immediately
+        """
+        policy = RetryPolicy(attempts=3, sleep=FakeSleep())
+        func = failing(http_error(400))
+        error = None
+        try:
+            await policy.call("test", func)
+        except httpx.HTTPError as e:
+            error = e
+        assert error
+        assert len(func.calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_backoff(self):
+        """
+        Should back off exponentially, with jitter, up to the maximum
+        """
+        sleep = FakeSleep()
+        policy = RetryPolicy(attempts=6, backoff=0.1, max_backoff=0.5, sleep=sleep)
+        func = failing(*[httpx.ReadTimeout("") for _ in range(5)])
+        await policy.call("test", func)
+        for delay, maximum in zip(sleep.delays, [0.1, 0.2, 0.4, 0.5, 0.5]):
+            assert 0 <= delay <= maximum
+
+    @pytest.mark.asyncio
+    async def test_retry_after(self):
+        """
+        Should wait for as long as the server asks, but give up if that's too long
+        """
+        sleep = FakeSleep()
+        policy = RetryPolicy(attempts=3, max_backoff=2, sleep=sleep)
+        func = failing(http_error(429, {"Retry-After": "1"}))
+        await policy.call("test", func)
+        assert sleep.delays == [1]
+
+        func = failing(http_error(503, {"Retry-After": "120"}))
+        error = None
+        try:
+            await policy.call("test", func)
+        except httpx.HTTPError as e:
+            error = e
+        assert error
+        assert len(func.calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_deadline(self):
+        """
+        Shouldn't retry if the deadline would pass before the next attempt
+        """
+        timer = FakeTimer()
+        policy = RetryPolicy(attempts=3, max_backoff=2, sleep=FakeSleep())
+        func = failing(http_error(429, {"Retry-After": "1"}))
+        error = None
+        try:
+            await policy.call("test", func, Deadline(0.5, timer=timer))
+        except httpx.HTTPError as e:
+            error = e
+        assert error
+        assert len(func.calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_budget(self):
+        """
+        Shouldn't retry once the budget is used up
+        """
+        budget = RetryBudget(ratio=0, minimum=1, timer=FakeTimer())
+        policy = RetryPolicy(attempts=3, budget=budget, sleep=FakeSleep())
+        func = failing(*[httpx.ReadTimeout("") for _ in range(3)])
+        error = None
+        try:
+            await policy.call("budget_test", func)
+        except httpx.HTTPError as e:
+            error = e
+        assert error
+        assert len(func.calls) == 2
+        abandoned = REGISTRY.get("http_retries_abandoned_total")
+        assert abandoned.get(upstream="budget_test", reason="budget") == 1
+        assert REGISTRY.get("http_retries_total").get(upstream="budget_test") == 1
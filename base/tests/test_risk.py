@@ -0,0 +1,29 @@
+from itertools import product
+
+from base.actions import risk, utils
+
+
+def test_every_combination():
+    """
+    The table should give the same risk level as get_risk_level, for every
+    combination of answers
+    """
+    for symptoms in product(["yes", "no"], repeat=len(risk.SYMPTOMS)):
+        for exposure in ["yes", "no", "not sure"]:
+            for age in ["<18", "18-39", "40-65", ">65"]:
+                answers = dict(zip(risk.SYMPTOMS, symptoms))
+                answers.update({"exposure": exposure, "age": age})
+                assert risk.get_risk_level(answers) == utils.get_risk_level(answers)
+
+
+def test_pack():
+    assert risk.pack({}) == 0
+    assert risk.pack({"symptoms_fever": "yes", "symptoms_cough": "no"}) == 0b1
+    assert risk.pack({"symptoms_taste_smell": "yes"}) == 0b10000
+    assert risk.pack({"exposure": "yes", "age": ">65"}) == 0b1100000
+    assert len(risk.TABLE) == 0b10000000
+
+
+def test_ignores_other_slots():
+    answers = {"exposure": "no", "age": "18-39", "medical_condition": "yes"}
+    assert risk.get_risk_level(answers) == "low"
@@ -0,0 +1,72 @@
+import json
+
+import rasa_sdk
+
+from base.actions import codec
+from base.actions.server import create_app, parse_args
+
+app = create_app("base.actions.actions")
+
+
+def action_call(action, slots=None):
+    return {
+        "next_action": action,
+        "version": rasa_sdk.__version__,
+        "sender_id": "27820001001",
+        "tracker": {
+            "sender_id": "27820001001",
+            "slots": slots or {},
+            "latest_message": {},
+            "events": [],
+            "paused": False,
+        },
+        "domain": {},
+    }
+
+
+class TestServer:
+    def test_webhook(self):
+        """
+        Should decode the action call and encode the response with our codec
+        """
+        _, response = app.test_client.post(
+            "/webhook",
+            data=codec.dumps(action_call("action_session_start", {"terms": "yes"})),
+        )
+        assert response.status == 200
+        assert response.headers["content-type"] == "application/json"
+        body = json.loads(response.body)
+        assert body["responses"] == []
+        assert {"event": "session_started", "timestamp": None} in body["events"]
+
+    def test_webhook_invalid_body(self):
+        _, response = app.test_client.post("/webhook", data="{invalid")
+        assert response.status == 400
+        assert json.loads(response.body) == {"error": "Invalid body request"}
+
+    def test_webhook_unknown_action(self):
+        _, response = app.test_client.post(
+            "/webhook", data=codec.dumps(action_call("action_unknown"))
+        )
+        assert response.status == 404
+        assert json.loads(response.body)["action_name"] == "action_unknown"
+
+    def test_health(self):
+        _, response = app.test_client.get("/health")
+        assert response.status == 200
+        assert json.loads(response.body) == {"status": "ok"}
+
+    def test_actions(self):
+        _, response = app.test_client.get("/actions")
+        assert {"name": "action_send_study_a_message"} in json.loads(response.body)
+
+
+def test_parse_args():
+    """
+    Should accept the arguments for the rasa_sdk image's entrypoint, with or without
+    the start command
+    """
+    for argv in (["start", "--actions", "hh.actions"], ["--actions", "hh.actions"]):
+        args = parse_args(argv + ["--port", "5056"])
+        assert args.actions == "hh.actions"
+        assert args.port == 5056
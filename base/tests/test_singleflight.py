@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+from rasa_sdk import Tracker
+from rasa_sdk.executor import CollectingDispatcher
+
+from base.actions import config
+from base.actions.actions import HealthCheckProfileForm
+from base.actions.metrics import REGISTRY
+from base.actions.singleflight import SingleFlight
+from base.tests.fake_server import FakeServer, Response
+
+
+def counting(result="ok", delay=0.01, error=None):
+    calls = []
+
+    async def func():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return result
+
+    func.calls = calls
+    return func
+
+
+class TestSingleFlight:
+    @pytest.mark.asyncio
+    async def test_coalesce(self):
+        """
+        Concurrent calls with the same key should share one call
+        """
+        flight = SingleFlight("test_coalesce")
+        func = counting()
+        results = await asyncio.gather(*(flight.do("key", func) for _ in range(10)))
+        assert results == ["ok"] * 10
+        assert len(func.calls) == 1
+        assert len(flight) == 0
+        coalesced = REGISTRY.get("singleflight_coalesced_total")
+        assert coalesced.get(name="test_coalesce") == 9
+
+        # Once the call is done, the next call with the key should make a new call
+        await flight.do("key", func)
+        assert len(func.calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_different_keys(self):
+        flight = SingleFlight("test")
+        func = counting()
+        await asyncio.gather(flight.do("a", func), flight.do("b", func))
+        assert len(func.calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_error(self):
+        """
+        All the callers should get the error
+        """
+        flight = SingleFlight("test")
+        func = counting(error=ValueError())
+        results = await asyncio.gather(
+            flight.do("key", func), flight.do("key", func), return_exceptions=True
+        )
+        assert [type(r) for r in results] == [ValueError, ValueError]
+        assert len(func.calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller(self):
+        """
+        If one of the callers is cancelled, the others should still get the result
+        """
+        flight = SingleFlight("test")
+        func = counting(delay=0.05)
+        first = asyncio.ensure_future(flight.do("key", func))
+        second = asyncio.ensure_future(flight.do("key", func))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert await second == "ok"
+        assert first.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_validate_location_burst():
+    """
+    A burst of users sending the same location should only make one lookup
+    """
+    config.GOOGLE_PLACES_API_KEY = "test_key"
+
+    def google_places(request):
+        if "autocomplete" in request.path:
+            return Response(body={"predictions": [{"place_id": "placeid"}]}, delay=0.05)
+        return Response(
+            body={
+                "result": {
+                    "formatted_address": "Soweto, South Africa",
+                    "geometry": {"location": {"lat": 1.23, "lng": 4.56}},
+                }
+            }
+        )
+
+    async def validate(text):
+        tracker = Tracker(
+            "default",
+            {"requested_slot": "location", "province": "gt"},
+            {"text": text},
+            [{"event": "user", "metadata": {}}],
+            False,
+            None,
+            {},
+            "action_listen",
+        )
+        return await HealthCheckProfileForm().validate_location(
+            text, CollectingDispatcher(), tracker, {}
+        )
+
+    async with FakeServer(google_places) as server:
+        config.GOOGLE_PLACES_URL = server.url
+        results = await asyncio.gather(
+            *(validate(text) for text in ["Soweto", "soweto", " SOWETO "] * 20)
+        )
+        assert {r["location"] for r in results} == {"Soweto, South Africa"}
+        assert len(server.requests) == 2
+
+    config.GOOGLE_PLACES_URL = "https://maps.googleapis.com/"
+    config.GOOGLE_PLACES_API_KEY = None
@@ -0,0 +1,175 @@
+import os
+from unittest import mock
+
+from rasa_sdk import Tracker
+from rasa_sdk.executor import CollectingDispatcher
+
+from base.actions import slots
+from base.actions.actions import (
+    BaseFormAction,
+    HealthCheckForm,
+    HealthCheckProfileForm,
+    HealthCheckTermsForm,
+)
+from base.actions.lookups import LookupTableRegistry
+from base.actions.slots import (
+    YES_NO,
+    Choices,
+    Entity,
+    LookupChoices,
+    SlotSchema,
+    compile_mappings,
+    schema,
+    validate_choice,
+)
+
+tracker = Tracker("default", {}, {}, [], False, None, {}, "action_listen")
+
+
+class TestChoices:
+    def test_label(self):
+        """
+        Labels should be matched case insensitively, and returned as given
+        """
+        choices = Choices.from_mapping({1: "yes", 2: "not sure"})
+        dispatcher = CollectingDispatcher()
+        assert validate_choice("slot", dispatcher, "Not Sure", choices) == {
+            "slot": "Not Sure"
+        }
+        assert dispatcher.messages == []
+
+    def test_number(self):
+        choices = Choices.from_mapping({1: "yes", 2: "no"})
+        dispatcher = CollectingDispatcher()
+        assert validate_choice("slot", dispatcher, "2", choices) == {"slot": "no"}
+        assert validate_choice("slot", dispatcher, " 1 ", choices) == {"slot": "yes"}
+        assert dispatcher.messages == []
+
+    def test_invalid(self):
+        choices = Choices.from_mapping({1: "yes", 2: "no"})
+        for value in ["3", "0", "maybe", "", None, 1]:
+            dispatcher = CollectingDispatcher()
+            assert validate_choice("slot", dispatcher, value, choices) == {"slot": None}
+            [message] = dispatcher.messages
+            assert message["template"] == "utter_incorrect_selection"
+
+    def test_no_labels(self):
+        """
+        If labels aren't accepted, only numbers should be
+        """
+        dispatcher = CollectingDispatcher()
+        result = validate_choice("slot", dispatcher, "yes", YES_NO, False)
+        assert result == {"slot": None}
+
+    def test_immutable(self):
+        error = None
+        try:
+            YES_NO.values[3] = "maybe"  # type: ignore
+        except TypeError as e:
+            error = e
+        assert error
+
+
+class TestLookupChoices:
+    def test_reload(self, tmp_path):
+        """
+        Should be recompiled when the lookup table changes, and not otherwise
+        """
+        path = tmp_path / "base" / "data" / "lookup_tables" / "ages.txt"
+        path.parent.mkdir(parents=True)
+        path.write_text("<18\n18-39\n")
+        registry = LookupTableRegistry(root=tmp_path, reload_interval=0)
+        with mock.patch.object(slots, "lookup_tables", registry):
+            ages = LookupChoices("base", "ages")
+            choices = ages.get()
+            assert dict(choices.values) == {1: "<18", 2: "18-39"}
+            assert "18-39" in choices.labels
+            assert ages.get() is choices
+
+            path.write_text("<18\n18-39\n40-65\n")
+            os.utime(path, (0, 0))
+            assert ages.get().values[3] == "40-65"
+
+
+class TestSchema:
+    def test_mappings(self):
+        """
+        The compiled mappings should be the same as the FormAction helpers give
+        """
+        form = HealthCheckProfileForm()
+        slot = SlotSchema(
+            "province",
+            entities=(Entity("number"), Entity("province", intent="inform")),
+            intents={"affirm": "yes"},
+        )
+        assert compile_mappings(slot) == [
+            form.from_entity(entity="number"),
+            form.from_entity(intent="inform", entity="province"),
+            form.from_intent(intent="affirm", value="yes"),
+            form.from_text(),
+        ]
+        assert compile_mappings(SlotSchema("location", entities=())) == [
+            form.from_text()
+        ]
+
+    def test_form_mappings(self):
+        """
+        The forms' mappings should be compiled once, for every slot in the schema
+        """
+        for form in [HealthCheckTermsForm(), HealthCheckProfileForm()]:
+            mappings = form.slot_mappings()
+            assert set(mappings) == set(form.SLOT_SCHEMA)
+            assert form.slot_mappings() is mappings
+        assert HealthCheckForm().slot_mappings()["exposure"] == [
+            HealthCheckForm().from_entity(entity="number"),
+            HealthCheckForm().from_intent(intent="affirm", value="yes"),
+            HealthCheckForm().from_intent(intent="deny", value="no"),
+            HealthCheckForm().from_intent(intent="maybe", value="not sure"),
+            HealthCheckForm().from_text(),
+        ]
+
+    def test_generated_validators(self):
+        """
+        Slots with choices should get a validate method, unless the form has its own
+        """
+        form = HealthCheckForm()
+        for slot in form.SLOTS:
+            assert getattr(form, f"validate_{slot}").__name__ == f"validate_{slot}"
+        assert not hasattr(HealthCheckProfileForm, "validate_first_name")
+        assert "validate_terms" in HealthCheckTermsForm.__dict__
+
+        dispatcher = CollectingDispatcher()
+        result = form.validate_exposure("3", dispatcher, tracker, {})
+        assert result == {"exposure": "not sure"}
+
+    def test_inherited_validators(self):
+        """
+        Redeclaring the schema in a subclass should keep inherited hand written
+        validators, but replace generated ones
+        """
+
+        class Form(BaseFormAction):
+            SLOT_SCHEMA = schema(SlotSchema("a", YES_NO), SlotSchema("b", YES_NO))
+
+            def validate_a(self, value, dispatcher, tracker, domain):
+                return {"a": "hand written"}
+
+        class SubForm(Form):
+            SLOT_SCHEMA = schema(
+                SlotSchema("a", YES_NO), SlotSchema("b", Choices.from_mapping({1: "x"}))
+            )
+
+        dispatcher = CollectingDispatcher()
+        assert SubForm().validate_a("1", dispatcher, tracker, {}) == {
+            "a": "hand written"
+        }
+        assert SubForm().validate_b("1", dispatcher, tracker, {}) == {"b": "x"}
+        assert Form().validate_b("1", dispatcher, tracker, {}) == {"b": "yes"}
+
+    def test_post_hook(self):
+        form = HealthCheckProfileForm()
+        dispatcher = CollectingDispatcher()
+        result = form.validate_age("<18", dispatcher, tracker, {})
+        assert result == {"age": "<18", "location": "<not collected>"}
+        result = form.validate_location_confirm("2", dispatcher, tracker, {})
+        assert result == {"location_confirm": None, "location": None}
@@ -45,3 +45,20 @@ def test_risk_level():
     }
     risk = utils.get_risk_level(data)
     assert risk == "high"
+
+
+def test_fix_location_format_canonical():
+    """
+    Locations that are already formatted correctly should be returned as is, and
+    anything that format_location would change should be reformatted
+    """
+    for location in ["+01.234-005.678/", "-12.34+123.456/", "+00+000/", "-01-001/"]:
+        assert utils.CANONICAL_LOCATION_REGEX.match(location)
+        assert utils.fix_location_format(location) == location
+    for location, fixed in [
+        ("+01.230-005.678/", "+01.23-005.678/"),
+        ("-00.5+000.5/", "+00.5+000.5/"),
+        ("+1.234-5.678/", "+01.234-005.678/"),
+    ]:
+        assert not utils.CANONICAL_LOCATION_REGEX.match(location)
+        assert utils.fix_location_format(location) == fixed
@@ -0,0 +1,48 @@
+"""
+Compares building the campus menu on every call, to the precomputed menus, for the
+institution with the most campuses.
+
+    python -m benchmarks.bench_campus_menus
+"""
+import timeit
+
+from base.actions import config
+from hh.actions.institutions import load_institutions
+from hh.actions.menus import build_campus_menus, make_list
+
+institutions = load_institutions()
+province, university = max(
+    ((p, u) for p in institutions.provinces() for u in institutions.universities(p)),
+    key=lambda key: len(institutions.campuses(*key)),
+)
+menus = build_campus_menus(institutions, config.CAMPUS_MENU_PAGE_SIZE)
+
+
+def per_call():
+    items = {
+        i: v
+        for i, v in enumerate(sorted(institutions.campuses(province, university)), 1)
+    }
+    return items, make_list(items)
+
+
+def precomputed():
+    menu = menus[(province, university)]
+    return menu.items, menu.pages[0]
+
+
+def report(name, func, number):
+    seconds = min(timeit.repeat(func, number=number, repeat=5)) / number
+    print(f"{name:<20} {seconds * 1e6:>12.2f} µs/call")
+
+
+if __name__ == "__main__":
+    campuses = len(institutions.campuses(province, university))
+    print(f"{university} ({province}): {campuses} campuses")
+    report("per call", per_call, 10000)
+    report("precomputed", precomputed, 10000)
+    report(
+        "build all menus",
+        lambda: build_campus_menus(institutions, config.CAMPUS_MENU_PAGE_SIZE),
+        10,
+    )
@@ -0,0 +1,59 @@
+"""
+Measures clean_data/get_classification.py against a local stand-in for the Rasa parse
+endpoint, classifying the messages one at a time like it used to, and concurrently.
+
+    python -m benchmarks.bench_classification
+"""
+import asyncio
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+from base.tests.fake_server import FakeServer, Request, Response
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "clean_data"))
+import get_classification  # noqa: E402 isort:skip
+
+MESSAGES = 1000
+LATENCY = 0.02
+CONCURRENCY = (1, 4, 16, 64)
+
+
+def parse(request: Request) -> Response:
+    text = json.loads(request.body)["text"]
+    confidence = random.Random(text).random()
+    return Response(
+        200,
+        {"text": text, "intent": {"name": "greet", "confidence": confidence}},
+        delay=LATENCY,
+    )
+
+
+async def run(concurrency):
+    rows = [[f"message {i}"] for i in range(MESSAGES)]
+    lowest = get_classification.Lowest(100)
+    async with FakeServer(parse) as server:
+        start = time.monotonic()
+        await get_classification.classify_all(
+            rows, lowest, f"{server.url}/model/parse", concurrency=concurrency
+        )
+        return time.monotonic() - start, lowest.results()
+
+
+def main():
+    print(f"{MESSAGES} messages, {LATENCY * 1000:.0f}ms parse latency")
+    expected = None
+    for concurrency in CONCURRENCY:
+        seconds, results = asyncio.run(run(concurrency))
+        expected = expected or results
+        assert results == expected
+        print(
+            f"  concurrency {concurrency:>3}: {seconds:.2f}s, "
+            f"{MESSAGES / seconds:.0f} messages/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Measures the event store client against a local stand-in server, making the triage
+start and study B arm requests for each user one after the other, and concurrently.
+
+    python -m benchmarks.bench_eventstore
+"""
+import asyncio
+import time
+
+from base.actions import config
+from base.actions.eventstore import STUDY_B_ARM, TRIAGE_START, eventstore
+from base.actions.metrics import REGISTRY
+from base.tests.fake_server import FakeEventStore, FakeServer
+
+USERS = 200
+LATENCY = 0.05
+
+
+async def sequential(data):
+    await eventstore.start_triage(data)
+    await eventstore.assign_study_b_arm(data)
+
+
+async def concurrent(data):
+    await asyncio.gather(
+        eventstore.start_triage(data), eventstore.assign_study_b_arm(data)
+    )
+
+
+async def run(user):
+    async with FakeServer(FakeEventStore(latency=LATENCY)) as server:
+        config.EVENTSTORE_URL = server.url
+        config.EVENTSTORE_TOKEN = "token"
+        start = time.monotonic()
+        for i in range(USERS):
+            await user({"msisdn": f"+2782000{i:04d}", "province": "ZA-GT"})
+        return (time.monotonic() - start) / USERS
+
+
+def main():
+    loop = asyncio.get_event_loop()
+    print(f"{USERS} users, {LATENCY * 1000:.0f}ms per request")
+    for name, user in [("sequential", sequential), ("concurrent", concurrent)]:
+        seconds = loop.run_until_complete(run(user))
+        print(f"{name:<12} {seconds * 1000:>8.1f} ms/user")
+    histogram = REGISTRY.get("eventstore_request_seconds")
+    for endpoint in (TRIAGE_START, STUDY_B_ARM):
+        count, total = histogram.count(endpoint=endpoint), histogram.sum(
+            endpoint=endpoint
+        )
+        print(f"{endpoint:<30} {total / count * 1000:>8.1f} ms/request")
+
+
+if __name__ == "__main__":
+    main()
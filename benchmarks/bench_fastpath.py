@@ -0,0 +1,83 @@
+"""
+Measures the fraction of messages that the NLU fast path parses, and the time it
+saves, by replaying a CSV export of user messages, as given by the query in
+clean_data/README.md.
+
+    python -m benchmarks.bench_fastpath messages.csv
+    python -m benchmarks.bench_fastpath messages.csv --model models/
+
+Without a trained model, only the time taken by the fast path itself is measured.
+With a model, each message is also parsed by the full pipeline, with and without the
+fast path, which needs Rasa installed.
+"""
+import argparse
+import csv
+import time
+from typing import List, Text
+
+from base.nlu.fastpath import FastPath, lookup_table_labels, normalise
+
+
+def read_messages(path: Text) -> List[Text]:
+    with open(path, newline="") as f:
+        return [row[0] for row in csv.reader(f) if row]
+
+
+def time_parses(interpreter, texts: List[Text]) -> float:
+    start = time.monotonic()
+    for text in texts:
+        interpreter.parse(text)
+    return time.monotonic() - start
+
+
+def bench_model(model: Text, hits: List[Text], misses: List[Text]) -> None:
+    from rasa.model import get_model, get_model_subdirectories
+    from rasa.nlu.model import Interpreter
+
+    _, nlu_model = get_model_subdirectories(get_model(model))
+    interpreter = Interpreter.load(nlu_model)
+    [classifier] = [
+        c for c in interpreter.pipeline if type(c).__name__ == "FastPathClassifier"
+    ]
+
+    with_fast_path = time_parses(interpreter, hits)
+    blocked = classifier.fast_path.blocked
+    classifier.fast_path.blocked = blocked | {normalise(t) for t in hits}
+    without_fast_path = time_parses(interpreter, hits)
+    classifier.fast_path.blocked = blocked
+    other = time_parses(interpreter, misses)
+
+    n, m = max(len(hits), 1), max(len(misses), 1)
+    print(f"Fast path messages, full pipeline: {without_fast_path / n * 1e3:.2f}ms")
+    print(f"Fast path messages, fast path:     {with_fast_path / n * 1e3:.2f}ms")
+    print(f"Other messages:                    {other / m * 1e3:.2f}ms")
+    print(f"Total time saved: {without_fast_path - with_fast_path:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "messages", help="CSV with the message text in the first column"
+    )
+    parser.add_argument("--model", help="Trained model, to time the full pipeline")
+    args = parser.parse_args()
+
+    texts = read_messages(args.messages)
+    fast_path = FastPath(labels=lookup_table_labels())
+    start = time.monotonic()
+    parses = [fast_path.match(text) for text in texts]
+    seconds = time.monotonic() - start
+
+    hits = [t for t, p in zip(texts, parses) if p is not None]
+    misses = [t for t, p in zip(texts, parses) if p is None]
+    print(
+        f"Fast path parsed {len(hits)} of {len(texts)} messages "
+        f"({len(hits) / max(len(texts), 1):.1%}), "
+        f"taking {seconds / max(len(texts), 1) * 1e6:.2f}us per message"
+    )
+    if args.model:
+        bench_model(args.model, hits, misses)
+
+
+if __name__ == "__main__":
+    main()
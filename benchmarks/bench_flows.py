@@ -0,0 +1,61 @@
+"""
+Measures how long the hh HealthCheckProfileForm takes to find the next slot to ask
+for, at every step of every path through the form, compared to building the list of
+slots on each turn like it used to.
+
+    python -m benchmarks.bench_flows
+"""
+import timeit
+
+from rasa_sdk import Tracker
+
+from hh.actions.actions import HealthCheckProfileForm
+
+ROUNDS = 200
+
+
+def legacy_required_slots(cls, tracker):
+    slots = cls.SLOTS + cls.PERSISTED_SLOTS
+    if tracker.get_slot("medical_condition") != "no":
+        slots = cls.SLOTS + cls.PERSISTED_SLOTS + cls.CONDITIONS
+    if tracker.get_slot("age") == "<18":
+        for slot in cls.MINOR_SKIP_SLOTS:
+            if slot in slots:
+                slots.remove(slot)
+    for slot in slots:
+        if not tracker.get_slot(slot):
+            return [slot]
+    return []
+
+
+def trackers():
+    """
+    A tracker for each step of each path through the form
+    """
+    for branches, plan in HealthCheckProfileForm.FLOW.paths().items():
+        answers = {
+            "age": "<18" if "minor" in branches else "18-39",
+            "medical_condition": "no" if "no_conditions" in branches else "yes",
+        }
+        slots = {}
+        for slot in plan + ("",):
+            yield Tracker("", dict(slots), {}, [], False, None, {}, "action_listen")
+            slots[slot] = answers.get(slot, "yes")
+
+
+def main():
+    form = HealthCheckProfileForm
+    states = list(trackers())
+    print(f"{len(form.FLOW.paths())} paths, {len(states)} states")
+    for name, func in [
+        ("legacy", lambda t: legacy_required_slots(form, t)),
+        ("compiled", form.required_slots),
+    ]:
+        seconds = min(
+            timeit.repeat(lambda: [func(t) for t in states], number=ROUNDS, repeat=3)
+        )
+        print(f"{name:<10} {seconds / ROUNDS / len(states) * 1e6:>8.2f}µs per turn")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""
+Compares parsing the university yaml file on every call, to the prebuilt index.
+
+    python -m benchmarks.bench_institutions
+"""
+import timeit
+
+from hh.actions.institutions import YAML_PATH, InstitutionIndex, load_yaml
+
+
+def yaml_per_call():
+    data = load_yaml(YAML_PATH)
+    universities = data["gt"].keys()
+    return universities, sorted(data["gt"]["Boston City Campus & Business College"])
+
+
+def index_startup():
+    return InstitutionIndex.open()
+
+
+index = InstitutionIndex.open()
+
+
+def index_per_call():
+    universities = index.universities("gt")
+    return universities, index.campuses("gt", "Boston City Campus & Business College")
+
+
+def report(name, func, number):
+    seconds = min(timeit.repeat(func, number=number, repeat=5)) / number
+    print(f"{name:<20} {seconds * 1e6:>12.2f} µs/call")
+
+
+if __name__ == "__main__":
+    universities, campuses = yaml_per_call()
+    assert (list(universities), campuses) == index_per_call()
+    report("yaml per call", yaml_per_call, 10)
+    report("index startup", index_startup, 1000)
+    report("index per call", index_per_call, 10000)
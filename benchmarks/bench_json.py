@@ -0,0 +1,152 @@
+"""
+Compares the standard library JSON codec with orjson, on the webhook requests and
+responses for a returning HealthCheck user with several sessions in their tracker,
+and on the event store payloads.
+
+    python -m benchmarks.bench_json
+"""
+import random
+import timeit
+
+from base.actions import codec, config
+from base.actions.actions import HealthCheckForm, HealthCheckProfileForm
+
+SESSIONS = [1, 5, 20]
+ROUNDS = 200
+SLOTS = (
+    ["terms", "requested_slot", "study_a_arm", "location_coords"]
+    + HealthCheckProfileForm.SLOTS
+    + HealthCheckProfileForm.CONDITIONS
+    + HealthCheckForm.SLOTS
+)
+INTENTS = ["inform", "affirm", "deny", "maybe", "request_healthcheck", "exit", "more"]
+
+
+def user_event(timestamp, text):
+    intents = [{"name": intent, "confidence": random.random()} for intent in INTENTS]
+    return {
+        "event": "user",
+        "timestamp": timestamp,
+        "text": text,
+        "parse_data": {
+            "intent": intents[0],
+            "entities": [
+                {
+                    "entity": "number",
+                    "start": 0,
+                    "end": len(text),
+                    "value": text,
+                    "extractor": "DIETClassifier",
+                    "confidence_entity": random.random(),
+                }
+            ],
+            "intent_ranking": intents,
+            "text": text,
+        },
+        "input_channel": "whatsapp",
+        "message_id": f"{random.getrandbits(128):032x}",
+        "metadata": {},
+    }
+
+
+def session(timestamp):
+    events = [{"event": "action", "timestamp": timestamp, "name": "action_listen"}]
+    events.append({"event": "session_started", "timestamp": timestamp})
+    for slot in SLOTS:
+        events.append({"event": "slot", "name": slot, "value": "yes"})
+    for slot in SLOTS:
+        timestamp += 10
+        events.append(user_event(timestamp, str(random.randint(1, 5))))
+        events.append({"event": "action", "name": "healthcheck_form", "policy": "f"})
+        events.append({"event": "slot", "name": slot, "value": "yes"})
+        events.append({"event": "slot", "name": "requested_slot", "value": slot})
+        events.append(
+            {"event": "bot", "text": "Please reply with the number " * 10, "data": {}}
+        )
+    return events, timestamp
+
+
+def action_call(sessions):
+    events = []
+    timestamp = 1600000000.0
+    for _ in range(sessions):
+        session_events, timestamp = session(timestamp)
+        events.extend(session_events)
+    return {
+        "next_action": "healthcheck_form",
+        "sender_id": "27820001001",
+        "tracker": {
+            "sender_id": "27820001001",
+            "slots": {slot: "yes" for slot in SLOTS},
+            "latest_message": events[-4],
+            "events": events,
+            "paused": False,
+            "active_form": {"name": "healthcheck_form"},
+            "latest_action_name": "action_listen",
+        },
+        "domain": {"slots": {slot: {"type": "unfeaturized"} for slot in SLOTS}},
+        "version": "1.10.2",
+    }
+
+
+def eventstore_payload():
+    return {
+        "deduplication_id": f"{random.getrandbits(128):032x}",
+        "msisdn": "+27820001001",
+        "source": "WhatsApp",
+        "province": "ZA-GT",
+        "city": "Johannesburg, South Africa",
+        "age": "18-40",
+        "fever": False,
+        "cough": True,
+        "sore_throat": False,
+        "difficulty_breathing": False,
+        "exposure": "no",
+        "tracing": True,
+        "risk": "moderate",
+        "gender": "female",
+        "location": "+26.2041+028.0473/",
+        "city_location": "+26.2041+028.0473/",
+        "preexisting_condition": "no",
+        "data": {"age": 32, "hcs_study_a_arm": "T1"},
+    }
+
+
+def time_per_op(func):
+    return min(timeit.repeat(func, number=ROUNDS, repeat=3)) / ROUNDS * 1e6
+
+
+def measure(sessions):
+    call = action_call(sessions)
+    body = codec.dumps(call)
+    response = {"events": call["tracker"]["events"][-20:], "responses": []}
+    payload = eventstore_payload()
+    payload_body = codec.dumps(payload)
+    return len(body), {
+        "decode tracker": time_per_op(lambda: codec.loads(body)),
+        "encode response": time_per_op(lambda: codec.dumps(response)),
+        "encode payload": time_per_op(lambda: codec.dumps(payload)),
+        "decode payload": time_per_op(lambda: codec.loads(payload_body)),
+    }
+
+
+def main():
+    if codec.orjson is None:
+        print("orjson is not installed, only measuring the standard library")
+    modes = [False] + ([True] if codec.orjson is not None else [])
+    for sessions in SESSIONS:
+        results = {}
+        for fast in modes:
+            config.FAST_JSON = fast
+            size, results[fast] = measure(sessions)
+        print(f"{sessions} sessions, {size / 1024:.0f}KB tracker")
+        for name, stdlib in results[False].items():
+            line = f"  {name:<16} stdlib {stdlib:>9.1f}µs"
+            if True in results:
+                fast = results[True][name]
+                line += f"  orjson {fast:>9.1f}µs  {stdlib / fast:>5.1f}x"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
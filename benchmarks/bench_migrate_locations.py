@@ -0,0 +1,75 @@
+"""
+Measures the location migration on a synthetic SQLite tracker store with a million
+events, and fix_location_format on legacy and already migrated locations.
+
+    python -m benchmarks.bench_migrate_locations
+"""
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import time
+import timeit
+
+from base.actions import migrate_locations
+from base.actions.utils import fix_location_format, format_location
+from base.tests.test_migrate_locations import SCHEMA
+
+EVENTS = 1000000
+# The fraction of events that are location slots, of which half are legacy
+LOCATION_EVENTS = 0.02
+
+
+def random_location():
+    latitude = round(random.uniform(-35, -22), 6)
+    longitude = round(random.uniform(16, 33), 6)
+    return format_location(latitude, longitude), f"{latitude:+}{longitude:+}/"
+
+
+def events():
+    for i in range(EVENTS):
+        if random.random() < LOCATION_EVENTS:
+            fixed, legacy = random_location()
+            name = random.choice(sorted(migrate_locations.LOCATION_SLOTS))
+            value = random.choice([fixed, legacy])
+            event = {"event": "slot", "timestamp": i, "name": name, "value": value}
+        elif random.random() < 0.3:
+            event = {"event": "slot", "timestamp": i, "name": "age", "value": "<18"}
+        else:
+            event = {"event": "user", "timestamp": i, "text": "hi"}
+        yield (f"2782{i // 50:07d}", event["event"], i, json.dumps(event))
+
+
+def main():
+    fixed, legacy = random_location()
+    for name, location in [("legacy", legacy), ("migrated", fixed)]:
+        n = 100000
+        seconds = timeit.timeit(lambda: fix_location_format(location), number=n)
+        print(f"fix_location_format, {name}: {seconds / n * 1e6:.2f}us")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "rasa.db")
+        connection = sqlite3.connect(path)
+        connection.execute(SCHEMA)
+        connection.executemany(
+            "INSERT INTO events (sender_id, type_name, timestamp, data) "
+            "VALUES (?, ?, ?, ?)",
+            events(),
+        )
+        connection.commit()
+
+        start = time.monotonic()
+        stats = migrate_locations.migrate(
+            connection, checkpoint=os.path.join(tmp, "checkpoint")
+        )
+        seconds = time.monotonic() - start
+        connection.close()
+    print(
+        f"Migrated {EVENTS} events in {seconds:.2f}s ({EVENTS / seconds:.0f}/s), "
+        f"{stats.scanned} location events scanned, {stats.updated} updated"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Measures the hit rate of the NLU parse cache, for a range of sizes, by replaying a
+CSV export of user messages, as given by the query in clean_data/README.md. Messages
+that the fast path parses never reach the cache, so they're left out.
+
+    python -m benchmarks.bench_parsecache messages.csv
+    python -m benchmarks.bench_parsecache messages.csv --model models/
+
+With a trained model, the messages are also parsed by the full pipeline, which needs
+Rasa installed, to measure the hit rate of its cache and the time it saves.
+"""
+import argparse
+import time
+from typing import List, Text
+
+from base.nlu.fastpath import FastPath, lookup_table_labels
+from base.nlu.parsecache import ParseCache
+
+from .bench_fastpath import read_messages, time_parses
+
+SIZES = (100, 1000, 10000, 100000)
+
+
+def bench_model(model: Text, texts: List[Text]) -> None:
+    from rasa.model import get_model, get_model_subdirectories
+    from rasa.nlu.model import Interpreter
+
+    _, nlu_model = get_model_subdirectories(get_model(model))
+    interpreter = Interpreter.load(nlu_model)
+    [lookup] = [
+        c for c in interpreter.pipeline if type(c).__name__ == "ParseCacheLookup"
+    ]
+    cache = lookup.parse_cache.cache
+
+    # The first time each unique message is seen is always a miss, so time those
+    # separately from the repeats
+    unique = list(dict.fromkeys(texts))
+    misses = time_parses(interpreter, unique)
+    hits = time_parses(interpreter, unique)
+    cache.clear()
+    cache.hits = cache.misses = 0
+    total = time_parses(interpreter, texts)
+
+    n = max(len(unique), 1)
+    print(f"Pipeline, replayed in order: {cache.hit_rate:.1%} hit rate")
+    print(f"  Uncached messages: {misses / n * 1e3:.2f}ms")
+    print(f"  Cached messages:   {hits / n * 1e3:.2f}ms")
+    print(f"  Total: {total:.2f}s for {len(texts)} messages")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "messages", help="CSV with the message text in the first column"
+    )
+    parser.add_argument("--model", help="Trained model, to time the full pipeline")
+    args = parser.parse_args()
+
+    fast_path = FastPath(labels=lookup_table_labels())
+    texts = [t for t in read_messages(args.messages) if fast_path.match(t) is None]
+    print(f"{len(texts)} messages that aren't parsed by the fast path")
+    parse = {"intent": {"name": "greet", "confidence": 1.0}, "entities": []}
+
+    for size in SIZES:
+        cache = ParseCache(maxsize=size)
+        cache.use_model("model")
+        start = time.monotonic()
+        for text in texts:
+            if cache.get(text) is None:
+                cache.set(text, parse)
+        seconds = time.monotonic() - start
+        print(
+            f"  {size:>6} entries: {cache.cache.hit_rate:.1%} hit rate, "
+            f"{seconds / max(len(texts), 1) * 1e6:.2f}us per message"
+        )
+    if args.model:
+        bench_model(args.model, texts)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Measures the throughput of re-scoring historical triage data, one row at a time with
+get_risk_level, and in batches with and without NumPy, and streaming a CSV export
+through the rescore CLI.
+
+    python -m benchmarks.bench_rescore
+"""
+import csv
+import io
+import random
+import sys
+import time
+
+from base.actions import rescore
+from base.actions.utils import get_risk_level
+
+ROWS = 1000000
+CSV_ROWS = 200000
+
+
+def random_row():
+    row = {s: random.random() < 0.2 for s in rescore.SYMPTOMS}
+    row["exposure"] = random.choice(["yes", "no", "not_sure"])
+    row["age"] = random.choice(["<18", "18-40", "40-65", ">65"])
+    return row
+
+
+def per_row(rows):
+    for row in rows:
+        data = {f"symptoms_{s}": "yes" if row[s] else "no" for s in rescore.SYMPTOMS}
+        data["exposure"] = row["exposure"]
+        data["age"] = row["age"]
+        get_risk_level(data)
+
+
+def timed(func, *args):
+    start = time.monotonic()
+    func(*args)
+    return time.monotonic() - start
+
+
+def main():
+    rows = [random_row() for _ in range(ROWS)]
+    columns = rescore.columns_from_rows(rows)
+    print(f"{ROWS} rows")
+    results = [
+        ("get_risk_level per row", timed(per_row, rows)),
+        ("extract columns", timed(rescore.columns_from_rows, rows)),
+        ("score, pure Python", timed(rescore.score_python, columns)),
+    ]
+    if rescore.numpy is not None:
+        arrays = rescore.Columns(*(rescore.numpy.asarray(c) for c in columns))
+        results.append(("score, NumPy", timed(rescore.score_numpy, arrays)))
+    else:
+        print("NumPy is not installed, skipping the vectorized scoring")
+    for name, seconds in results:
+        print(f"  {name:<24} {ROWS / seconds:>12,.0f} rows/s")
+
+    export = io.StringIO()
+    writer = csv.DictWriter(export, fieldnames=list(rows[0]) + ["risk"])
+    writer.writeheader()
+    for row in rows[:CSV_ROWS]:
+        writer.writerow(dict(row, risk="low"))
+    stdin, stdout = sys.stdin, sys.stdout
+    for args in [[], ["--no-numpy"]]:
+        sys.stdin, sys.stdout = io.StringIO(export.getvalue()), io.StringIO()
+        seconds = timed(rescore.main, args)
+        sys.stdin, sys.stdout = stdin, stdout
+        name = " ".join(["CLI, CSV"] + args)
+        print(f"  {name:<24} {CSV_ROWS / seconds:>12,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Compares difflib.get_close_matches to the institution search index, for searches
+in the province with the most institutions.
+
+    python -m benchmarks.bench_search
+"""
+import difflib
+import timeit
+
+from hh.actions.institutions import load_institutions
+from hh.actions.search import InstitutionSearch
+
+TERMS = ["afda", "wits", "university of johannesburg", "tshwane", "damelin college"]
+
+institutions = load_institutions()
+names = institutions.universities("gt")
+index = InstitutionSearch(names)
+
+
+def difflib_search():
+    for term in TERMS:
+        universities = {v.lower(): v for v in names}
+        difflib.get_close_matches(term.lower(), universities, 5, 0.0)
+
+
+def index_search():
+    for term in TERMS:
+        index.search(term, 5)
+
+
+def report(name, func, number):
+    seconds = min(timeit.repeat(func, number=number, repeat=5)) / number / len(TERMS)
+    print(f"{name:<20} {seconds * 1e6:>12.2f} µs/search")
+
+
+if __name__ == "__main__":
+    print(f"{len(names)} institutions")
+    report("difflib", difflib_search, 10)
+    report("index", index_search, 10)
+    report("index build", lambda: InstitutionSearch(names), 10)
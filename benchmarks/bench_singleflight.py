@@ -0,0 +1,94 @@
+"""
+Simulates a burst of users answering the location question with the same few towns,
+against a local stand-in for Google Places, and compares the number of upstream
+requests with and without single-flight de-duplication.
+
+    python -m benchmarks.bench_singleflight
+"""
+import asyncio
+import random
+import time
+
+from rasa_sdk import Tracker
+from rasa_sdk.executor import CollectingDispatcher
+
+from base.actions import actions, config
+from base.actions.breaker import breakers
+from base.actions.clients import GOOGLE_PLACES
+from base.actions.places import places_cache
+from base.actions.singleflight import SingleFlight
+from base.tests.fake_server import FakeServer, Response
+
+USERS = 500
+TOWNS = ["Soweto", "Durban", "Cape Town", "Pretoria", "Polokwane", "Kimberley"]
+LATENCY = 0.1
+
+
+def google_places(request):
+    if "autocomplete" in request.path:
+        return Response(body={"predictions": [{"place_id": "id"}]}, delay=LATENCY)
+    return Response(
+        body={
+            "result": {
+                "formatted_address": "Somewhere, South Africa",
+                "geometry": {"location": {"lat": 1.23, "lng": 4.56}},
+            }
+        },
+        delay=LATENCY,
+    )
+
+
+async def validate(text):
+    tracker = Tracker(
+        "default",
+        {"requested_slot": "location", "province": "gt"},
+        {"text": text},
+        [{"event": "user", "metadata": {}}],
+        False,
+        None,
+        {},
+        "action_listen",
+    )
+    await actions.HealthCheckProfileForm().validate_location(
+        text, CollectingDispatcher(), tracker, {}
+    )
+
+
+async def burst(single_flight):
+    places_cache.cache.clear()
+    breakers[GOOGLE_PLACES].reset()
+    if not single_flight:
+        # Call the lookup directly, so that no calls are shared
+        flight = actions.places_lookups
+        actions.places_lookups = NoSingleFlight()
+    async with FakeServer(google_places) as server:
+        config.GOOGLE_PLACES_URL = server.url
+        start = time.monotonic()
+        await asyncio.gather(*(validate(random.choice(TOWNS)) for _ in range(USERS)))
+        seconds = time.monotonic() - start
+    if not single_flight:
+        actions.places_lookups = flight
+    return len(server.requests), seconds
+
+
+class NoSingleFlight(SingleFlight):
+    def __init__(self):
+        super().__init__("disabled")
+
+    async def do(self, key, func):
+        return await func()
+
+
+def main():
+    config.GOOGLE_PLACES_API_KEY = "benchmark"
+    config.LOCATION_DEADLINE = 0
+    config.HTTP_POOL_MAX_CONNECTIONS = USERS
+    loop = asyncio.get_event_loop()
+    print(f"{USERS} users, {len(TOWNS)} towns, {LATENCY * 1000:.0f}ms per request")
+    for name, single_flight in [("without", False), ("with", True)]:
+        requests, seconds = loop.run_until_complete(burst(single_flight))
+        print(f"{name + ' single-flight':<24} {requests:>6} requests {seconds:>8.2f}s")
+
+
+if __name__ == "__main__":
+    main()
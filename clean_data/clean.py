@@ -1,8 +1,36 @@
-import asyncio
+"""
+Filters the message texts in a CSV on stdin, for classifying, and writes them to
+stdout. Numbers, blank messages, messages that are already in the NLU training data,
+and duplicates are removed.
+
+    python clean.py < messages.csv > cleaned.csv
+
+The input is processed as a stream. By default, duplicates are found with an
+in-memory set of the messages seen so far, which grows with the number of unique
+messages. For large exports, `--dedup disk` keeps that set in a temporary SQLite
+database instead, and `--dedup bloom` uses a Bloom filter of a fixed size, which
+drops some unique messages as duplicates, at the given `--error-rate`.
+"""
+import argparse
 import csv
+import hashlib
+import math
+import os
+import re
+import sqlite3
 import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Entities are annotated as [text](entity) or [text]{"entity": ...}
+ENTITY_REGEX = re.compile(r"\[([^\]]*)\](?:\([^)]*\)|\{[^}]*\})")
+
 
-from rasa.importers.importer import TrainingDataImporter
+def normalise(text):
+    return text.lower().strip()
 
 
 def is_number(value):
@@ -13,28 +41,182 @@ def is_number(value):
         return False
 
 
-def get_training_data():
-    importer = TrainingDataImporter.load_from_config(
-        "../config.yml", "../base/domain-eng.yml", ["../base/data/"]
+def get_training_data(pattern):
+    """
+    Returns the normalised examples from the intent sections of the NLU markdown
+    files matching `pattern`, relative to the root of the repo
+    """
+    texts = set()
+    for path in sorted(ROOT.glob(pattern)):
+        in_intent = False
+        with path.open() as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith("## "):
+                    in_intent = line.startswith("## intent:")
+                elif in_intent and line.startswith("- "):
+                    texts.add(normalise(ENTITY_REGEX.sub(r"\1", line[2:])))
+    return texts
+
+
+class MemorySet:
+    def __init__(self):
+        self.seen = set()
+
+    def add(self, text):
+        """
+        Adds the text, and returns whether it hadn't been seen before
+        """
+        if text in self.seen:
+            return False
+        self.seen.add(text)
+        return True
+
+    def close(self):
+        pass
+
+
+class DiskSet:
+    """
+    The texts seen so far, in a temporary SQLite database
+    """
+
+    def __init__(self, directory=None):
+        self.directory = tempfile.TemporaryDirectory(dir=directory)
+        path = os.path.join(self.directory.name, "seen.db")
+        self.db = sqlite3.connect(path, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode = OFF")
+        self.db.execute("PRAGMA synchronous = OFF")
+        self.db.execute("CREATE TABLE seen (text TEXT PRIMARY KEY) WITHOUT ROWID")
+        self.db.execute("BEGIN")
+        self.pending = 0
+
+    def add(self, text):
+        cursor = self.db.execute("INSERT OR IGNORE INTO seen VALUES (?)", (text,))
+        self.pending += 1
+        if self.pending >= 100000:
+            self.db.execute("COMMIT")
+            self.db.execute("BEGIN")
+            self.pending = 0
+        return cursor.rowcount == 1
+
+    def close(self):
+        self.db.close()
+        self.directory.cleanup()
+
+
+class BloomFilter:
+    """
+    A Bloom filter sized for `capacity` texts, with a false positive rate of
+    `error_rate` at that capacity
+    """
+
+    def __init__(self, capacity, error_rate):
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def add(self, text):
+        digest = hashlib.blake2b(text.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        new = False
+        for i in range(self.hashes):
+            bit = (h1 + i * h2) % self.size
+            mask = 1 << (bit & 7)
+            if not self.bits[bit >> 3] & mask:
+                self.bits[bit >> 3] |= mask
+                new = True
+        return new
+
+    def close(self):
+        pass
+
+
+def clean(rows, training_data, seen):
+    """
+    Yields the texts from the CSV rows, that should be classified
+    """
+    for row in rows:
+        text = row[0] if row else ""
+        if not text:
+            continue
+        if is_number(text):
+            continue
+        key = normalise(text)
+        if key in training_data:
+            continue
+        if not seen.add(key):
+            continue
+        yield text
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "--nlu",
+        default="base/data/nlu/*.md",
+        help="Glob of the NLU training data, relative to the root of the repo",
+    )
+    parser.add_argument(
+        "--dedup", choices=["memory", "disk", "bloom"], default="memory"
+    )
+    parser.add_argument(
+        "--capacity",
+        type=int,
+        default=10000000,
+        help="Number of unique messages to size the Bloom filter for",
+    )
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=0.001,
+        help="Fraction of unique messages the Bloom filter may drop as duplicates",
     )
-    loop = asyncio.get_event_loop()
-    data = loop.run_until_complete(importer.get_nlu_data())
-    return set(i.text.lower().strip() for i in data.intent_examples)
-
-
-training_data = get_training_data()
-existing = set()
-output = csv.writer(sys.stdout)
-
-for (text,) in csv.reader(sys.stdin):
-    if is_number(text):
-        continue
-    if not text:
-        continue
-    if text.lower().strip() in training_data:
-        continue
-    if text.lower().strip() in existing:
-        continue
-
-    output.writerow([text])
-    existing.add(text.lower().strip())
+    parser.add_argument("--tmpdir", help="Where to keep the disk dedup database")
+    parser.add_argument(
+        "--progress",
+        type=int,
+        default=1000000,
+        help="Report progress on stderr every this many rows",
+    )
+    args = parser.parse_args(argv)
+
+    training_data = get_training_data(args.nlu)
+    if args.dedup == "disk":
+        seen = DiskSet(args.tmpdir)
+    elif args.dedup == "bloom":
+        seen = BloomFilter(args.capacity, args.error_rate)
+    else:
+        seen = MemorySet()
+
+    start = time.monotonic()
+    read = written = 0
+
+    def report(prefix=""):
+        seconds = max(time.monotonic() - start, 1e-9)
+        print(
+            f"{prefix}{read} rows read, {written} written, {read / seconds:.0f} rows/s",
+            file=sys.stderr,
+        )
+
+    def counted(rows):
+        nonlocal read
+        for row in rows:
+            read += 1
+            if read % args.progress == 0:
+                report()
+            yield row
+
+    output = csv.writer(sys.stdout)
+    try:
+        for text in clean(counted(csv.reader(sys.stdin)), training_data, seen):
+            output.writerow([text])
+            written += 1
+    finally:
+        seen.close()
+    report("Done: ")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,200 @@
+"""
+Classifies the message texts in a CSV on stdin, with a locally running Rasa server
+(`rasa run --enable-api`), and writes the texts with the lowest confidence to stdout,
+as a CSV of confidence, intent, and text.
+
+    python get_classification.py < cleaned.csv > classifications.csv
+
+Up to `--concurrency` messages are classified at a time, over a pool of keep-alive
+connections, and only the `--top` lowest confidence results are kept in memory.
+Progress is saved to `--checkpoint` as the messages are classified, so that an
+interrupted run over the same input can be carried on with `--resume`.
+"""
+import argparse
+import asyncio
 import csv
+import heapq
+import json
+import os
 import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from base.actions.clients import HTTPXClient, pool_limits  # noqa: E402 isort:skip
+
+
+class Descending:
+    """
+    Reverses the ordering of the item, to make heapq's min heap a max heap
+    """
+
+    __slots__ = ("item",)
+
+    def __init__(self, item):
+        self.item = item
+
+    def __lt__(self, other):
+        return other.item < self.item
+
+
+class Lowest:
+    """
+    Keeps the `k` lowest (confidence, intent, text) results, with the highest of
+    them at the top of the heap, so that it can be replaced by lower results
+    """
+
+    def __init__(self, k, results=()):
+        self.k = k
+        self.heap = []
+        for result in results:
+            self.push(tuple(result))
+
+    def push(self, result):
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, Descending(result))
+        elif self.heap and result < self.heap[0].item:
+            heapq.heapreplace(self.heap, Descending(result))
+
+    def results(self):
+        return sorted(item.item for item in self.heap)
+
+
+def read_checkpoint(path):
+    """
+    Returns the number of input rows that have been classified, and the lowest
+    results from them
+    """
+    if not os.path.exists(path):
+        return 0, []
+    with open(path) as f:
+        data = json.load(f)
+    return data["rows"], data["lowest"]
+
+
+def write_checkpoint(path, rows, lowest):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"rows": rows, "lowest": lowest.results()}, f)
+    os.replace(tmp_path, path)
+
+
+async def classify(client, url, text):
+    response = await client.post(url, json={"text": text})
+    response.raise_for_status()
+    data = response.json()
+    return data["intent"]["confidence"], data["intent"]["name"], text
+
+
+async def classify_all(
+    rows,
+    lowest,
+    url,
+    concurrency=16,
+    start=0,
+    checkpoint=None,
+    checkpoint_interval=1000,
+    timeout=30,
+):
+    """
+    Classifies the texts in the CSV rows after the first `start`, and adds the
+    results to `lowest`. Returns the number of rows that were classified, including
+    the first `start`.
+
+    Results arrive out of order, so they're only added once all the rows before them
+    have been, so that the checkpoint is always the results of the first N rows.
+    """
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+    completed = {}
+    done = start
+    started_at = time.monotonic()
+
+    def save():
+        if checkpoint:
+            write_checkpoint(checkpoint, done, lowest)
+        seconds = max(time.monotonic() - started_at, 1e-9)
+        print(
+            f"{done} rows classified, {(done - start) / seconds:.0f} rows/s",
+            file=sys.stderr,
+        )
+
+    def complete(index, result):
+        nonlocal done
+        completed[index] = result
+        while done in completed:
+            result = completed.pop(done)
+            if result is not None:
+                lowest.push(result)
+            done += 1
+            if done % checkpoint_interval == 0:
+                save()
+
+    async def produce():
+        for index, row in enumerate(rows):
+            if index < start:
+                continue
+            await queue.put((index, row[0] if row else ""))
+        for _ in range(concurrency):
+            await queue.put(None)
+
+    async def work(client):
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            index, text = item
+            result = await classify(client, url, text) if text else None
+            complete(index, result)
+
+    async with HTTPXClient(
+        timeout=timeout, pool_limits=pool_limits(concurrency, concurrency)
+    ) as client:
+        tasks = [asyncio.ensure_future(produce())]
+        tasks.extend(asyncio.ensure_future(work(client)) for _ in range(concurrency))
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            save()
+    return done
 
-import requests
 
-results = []
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--url", default="http://localhost:5005/model/parse")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument(
+        "--top", type=int, default=100, help="Number of lowest confidence texts"
+    )
+    parser.add_argument("--checkpoint", default="get_classification.checkpoint.json")
+    parser.add_argument("--checkpoint-interval", type=int, default=1000)
+    parser.add_argument(
+        "--resume", action="store_true", help="Carry on from the checkpoint"
+    )
+    parser.add_argument("--timeout", type=float, default=30)
+    args = parser.parse_args(argv)
 
-for (text,) in csv.reader(sys.stdin):
-    r = requests.post("http://localhost:5005/model/parse", json={"text": text})
-    r.raise_for_status()
-    data = r.json()
-    results.append((data["intent"]["confidence"], data["intent"]["name"], text))
+    start, results = read_checkpoint(args.checkpoint) if args.resume else (0, [])
+    lowest = Lowest(args.top, results)
+    asyncio.run(
+        classify_all(
+            csv.reader(sys.stdin),
+            lowest,
+            args.url,
+            concurrency=args.concurrency,
+            start=start,
+            checkpoint=args.checkpoint,
+            checkpoint_interval=args.checkpoint_interval,
+            timeout=args.timeout,
+        )
+    )
 
-results.sort()
+    output = csv.writer(sys.stdout)
+    for item in lowest.results():
+        output.writerow(item)
 
-output = csv.writer(sys.stdout)
 
-for item in results[:100]:
-    output.writerow(item)
+if __name__ == "__main__":
+    main()
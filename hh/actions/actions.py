@@ -1,14 +1,10 @@
-import difflib
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, List, Optional, Text, Union
-from urllib.parse import urljoin
+from typing import Any, Dict, List, Mapping, Optional, Text, Tuple
 
-import httpx
 from rasa_sdk import Tracker
 from rasa_sdk.events import SlotSet
 from rasa_sdk.executor import CollectingDispatcher
-from rasa_sdk.forms import Action
-from ruamel.yaml import YAML
+from rasa_sdk.forms import REQUESTED_SLOT, Action
 
 from base.actions import config
 from base.actions.actions import ActionExit as BaseActionExit
@@ -17,6 +13,30 @@ from base.actions.actions import BaseFormAction
 from base.actions.actions import HealthCheckForm as BaseHealthCheckForm
 from base.actions.actions import HealthCheckProfileForm as BaseHealthCheckProfileForm
 from base.actions.actions import HealthCheckTermsForm as BaseHealthCheckTermsForm
+from base.actions.cache import TTLCache
+from base.actions.eventstore import eventstore
+from base.actions.lookups import lookup_tables
+from base.actions.prefetch import Prefetcher
+from base.actions.slots import YES_NO, Choices, LookupChoices, SlotSchema, schema
+from hh.actions.institutions import InstitutionIndex, load_institutions
+from hh.actions.menus import build_campus_menus, make_list, parse_list
+from hh.actions.search import InstitutionSearch
+
+# Map the prebuilt institution index on startup, so that the pages are shared between
+# the action server workers
+institutions = load_institutions()
+institution_search = {
+    province: InstitutionSearch(institutions.universities(province))
+    for province in institutions.provinces()
+}
+# Ranked search results, keyed by (province, normalised search term)
+university_lists: TTLCache[Tuple[Text, ...]] = TTLCache(
+    "university_list",
+    maxsize=config.UNIVERSITY_CACHE_SIZE,
+    ttl=config.UNIVERSITY_CACHE_TTL,
+)
+# Campus menus for every institution, split into pages to keep the messages short
+campus_menus = build_campus_menus(institutions, config.CAMPUS_MENU_PAGE_SIZE)
 
 
 class HealthCheckTermsForm(BaseHealthCheckTermsForm):
@@ -35,6 +55,55 @@ class HealthCheckTermsForm(BaseHealthCheckTermsForm):
         return self.validate_generic("terms", dispatcher, value, {1: "yes"})
 
 
+study_b_arms = Prefetcher("study_b_arm", ttl=config.STUDY_B_PREFETCH_TTL)
+
+
+def study_b_arm_request(sender_id: Text, province: Text) -> Dict[Text, Text]:
+    return {
+        "msisdn": f'+{sender_id.lstrip("+")}',
+        "source": "WhatsApp",
+        "province": f"ZA-{province.upper()}",
+    }
+
+
+def prefetch_study_b_arm(tracker: Tracker, province: Optional[Text]) -> None:
+    """
+    Starts assigning the study B arm in the background, as soon as we know the
+    province, so that it's ready by the time we get to action_assign_study_b_arm
+    """
+    if not (config.STUDY_B_ENABLED and eventstore.enabled and province):
+        return
+    if tracker.get_slot("study_b_arm"):
+        return
+    data = study_b_arm_request(tracker.sender_id, province)
+    study_b_arms.start(
+        (tracker.sender_id, data["province"]),
+        lambda: eventstore.assign_study_b_arm(data),
+    )
+
+
+def prefetch_study_b_arm_for_province(
+    result: Dict[Text, Any], dispatcher: CollectingDispatcher, tracker: Tracker
+) -> Dict[Text, Any]:
+    prefetch_study_b_arm(tracker, result["province"])
+    return result
+
+
+def format_vaccine_uptake(
+    result: Dict[Text, Any], dispatcher: CollectingDispatcher, tracker: Tracker
+) -> Dict[Text, Any]:
+    if result.get("vaccine_uptake") == "not":
+        dispatcher.utter_message(template="utter_not_vaccinated")
+    # Convert to uppercase to be consistent with other channels
+    # Check that it's a string first for safety
+    if isinstance(result["vaccine_uptake"], str):
+        result["vaccine_uptake"] = result["vaccine_uptake"].upper()
+    return result
+
+
+VACCINE_UPTAKE = Choices.from_mapping({1: "partially", 2: "fully", 3: "not"})
+
+
 class HealthCheckProfileForm(BaseHealthCheckProfileForm):
     SLOTS = ["age"]
 
@@ -56,98 +125,67 @@ class HealthCheckProfileForm(BaseHealthCheckProfileForm):
     ]
     MINOR_SKIP_SLOTS = ["first_name", "last_name", "location", "location_confirm"]
 
-    def slot_mappings(self) -> Dict[Text, Union[Dict, List[Dict]]]:
-        mappings = super().slot_mappings()
-        mappings["first_name"] = [self.from_text()]
-        mappings["last_name"] = [self.from_text()]
-        mappings["destination"] = [self.from_entity(entity="number"), self.from_text()]
-        mappings["reason"] = [self.from_entity(entity="number"), self.from_text()]
-        mappings["destination_province"] = [
-            self.from_entity(entity="number"),
-            self.from_text(),
-        ]
-        mappings["university"] = [self.from_text()]
-        mappings["university_confirm"] = [
-            self.from_entity(entity="number"),
-            self.from_text(),
-        ]
-        mappings["campus"] = [self.from_entity(entity="number"), self.from_text()]
-        mappings["vaccine_uptake"] = [
-            self.from_entity(entity="number"),
-            self.from_text(),
-        ]
-        return mappings
+    SLOT_SCHEMA = {
+        **BaseHealthCheckProfileForm.SLOT_SCHEMA,
+        **schema(
+            BaseHealthCheckProfileForm.SLOT_SCHEMA["province"]._replace(
+                post=prefetch_study_b_arm_for_province
+            ),
+            SlotSchema("first_name", entities=()),
+            SlotSchema("last_name", entities=()),
+            SlotSchema("destination", LookupChoices("hh", "destinations")),
+            SlotSchema("reason", LookupChoices("hh", "reasons")),
+            SlotSchema("destination_province", LookupChoices("base", "provinces")),
+            SlotSchema("university", entities=()),
+            SlotSchema("university_confirm"),
+            SlotSchema("campus"),
+            SlotSchema("vaccine_uptake", VACCINE_UPTAKE, post=format_vaccine_uptake),
+        ),
+    }
 
     @property
-    def destination_data(self) -> Dict[int, Text]:
-        with open("hh/data/lookup_tables/destinations.txt") as f:
-            return dict(enumerate(f.read().splitlines(), start=1))
+    def destination_data(self) -> Mapping[int, Text]:
+        return lookup_tables.labels("hh", "destinations")
 
     @property
-    def vaccine_uptake_data(self) -> Dict[int, Text]:
-        return {1: "partially", 2: "fully", 3: "not"}
-
-    def validate_destination(
-        self,
-        value: Text,
-        dispatcher: CollectingDispatcher,
-        tracker: Tracker,
-        domain: Dict[Text, Any],
-    ) -> Dict[Text, Optional[Text]]:
-        return self.validate_generic(
-            "destination", dispatcher, value, self.destination_data
-        )
+    def vaccine_uptake_data(self) -> Mapping[int, Text]:
+        return VACCINE_UPTAKE.values
 
     @property
-    def reason_data(self) -> Dict[int, Text]:
-        with open("hh/data/lookup_tables/reasons.txt") as f:
-            return dict(enumerate(f.read().splitlines(), start=1))
-
-    def validate_reason(
-        self,
-        value: Text,
-        dispatcher: CollectingDispatcher,
-        tracker: Tracker,
-        domain: Dict[Text, Any],
-    ) -> Dict[Text, Optional[Text]]:
-        return self.validate_generic("reason", dispatcher, value, self.reason_data)
+    def reason_data(self) -> Mapping[int, Text]:
+        return lookup_tables.labels("hh", "reasons")
 
     @property
-    def institution_data(self) -> Dict[Text, Dict[Text, List[Text]]]:
-        with open("hh/actions/university_data.yaml") as f:
-            return YAML(typ="safe").load(f)
+    def institution_data(self) -> InstitutionIndex:
+        return institutions
 
     @staticmethod
     def make_list(items):
         """
         Given a dictionary of items, returns text for a user selectable list
         """
-        return "\n".join([f"*{i}.* {v}" for i, v in items.items()])
+        return make_list(items)
+
+    @staticmethod
+    def parse_list(text: Optional[Text]) -> Dict[int, Text]:
+        """
+        The reverse of `make_list`, returns the items from the list text
+        """
+        return parse_list(text)
 
     def university_list(self, province, search_term):
-        # Use this mapping, so that we can do a lower case comparison
-        universities = {v.lower(): v for v in self.institution_data[province].keys()}
-        matches = difflib.get_close_matches(search_term.lower(), universities, 5, 0.0)
-        return {i: universities[v] for i, v in enumerate(matches, start=1)}
+        search_term = " ".join(search_term.lower().split())
+        matches = university_lists.get((province, search_term))
+        if matches is None:
+            matches = tuple(institution_search[province].search(search_term, 5))
+            university_lists.set((province, search_term), matches)
+        return {i: v for i, v in enumerate(matches, start=1)}
 
-    def campus_list(self, province, university):
-        return {
-            i: v
-            for i, v in enumerate(
-                sorted(self.institution_data[province][university]), start=1
-            )
-        }
+    def campus_menu(self, province, university):
+        return campus_menus[(province, university)]
 
-    def validate_destination_province(
-        self,
-        value: Text,
-        dispatcher: CollectingDispatcher,
-        tracker: Tracker,
-        domain: Dict[Text, Any],
-    ) -> Dict[Text, Optional[Text]]:
-        return self.validate_generic(
-            "destination_province", dispatcher, value, self.province_data
-        )
+    def campus_list(self, province, university):
+        return self.campus_menu(province, university).items
 
     def validate_university(
         self,
@@ -169,31 +207,19 @@ class HealthCheckProfileForm(BaseHealthCheckProfileForm):
         domain: Dict[Text, Any],
     ) -> Dict[Text, Optional[Text]]:
         province = tracker.get_slot("destination_province")
-        university_data = self.university_list(province, tracker.get_slot("university"))
+        # Use the list that the user was shown, in case the search results have
+        # changed since then
+        university_data = self.parse_list(tracker.get_slot("university_list"))
+        if not university_data:
+            university_data = self.university_list(
+                province, tracker.get_slot("university")
+            )
         data = self.validate_generic(
             "university_confirm", dispatcher, value, university_data
         )
         if data.get("university_confirm"):
-            campus_data = self.campus_list(province, data["university_confirm"])
-            data["campus_list"] = self.make_list(campus_data)
-        return data
-
-    def validate_vaccine_uptake(
-        self,
-        value: Text,
-        dispatcher: CollectingDispatcher,
-        tracker: Tracker,
-        domain: Dict[Text, Any],
-    ) -> Dict[Text, Optional[Text]]:
-        data = self.validate_generic(
-            "vaccine_uptake", dispatcher, value, self.vaccine_uptake_data
-        )
-        if data.get("vaccine_uptake") == "not":
-            dispatcher.utter_message(template="utter_not_vaccinated")
-        # Convert to uppercase to be consistent with other channels
-        # Check that it's a string first for safety
-        if isinstance(data["vaccine_uptake"], str):
-            data["vaccine_uptake"] = data["vaccine_uptake"].upper()
+            menu = self.campus_menu(province, data["university_confirm"])
+            data["campus_list"] = menu.pages[0]
         return data
 
     def validate_campus(
@@ -205,9 +231,33 @@ class HealthCheckProfileForm(BaseHealthCheckProfileForm):
     ) -> Dict[Text, Optional[Text]]:
         province = tracker.get_slot("destination_province")
         university = tracker.get_slot("university_confirm")
+        if isinstance(value, str) and value.strip().lower() == "more":
+            menu = self.campus_menu(province, university)
+            return {
+                "campus": None,
+                "campus_list": menu.next_page(tracker.get_slot("campus_list")),
+            }
         campus_data = self.campus_list(province, university)
         return self.validate_generic("campus", dispatcher, value, campus_data)
 
+    def request_next_slot(
+        self,
+        dispatcher: CollectingDispatcher,
+        tracker: Tracker,
+        domain: Dict[Text, Any],
+    ) -> Optional[List[Dict]]:
+        events = super().request_next_slot(dispatcher, tracker, domain)
+        if events and SlotSet(REQUESTED_SLOT, "campus") in events:
+            menu = campus_menus.get(
+                (
+                    tracker.get_slot("destination_province"),
+                    tracker.get_slot("university_confirm"),
+                )
+            )
+            if menu and menu.has_more(tracker.get_slot("campus_list")):
+                dispatcher.utter_message(template="utter_more_options")
+        return events
+
 
 class HealthCheckForm(BaseHealthCheckForm):
     def get_eventstore_data(self, tracker: Tracker, risk: Text) -> Dict[Text, Any]:
@@ -272,6 +322,10 @@ class ActionSessionStart(BaseActionSessionStart):
             actions.append(SlotSet(slot, tracker.get_slot(slot)))
         return actions
 
+    def get_session_reminders(self, tracker: Tracker) -> List[Dict[Text, Any]]:
+        # There's no study A message for hh
+        return []
+
 
 class ActionExit(BaseActionExit):
     def run(
@@ -308,51 +362,12 @@ class HonestyCheckForm(BaseFormAction):
             return [f"honesty_{arm}"]
         return []
 
-    def slot_mappings(self) -> Dict[Text, Union[Dict, List[Dict]]]:
-        return {
-            "honesty_t1": [
-                self.from_intent(intent="affirm", value="yes"),
-                self.from_text(),
-            ],
-            "honesty_t2": [
-                self.from_intent(intent="affirm", value="yes"),
-                self.from_text(),
-            ],
-            "honesty_t3": [
-                self.from_intent(intent="affirm", value="yes"),
-                self.from_text(),
-            ],
-        }
-
-    def validate_honesty_t1(
-        self,
-        value: Text,
-        dispatcher: CollectingDispatcher,
-        tracker: Tracker,
-        domain: Dict[Text, Any],
-    ) -> Dict[Text, Optional[Text]]:
-
-        return self.validate_generic("honesty_t1", dispatcher, value, self.yes_no_data)
-
-    def validate_honesty_t2(
-        self,
-        value: Text,
-        dispatcher: CollectingDispatcher,
-        tracker: Tracker,
-        domain: Dict[Text, Any],
-    ) -> Dict[Text, Optional[Text]]:
-
-        return self.validate_generic("honesty_t2", dispatcher, value, self.yes_no_data)
-
-    def validate_honesty_t3(
-        self,
-        value: Text,
-        dispatcher: CollectingDispatcher,
-        tracker: Tracker,
-        domain: Dict[Text, Any],
-    ) -> Dict[Text, Optional[Text]]:
-
-        return self.validate_generic("honesty_t3", dispatcher, value, self.yes_no_data)
+    SLOT_SCHEMA = schema(
+        *(
+            SlotSchema(slot, YES_NO, entities=(), intents={"affirm": "yes"})
+            for slot in SLOTS
+        )
+    )
 
     async def submit(
         self,
@@ -378,40 +393,16 @@ class ActionAssignStudyBArm(Action):
 
         arm = tracker.get_slot("study_b_arm")
         if not arm and config.STUDY_B_ENABLED:
-            data = {
-                "msisdn": f'+{tracker.sender_id.lstrip("+")}',
-                "source": "WhatsApp",
-                "province": f'ZA-{tracker.get_slot("province").upper()}',
-            }
-            resp = await self.call_event_store(data)
+            data = study_b_arm_request(tracker.sender_id, tracker.get_slot("province"))
+            resp = await study_b_arms.get((tracker.sender_id, data["province"]))
+            if resp is None:
+                resp = await self.call_event_store(data)
             arm = resp.get("study_b_arm")
             return [SlotSet("study_b_arm", arm)]
         return []
 
     async def call_event_store(self, data):
-        if config.EVENTSTORE_URL and config.EVENTSTORE_TOKEN:
-            url = urljoin(config.EVENTSTORE_URL, "/api/v2/hcsstudybrandomarm/")
-
-            headers = {
-                "Authorization": f"Token {config.EVENTSTORE_TOKEN}",
-                "User-Agent": "rasa/covid19-healthcheckbot",
-            }
-
-            if hasattr(httpx, "AsyncClient"):
-                # from httpx>=0.11.0, the async client is a different class
-                HTTPXClient = getattr(httpx, "AsyncClient")
-            else:
-                HTTPXClient = getattr(httpx, "Client")
-
-            for i in range(config.HTTP_RETRIES):
-                try:
-                    async with HTTPXClient() as client:
-                        resp = await client.post(url, json=data, headers=headers)
-                        resp.raise_for_status()
-                        return resp.json()
-                except httpx.HTTPError as e:
-                    if i == config.HTTP_RETRIES - 1:
-                        raise e
+        return await eventstore.assign_study_b_arm(data)
 
 
 class ActionStartTriage(Action):
@@ -425,6 +416,9 @@ class ActionStartTriage(Action):
         domain: Dict[Text, Any],
     ) -> List[Dict[Text, Any]]:
 
+        # Returning users already have a province, so we can start assigning the
+        # study B arm as soon as they start a new check
+        prefetch_study_b_arm(tracker, tracker.get_slot("province"))
         data = {
             "msisdn": f'+{tracker.sender_id.lstrip("+")}',
             "source": "WhatsApp",
@@ -434,29 +428,7 @@ class ActionStartTriage(Action):
         return [SlotSet("start_time", start_timestamp)]
 
     async def call_event_store(self, data):
-        if config.EVENTSTORE_URL and config.EVENTSTORE_TOKEN:
-            url = urljoin(config.EVENTSTORE_URL, "/api/v2/covid19triagestart/")
-
-            headers = {
-                "Authorization": f"Token {config.EVENTSTORE_TOKEN}",
-                "User-Agent": "rasa/covid19-healthcheckbot",
-            }
-
-            if hasattr(httpx, "AsyncClient"):
-                # from httpx>=0.11.0, the async client is a different class
-                HTTPXClient = getattr(httpx, "AsyncClient")
-            else:
-                HTTPXClient = getattr(httpx, "Client")
-
-            for i in range(config.HTTP_RETRIES):
-                try:
-                    async with HTTPXClient() as client:
-                        resp = await client.post(url, json=data, headers=headers)
-                        resp.raise_for_status()
-                        return resp.json()
-                except httpx.HTTPError as e:
-                    if i == config.HTTP_RETRIES - 1:
-                        raise e
+        return await eventstore.start_triage(data)
 
 
 class ActionSendStudyMessages(Action):
@@ -6,6 +6,8 @@ from typing import Dict, Iterable, Optional, Set, Text
 from ruamel.yaml import round_trip_dump, round_trip_load
 from ruamel.yaml.comments import CommentedMap
 
+from hh.actions.institutions import INDEX_PATH, YAML_PATH, write_index
+
 PROVINCE_MAPPING = {
     "EC": "ec",
     "Eastern Cape": "ec",
@@ -62,7 +64,7 @@ def sort_data(data: Dict[Text, Dict[Text, Set[Text]]]) -> CommentedMap:
 if __name__ == "__main__":
     processed: Dict[Text, Dict[Text, Set[Text]]] = defaultdict(lambda: defaultdict(set))
 
-    with open("university_data.yaml") as f:
+    with open(YAML_PATH) as f:
         data = round_trip_load(f)
         for province, inst_data in data.items():
             for instutution, campuses in inst_data.items():
@@ -72,5 +74,8 @@ if __name__ == "__main__":
         with open(filename) as f:
             processed = process_university_data(csv.DictReader(f), processed)
 
-    with open("university_data.yaml", "w") as f:
+    with open(YAML_PATH, "w") as f:
         round_trip_dump(sort_data(processed), f)
+
+    # Compile the prebuilt index that the action server loads on startup
+    write_index(YAML_PATH, INDEX_PATH)
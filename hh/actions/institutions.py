@@ -0,0 +1,213 @@
+import hashlib
+import logging
+import mmap
+import struct
+import sys
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Text, Union
+
+from ruamel.yaml import YAML
+
+logger = logging.getLogger(__name__)
+
+YAML_PATH = Path(__file__).resolve().parent / "university_data.yaml"
+INDEX_PATH = YAML_PATH.with_suffix(".idx")
+
+MAGIC = b"HCUI"
+VERSION = 1
+# magic, version, sha256 of the source yaml, then the number of strings, provinces,
+# universities, and campuses, and the size of the string blob
+HEADER = struct.Struct("<4sI32s5I")
+
+InstitutionData = Mapping[Text, Mapping[Text, Iterable[Text]]]
+
+
+def source_digest(source: bytes) -> bytes:
+    return hashlib.sha256(source).digest()
+
+
+def compile_index(data: InstitutionData, digest: bytes = b"\0" * 32) -> bytes:
+    """
+    Compiles the institution data into the binary index format.
+
+    All strings are interned into a single UTF-8 blob, and referenced by their
+    position in the string table. Provinces, universities and campuses are stored as
+    arrays of uint32, sorted so that they can be binary searched:
+    - provinces: (name, first university, number of universities)
+    - universities: (name, first campus, number of campuses)
+    - campuses: name
+    """
+    strings: Dict[Text, int] = {}
+
+    def intern(s: Text) -> int:
+        return strings.setdefault(s, len(strings))
+
+    provinces: List[int] = []
+    universities: List[int] = []
+    campuses: List[int] = []
+    for province in sorted(data):
+        institutions = data[province]
+        provinces.extend((intern(province), len(universities) // 3, len(institutions)))
+        for university in sorted(institutions):
+            names = sorted(set(institutions[university]))
+            universities.extend((intern(university), len(campuses), len(names)))
+            campuses.extend(intern(name) for name in names)
+
+    offsets = [0]
+    blob = bytearray()
+    for s in strings:
+        blob.extend(s.encode("utf-8"))
+        offsets.append(len(blob))
+
+    header = HEADER.pack(
+        MAGIC,
+        VERSION,
+        digest,
+        len(strings),
+        len(provinces) // 3,
+        len(universities) // 3,
+        len(campuses),
+        len(blob),
+    )
+    arrays = struct.pack(
+        f"<{len(offsets) + len(provinces) + len(universities) + len(campuses)}I",
+        *offsets,
+        *provinces,
+        *universities,
+        *campuses,
+    )
+    return header + arrays + bytes(blob)
+
+
+def load_yaml(path: Union[Text, Path] = YAML_PATH) -> InstitutionData:
+    with open(path) as f:
+        return YAML(typ="safe").load(f)
+
+
+def write_index(
+    yaml_path: Union[Text, Path] = YAML_PATH, index_path: Union[Text, Path] = INDEX_PATH
+) -> None:
+    """
+    Compiles the yaml file at `yaml_path` into an index at `index_path`
+    """
+    source = Path(yaml_path).read_bytes()
+    index = compile_index(load_yaml(yaml_path), source_digest(source))
+    Path(index_path).write_bytes(index)
+
+
+class InstitutionIndex:
+    """
+    Read only view over a compiled institution index.
+
+    The buffer is usually a read only mmap of the index file, so that the pages are
+    shared between all the action server worker processes.
+    """
+
+    def __init__(self, buffer: Union[bytes, mmap.mmap]):
+        if sys.byteorder != "little":
+            raise ValueError("The institution index requires a little endian platform")
+        (
+            magic,
+            version,
+            self.digest,
+            n_strings,
+            n_provinces,
+            n_universities,
+            n_campuses,
+            blob_size,
+        ) = HEADER.unpack_from(buffer)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Invalid institution index {magic!r} v{version}")
+
+        self._buffer = buffer
+        view = memoryview(buffer)  # type: ignore
+        position = HEADER.size
+
+        def array(length: int) -> memoryview:
+            nonlocal position
+            start, position = position, position + 4 * length
+            return view[start:position].cast("I")
+
+        self._offsets = array(n_strings + 1)
+        self._provinces = array(n_provinces * 3)
+        self._universities = array(n_universities * 3)
+        self._campuses = array(n_campuses)
+        self._blob = view[position:][:blob_size]
+
+        self._strings: Dict[int, Text] = {}
+        self._province_index = {
+            self._string(self._provinces[i * 3]): i for i in range(n_provinces)
+        }
+        self._university_names: Dict[Text, List[Text]] = {}
+
+    @classmethod
+    def open(cls, path: Union[Text, Path] = INDEX_PATH) -> "InstitutionIndex":
+        with open(path, "rb") as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def _string(self, sid: int) -> Text:
+        s = self._strings.get(sid)
+        if s is None:
+            start, end = self._offsets[sid], self._offsets[sid + 1]
+            s = self._strings[sid] = str(self._blob[start:end], "utf-8")
+        return s
+
+    def provinces(self) -> List[Text]:
+        return list(self._province_index)
+
+    def universities(self, province: Text) -> List[Text]:
+        """
+        Returns the alphabetically sorted list of universities for the province
+        """
+        names = self._university_names.get(province)
+        if names is None:
+            i = self._province_index[province] * 3
+            start, count = self._provinces[i + 1], self._provinces[i + 2]
+            names = self._university_names[province] = [
+                self._string(self._universities[u * 3])
+                for u in range(start, start + count)
+            ]
+        return list(names)
+
+    def campuses(self, province: Text, university: Text) -> List[Text]:
+        """
+        Returns the alphabetically sorted list of campuses for the university
+        """
+        names = self._university_names.get(province)
+        if names is None:
+            self.universities(province)
+            names = self._university_names[province]
+        position = bisect_left(names, university)
+        if position == len(names) or names[position] != university:
+            raise KeyError(university)
+        u = (self._provinces[self._province_index[province] * 3 + 1] + position) * 3
+        start, count = self._universities[u + 1], self._universities[u + 2]
+        return [self._string(self._campuses[c]) for c in range(start, start + count)]
+
+    def to_dict(self) -> Dict[Text, Dict[Text, List[Text]]]:
+        return {
+            province: {
+                university: self.campuses(province, university)
+                for university in self.universities(province)
+            }
+            for province in self.provinces()
+        }
+
+
+def load_institutions(
+    yaml_path: Union[Text, Path] = YAML_PATH, index_path: Union[Text, Path] = INDEX_PATH
+) -> InstitutionIndex:
+    """
+    Opens the compiled index, falling back to compiling the yaml file in memory if the
+    index is missing or was compiled from a different version of the yaml file
+    """
+    digest = source_digest(Path(yaml_path).read_bytes())
+    try:
+        index = InstitutionIndex.open(index_path)
+        if index.digest == digest:
+            return index
+        logger.warning("Institution index %s is out of date", index_path)
+    except (OSError, ValueError):
+        logger.warning("Unable to open institution index %s", index_path)
+    return InstitutionIndex(compile_index(load_yaml(yaml_path), digest))
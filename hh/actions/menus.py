@@ -0,0 +1,78 @@
+import re
+from types import MappingProxyType
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Text, Tuple
+
+from hh.actions.institutions import InstitutionIndex
+
+LIST_ITEM_REGEX = re.compile(r"^\*(?P<index>\d+)\.\* (?P<value>.*)$")
+
+
+def make_list(items: Mapping[int, Text]) -> Text:
+    """
+    Given a dictionary of items, returns text for a user selectable list
+    """
+    return "\n".join([f"*{i}.* {v}" for i, v in items.items()])
+
+
+def parse_list(text: Optional[Text]) -> Dict[int, Text]:
+    """
+    The reverse of `make_list`, returns the items from the list text
+    """
+    items = {}
+    for line in (text or "").splitlines():
+        match = LIST_ITEM_REGEX.match(line)
+        if match:
+            items[int(match.group("index"))] = match.group("value")
+    return items
+
+
+class Menu(NamedTuple):
+    """
+    A user selectable list, split into pages of text.
+
+    The items are numbered across all the pages, so a user can select any item, not
+    just the items on the page that they're looking at. The prompt to see more is
+    left to the domain, see `has_more`.
+    """
+
+    items: Mapping[int, Text]
+    pages: Tuple[Text, ...]
+
+    @classmethod
+    def build(cls, values: Iterable[Text], page_size: int) -> "Menu":
+        items = dict(enumerate(values, start=1))
+        numbers = list(items)
+        chunks = [
+            numbers[i:][:page_size] for i in range(0, len(numbers), page_size)
+        ] or [[]]
+        pages = tuple(make_list({n: items[n] for n in chunk}) for chunk in chunks)
+        return cls(items=MappingProxyType(items), pages=pages)
+
+    def next_page(self, current: Optional[Text]) -> Text:
+        """
+        Returns the page after `current`, wrapping around to the first page
+        """
+        try:
+            return self.pages[(self.pages.index(current or "") + 1) % len(self.pages)]
+        except ValueError:
+            return self.pages[0]
+
+    def has_more(self, current: Optional[Text]) -> bool:
+        """
+        Whether there are pages after `current`, that the user can ask to see
+        """
+        return current in self.pages[:-1]
+
+
+def build_campus_menus(
+    institutions: InstitutionIndex, page_size: int
+) -> Dict[Tuple[Text, Text], Menu]:
+    """
+    Builds the campus menu for every institution, keyed by (province, institution)
+    """
+    menus = {}
+    for province in institutions.provinces():
+        for university in institutions.universities(province):
+            campuses: List[Text] = institutions.campuses(province, university)
+            menus[(province, university)] = Menu.build(campuses, page_size)
+    return menus
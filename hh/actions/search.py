@@ -0,0 +1,139 @@
+import heapq
+import re
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, Set, Text, Tuple
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+PARENTHESES_RE = re.compile(r"\(([^)]*)\)")
+# Words that are commonly left out of abbreviations, eg. University of Cape Town, UCT
+STOPWORDS = frozenset(["of", "the", "and", "for", "a"])
+
+
+def tokenize(text: Text) -> List[Text]:
+    return TOKEN_RE.findall(text.lower())
+
+
+def abbreviations(name: Text) -> Set[Text]:
+    """
+    Returns the abbreviations that a user might use to search for `name`:
+    - The initials of the words before any parentheses, with and without stopwords
+    - Any uppercase words in parentheses, eg. "University of Cape Town (UCT)"
+    """
+    result = set()
+    words = tokenize(name.split("(")[0])
+    if len(words) > 1:
+        result.add("".join(w[0] for w in words))
+        result.add("".join(w[0] for w in words if w not in STOPWORDS))
+    for group in PARENTHESES_RE.findall(name):
+        for word in group.split():
+            if word.isupper() and len(word) > 1:
+                result.add(word.lower())
+    return {a for a in result if len(a) > 1}
+
+
+class InstitutionSearch:
+    """
+    Searches a list of names for the closest matches to a search term.
+
+    The ranking is the same as `difflib.get_close_matches(term, names, n, 0.0)` on the
+    lowercased names, but it avoids calculating the expensive `SequenceMatcher.ratio`
+    for every name. Each name's ratio is bounded above by the number of characters it
+    has in common with the search term (`SequenceMatcher.quick_ratio`), which we
+    calculate for all names at once from an inverted index of characters. Names are
+    then only scored in order of that bound, until the bound drops below the score of
+    the n'th best match.
+
+    Search terms that are an abbreviation of a name (eg. "uct"), or the same words in
+    a different order, are ranked first, since difflib ranks those poorly.
+    """
+
+    def __init__(self, names: Iterable[Text]):
+        # Use this mapping, so that we can do a lower case comparison
+        self.names = {name.lower(): name for name in names}
+        self.keys = list(self.names)
+        self.lengths = [len(key) for key in self.keys]
+
+        self.postings: Dict[Text, List[Tuple[int, int]]] = defaultdict(list)
+        for i, key in enumerate(self.keys):
+            for char, count in Counter(key).items():
+                self.postings[char].append((i, count))
+
+        self.abbreviations: Dict[Text, List[int]] = defaultdict(list)
+        self.token_sets: Dict[Tuple[Text, ...], List[int]] = defaultdict(list)
+        for i, key in enumerate(self.keys):
+            for abbreviation in abbreviations(self.names[key]):
+                self.abbreviations[abbreviation].append(i)
+            self.token_sets[tuple(sorted(tokenize(key)))].append(i)
+
+    def upper_bounds(self, term: Text) -> List[float]:
+        """
+        Returns `SequenceMatcher.quick_ratio` for `term` against every name
+        """
+        matches = [0] * len(self.keys)
+        for char, count in Counter(term).items():
+            for i, name_count in self.postings.get(char, ()):
+                matches[i] += min(count, name_count)
+        length = len(term)
+        return [
+            2.0 * m / (length + n) if length + n else 1.0
+            for m, n in zip(matches, self.lengths)
+        ]
+
+    def rank(self, term: Text, limit: int = 5) -> List[Text]:
+        """
+        Returns the `limit` closest names to `term`, ranked exactly the same as
+        `difflib.get_close_matches`
+        """
+        term = term.lower()
+        bounds = self.upper_bounds(term)
+        matcher: SequenceMatcher = SequenceMatcher()
+        matcher.set_seq2(term)
+        best: List[Tuple[float, Text]] = []
+        for i in sorted(range(len(self.keys)), key=bounds.__getitem__, reverse=True):
+            if len(best) == limit and bounds[i] < best[0][0]:
+                break
+            key = self.keys[i]
+            matcher.set_seq1(key)
+            item = (matcher.ratio(), key)
+            if len(best) < limit:
+                heapq.heappush(best, item)
+            elif item > best[0]:
+                heapq.heapreplace(best, item)
+        return [self.names[key] for _, key in sorted(best, reverse=True)]
+
+    def expansions(self, term: Text) -> List[Text]:
+        """
+        Returns the names that `term` is an abbreviation of, or that have the same
+        words as `term` in a different order
+        """
+        term = term.lower().strip()
+        if term in self.names:
+            return []
+        tokens = tokenize(term)
+        if not tokens:
+            return []
+        indexes = list(self.token_sets.get(tuple(sorted(tokens)), []))
+        if len(tokens) == 1 or all(len(t) == 1 for t in tokens):
+            indexes.extend(self.abbreviations.get("".join(tokens), []))
+        keys = {self.keys[i] for i in indexes}
+        matcher: SequenceMatcher = SequenceMatcher()
+        matcher.set_seq2(term)
+        scored = []
+        for key in keys:
+            matcher.set_seq1(key)
+            scored.append((matcher.ratio(), key))
+        return [self.names[key] for _, key in sorted(scored, reverse=True)]
+
+    def search(self, term: Text, limit: int = 5) -> List[Text]:
+        """
+        Returns the `limit` best matches for `term`, with any abbreviation or word
+        order matches first, followed by the closest matches
+        """
+        results = self.expansions(term)[:limit]
+        if len(results) == limit:
+            return results
+        for name in self.rank(term, limit + len(results)):
+            if name not in results:
+                results.append(name)
+        return results[:limit]
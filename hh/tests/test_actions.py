@@ -1,4 +1,6 @@
+import asyncio
 from datetime import datetime, timedelta, timezone
+from typing import Dict
 from unittest import TestCase
 from unittest.mock import patch
 
@@ -8,6 +10,7 @@ from rasa_sdk.events import SlotSet
 from rasa_sdk.executor import CollectingDispatcher
 
 from base.actions import config
+from base.actions.eventstore import eventstore
 from base.tests import utils
 from hh.actions.actions import (
     ActionAssignStudyBArm,
@@ -17,6 +20,9 @@ from hh.actions.actions import (
     HealthCheckForm,
     HealthCheckProfileForm,
     HonestyCheckForm,
+    prefetch_study_b_arm,
+    study_b_arms,
+    university_lists,
 )
 
 
@@ -25,7 +31,42 @@ def mock_env_studyb(monkeypatch):
     monkeypatch.setattr(config, "STUDY_B_ENABLED", True)
 
 
+@pytest.fixture
+def mock_eventstore(monkeypatch):
+    monkeypatch.setattr(config, "EVENTSTORE_URL", "https://eventstore")
+    monkeypatch.setattr(config, "EVENTSTORE_TOKEN", "token")
+    study_b_arms.clear()
+
+
 class HealthCheckProfileFormTests(TestCase):
+    def test_flow_paths(self):
+        """
+        Every path through the form should ask the questions in order, skipping the
+        ones that don't apply
+        """
+        paths = HealthCheckProfileForm.FLOW.paths()
+        self.assertEqual(len(paths), 4)
+        for branches, plan in paths.items():
+            answers = {
+                "age": "<18" if "minor" in branches else "18-39",
+                "medical_condition": "no" if "no_conditions" in branches else "yes",
+            }
+            if "minor" in branches:
+                self.assertNotIn("first_name", plan)
+            if "no_conditions" in branches:
+                self.assertNotIn("medical_condition_obesity", plan)
+            slots: Dict[str, str] = {}
+            for slot in plan:
+                tracker = Tracker(
+                    "27820001001", slots, {}, [], False, None, {}, "action_listen"
+                )
+                self.assertEqual(HealthCheckProfileForm.required_slots(tracker), [slot])
+                slots[slot] = answers.get(slot, "yes")
+            tracker = Tracker(
+                "27820001001", slots, {}, [], False, None, {}, "action_listen"
+            )
+            self.assertEqual(HealthCheckProfileForm.required_slots(tracker), [])
+
     def test_slot_mappings(self):
         """
         Ensures that the additional school fields are in the slot mappings
@@ -113,6 +154,44 @@ class HealthCheckProfileFormTests(TestCase):
             {"university_confirm": "AFDA", "campus_list": "*1.* Cenral"},
         )
 
+    def test_validate_university_confirm_shown_list(self):
+        """
+        Should use the list the user was shown, even if the search results changed
+        """
+        form = HealthCheckProfileForm()
+        tracker = Tracker(
+            "27820001001",
+            {
+                "destination_province": "ec",
+                "university": "afda",
+                "university_list": "*1.* STADIO AFDA\n*2.* AFDA",
+            },
+            {},
+            [],
+            False,
+            None,
+            {},
+            "action_listen",
+        )
+        dispatcher = CollectingDispatcher()
+        response = form.validate_university_confirm("2", dispatcher, tracker, {})
+        self.assertEqual(
+            response,
+            {"university_confirm": "AFDA", "campus_list": "*1.* Cenral"},
+        )
+
+    def test_university_list_cached(self):
+        """
+        Should cache the search results for the normalised search term
+        """
+        form = HealthCheckProfileForm()
+        university_lists.clear()
+        hits = university_lists.hits
+        first = form.university_list("ec", "AFDA ")
+        second = form.university_list("ec", " afda")
+        self.assertEqual(first, second)
+        self.assertEqual(university_lists.hits, hits + 1)
+
     def test_validate_campus(self):
         form = HealthCheckProfileForm()
         tracker = Tracker(
@@ -132,6 +211,68 @@ class HealthCheckProfileFormTests(TestCase):
             {"campus": "Cenral"},
         )
 
+    def test_validate_campus_more(self):
+        """
+        Replying more should show the next page of campuses, and the user should be
+        able to choose from any page
+        """
+        form = HealthCheckProfileForm()
+        university = "Boston City Campus & Business College"
+        menu = form.campus_menu("gt", university)
+        self.assertEqual(len(menu.pages), 2)
+        tracker = Tracker(
+            "27820001001",
+            {
+                "destination_province": "gt",
+                "university_confirm": university,
+                "campus_list": menu.pages[0],
+            },
+            {},
+            [],
+            False,
+            None,
+            {},
+            "action_listen",
+        )
+        dispatcher = CollectingDispatcher()
+        response = form.validate_campus("more", dispatcher, tracker, {})
+        self.assertEqual(response, {"campus": None, "campus_list": menu.pages[1]})
+        self.assertEqual(dispatcher.messages, [])
+
+        response = form.validate_campus("12", dispatcher, tracker, {})
+        self.assertEqual(response, {"campus": menu.items[12]})
+
+    def test_request_campus_more(self):
+        """
+        If there are more pages of campuses, the user should be told how to see them
+        """
+        form = HealthCheckProfileForm()
+        university = "Boston City Campus & Business College"
+        menu = form.campus_menu("gt", university)
+        for page, templates in [
+            (menu.pages[0], ["utter_ask_campus", "utter_more_options"]),
+            (menu.pages[1], ["utter_ask_campus"]),
+        ]:
+            tracker = Tracker(
+                "27820001001",
+                {
+                    "destination_province": "gt",
+                    "university_confirm": university,
+                    "campus_list": page,
+                },
+                {},
+                [],
+                False,
+                None,
+                {},
+                "action_listen",
+            )
+            dispatcher = CollectingDispatcher()
+            with patch.object(form, "required_slots", return_value=["campus"]):
+                events = form.request_next_slot(dispatcher, tracker, {})
+            self.assertEqual(events, [SlotSet("requested_slot", "campus")])
+            self.assertEqual([m["template"] for m in dispatcher.messages], templates)
+
     @patch("hh.actions.actions.CollectingDispatcher.utter_message")
     def test_validate_vaccine_uptake(self, mock_utter):
         form = HealthCheckProfileForm()
@@ -228,6 +369,7 @@ class HealthCheckFormTests(TestCase):
                     "diabetes": False,
                     "hypertension": True,
                     "obesity": False,
+                    "risk_version": 1,
                     "destination": "campus",
                     "reason": "student",
                     "destination_province": "ZA-EC",
@@ -303,6 +445,26 @@ class HealthCheckFormTests(TestCase):
 
 
 class ActionSessionStartTests(TestCase):
+    def test_no_study_a_message(self):
+        """
+        hh doesn't send the study A message, so shouldn't schedule it
+        """
+        events = ActionSessionStart().run(
+            CollectingDispatcher(),
+            Tracker(
+                "27820001001",
+                {"study_a_arm": "T1"},
+                {},
+                [],
+                False,
+                None,
+                {},
+                "action_send_study_messages",
+            ),
+            {},
+        )
+        self.assertEqual([e for e in events if e["event"] == "reminder"], [])
+
     def test_additional_details_copied(self):
         """
         Should copy over the hh additional details to the new session
@@ -403,6 +565,101 @@ class TestActionAssignStudyBArm:
         )
         assert SlotSet("study_b_arm", "T1") in events
 
+    def get_tracker(self, slots):
+        return Tracker("27820001001", slots, {}, [], False, None, {}, "action_listen")
+
+    @pytest.mark.asyncio
+    async def test_prefetch_on_province(self, mock_env_studyb, mock_eventstore):
+        """
+        Once the province is known, the arm should be assigned in the background, and
+        used by the action
+        """
+        with patch.object(eventstore, "assign_study_b_arm", utils.AsyncMock()) as m:
+            m.return_value = {"study_b_arm": "T2"}
+            form = HealthCheckProfileForm()
+            result = form.validate_province(
+                "gt", CollectingDispatcher(), self.get_tracker({}), {}
+            )
+            assert result == {"province": "gt"}
+
+            action = ActionAssignStudyBArm()
+            action.call_event_store = utils.AsyncMock()
+            events = await action.run(
+                CollectingDispatcher(), self.get_tracker({"province": "gt"}), {}
+            )
+        assert events == [SlotSet("study_b_arm", "T2")]
+        m.assert_called_once_with(
+            {"msisdn": "+27820001001", "source": "WhatsApp", "province": "ZA-GT"}
+        )
+        action.call_event_store.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_prefetch_on_start_triage(self, mock_env_studyb, mock_eventstore):
+        """
+        Returning users already have a province, so the arm should be assigned in the
+        background as soon as they start a check
+        """
+        with patch.object(eventstore, "assign_study_b_arm", utils.AsyncMock()) as m:
+            m.return_value = {"study_b_arm": "T3"}
+            start_triage = ActionStartTriage()
+            start_triage.call_event_store = utils.AsyncMock()
+            start_triage.call_event_store.return_value = {"timestamp": "2021-01-01"}
+            await start_triage.run(
+                CollectingDispatcher(), self.get_tracker({"province": "wc"}), {}
+            )
+            action = ActionAssignStudyBArm()
+            action.call_event_store = utils.AsyncMock()
+            events = await action.run(
+                CollectingDispatcher(), self.get_tracker({"province": "wc"}), {}
+            )
+        assert events == [SlotSet("study_b_arm", "T3")]
+        m.assert_called_once()
+        action.call_event_store.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_prefetch_in_flight(self, mock_env_studyb, mock_eventstore):
+        """
+        If the background request hasn't finished yet, we should wait for it, rather
+        than assigning another arm
+        """
+        calls = []
+
+        async def slow(data):
+            calls.append(data)
+            await asyncio.sleep(0.05)
+            return {"study_b_arm": "C"}
+
+        with patch.object(eventstore, "assign_study_b_arm", slow):
+            prefetch_study_b_arm(self.get_tracker({}), "gt")
+            action = ActionAssignStudyBArm()
+            action.call_event_store = utils.AsyncMock()
+            events = await action.run(
+                CollectingDispatcher(), self.get_tracker({"province": "gt"}), {}
+            )
+        assert events == [SlotSet("study_b_arm", "C")]
+        assert len(calls) == 1
+        action.call_event_store.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_no_prefetch_on_session_start(self, mock_env_studyb, mock_eventstore):
+        """
+        Sessions also start after a completed check, so we shouldn't assign an arm
+        until the user starts a new one
+        """
+        with patch.object(eventstore, "assign_study_b_arm", utils.AsyncMock()) as m:
+            ActionSessionStart().run(
+                CollectingDispatcher(), self.get_tracker({"province": "gt"}), {}
+            )
+            await asyncio.sleep(0)
+        m.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_no_prefetch_if_disabled(self, mock_eventstore):
+        with patch.object(eventstore, "assign_study_b_arm", utils.AsyncMock()) as m:
+            prefetch_study_b_arm(self.get_tracker({}), "gt")
+            await asyncio.sleep(0)
+        m.assert_not_called()
+
 
 @pytest.mark.asyncio
 class TestHonestyCheckForm:
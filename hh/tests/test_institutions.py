@@ -0,0 +1,97 @@
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from hh.actions.institutions import (
+    INDEX_PATH,
+    YAML_PATH,
+    InstitutionIndex,
+    compile_index,
+    load_institutions,
+    load_yaml,
+    source_digest,
+    write_index,
+)
+
+
+class TestInstitutionIndex(TestCase):
+    data = {
+        "wc": {
+            "University of Cape Town": ["Upper", "Middle", "Lower"],
+            "AFDA": ["Cape Town"],
+        },
+        "ec": {"AFDA": ["Cenral"]},
+    }
+
+    def test_round_trip(self):
+        """
+        Should return the same data, sorted, after being compiled
+        """
+        index = InstitutionIndex(compile_index(self.data))
+        self.assertEqual(index.provinces(), ["ec", "wc"])
+        self.assertEqual(index.universities("wc"), ["AFDA", "University of Cape Town"])
+        self.assertEqual(
+            index.campuses("wc", "University of Cape Town"),
+            ["Lower", "Middle", "Upper"],
+        )
+        self.assertEqual(index.campuses("ec", "AFDA"), ["Cenral"])
+
+    def test_missing(self):
+        """
+        Unknown provinces and universities should raise a KeyError
+        """
+        index = InstitutionIndex(compile_index(self.data))
+        with self.assertRaises(KeyError):
+            index.universities("gt")
+        with self.assertRaises(KeyError):
+            index.campuses("ec", "University of Cape Town")
+
+    def test_interned_strings(self):
+        """
+        Repeated strings should only be stored once
+        """
+        index = compile_index(self.data)
+        self.assertEqual(index.count(b"AFDA"), 1)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            InstitutionIndex(b"\0" * 64)
+
+    def test_committed_index_up_to_date(self):
+        """
+        The committed index should match the committed yaml file. If this fails, run
+        `python -m hh.actions.import_university_data` to recompile the index
+        """
+        index = InstitutionIndex.open(INDEX_PATH)
+        self.assertEqual(index.digest, source_digest(YAML_PATH.read_bytes()))
+        self.assertEqual(
+            index.to_dict(),
+            {
+                province: {uni: sorted(campuses) for uni, campuses in unis.items()}
+                for province, unis in load_yaml(YAML_PATH).items()
+            },
+        )
+
+    def test_load_institutions_missing(self):
+        """
+        If the index is missing, it should be compiled from the yaml instead
+        """
+        index = load_institutions(YAML_PATH, "/does/not/exist.idx")
+        self.assertEqual(index.campuses("ec", "AFDA"), ["Cenral"])
+
+    def test_load_institutions_stale(self):
+        """
+        If the index is out of date, it should be compiled from the yaml instead
+        """
+        with tempfile.TemporaryDirectory() as d:
+            yaml_path = Path(d) / "data.yaml"
+            index_path = Path(d) / "data.idx"
+            yaml_path.write_text("gt:\n  Uni:\n  - B\n  - A\n")
+            write_index(yaml_path, index_path)
+            index = load_institutions(yaml_path, index_path)
+            self.assertEqual(index.campuses("gt", "Uni"), ["A", "B"])
+
+            # Modifying the yaml should make the index stale
+            yaml_path.write_text("gt:\n  Uni:\n  - C\n")
+            index = load_institutions(yaml_path, index_path)
+            self.assertEqual(index.campuses("gt", "Uni"), ["C"])
@@ -0,0 +1,48 @@
+from unittest import TestCase
+
+from hh.actions.institutions import InstitutionIndex, compile_index
+from hh.actions.menus import Menu, build_campus_menus, make_list, parse_list
+
+
+class TestMenu(TestCase):
+    def test_make_list(self):
+        self.assertEqual(make_list({1: "a", 2: "b"}), "*1.* a\n*2.* b")
+
+    def test_parse_list(self):
+        items = {1: "AFDA", 2: "STADIO AFDA", 10: "Ikhala"}
+        self.assertEqual(parse_list(make_list(items)), items)
+        self.assertEqual(parse_list("*1.* a\n\nReply *MORE*"), {1: "a"})
+        self.assertEqual(parse_list(None), {})
+
+    def test_single_page(self):
+        menu = Menu.build(["a", "b"], page_size=10)
+        self.assertEqual(menu.items, {1: "a", 2: "b"})
+        self.assertEqual(menu.pages, ("*1.* a\n*2.* b",))
+        self.assertEqual(menu.next_page(menu.pages[0]), menu.pages[0])
+        self.assertFalse(menu.has_more(menu.pages[0]))
+
+    def test_pages(self):
+        """
+        Long menus should be split into pages, numbered across all pages
+        """
+        menu = Menu.build(["a", "b", "c"], page_size=2)
+        self.assertEqual(len(menu.items), 3)
+        self.assertEqual(
+            menu.pages,
+            ("*1.* a\n*2.* b", "*3.* c"),
+        )
+        self.assertEqual(menu.next_page(None), menu.pages[0])
+        self.assertEqual(menu.next_page(menu.pages[0]), menu.pages[1])
+        self.assertEqual(menu.next_page(menu.pages[1]), menu.pages[0])
+        self.assertEqual(menu.next_page("unknown"), menu.pages[0])
+        self.assertTrue(menu.has_more(menu.pages[0]))
+        self.assertFalse(menu.has_more(menu.pages[1]))
+        self.assertFalse(menu.has_more("unknown"))
+
+    def test_build_campus_menus(self):
+        index = InstitutionIndex(
+            compile_index({"ec": {"AFDA": ["Cenral"], "Uni": ["b", "a", "c"]}})
+        )
+        menus = build_campus_menus(index, page_size=2)
+        self.assertEqual(menus[("ec", "AFDA")].pages, ("*1.* Cenral",))
+        self.assertEqual(menus[("ec", "Uni")].items, {1: "a", 2: "b", 3: "c"})
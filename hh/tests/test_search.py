@@ -0,0 +1,107 @@
+import difflib
+import random
+from unittest import TestCase
+
+from hh.actions.institutions import load_institutions
+from hh.actions.search import InstitutionSearch, abbreviations
+
+
+def difflib_search(names, term, limit=5):
+    """
+    The original implementation of university search
+    """
+    universities = {v.lower(): v for v in names}
+    matches = difflib.get_close_matches(term.lower(), universities, limit, 0.0)
+    return [universities[v] for v in matches]
+
+
+def queries(names):
+    """
+    Generates a variety of search terms for the names
+    """
+    rng = random.Random(0)
+    yield ""
+    yield "university"
+    yield "college of"
+    yield "zzz"
+    for name in rng.sample(names, min(len(names), 25)):
+        words = name.split()
+        yield rng.choice([name, name.lower(), words[0], name[:3], name[:10]])
+        # typo
+        i = rng.randrange(len(name))
+        yield name[:i] + name[i:].lower()[1:]
+        yield " ".join(rng.sample(words, min(2, len(words))))
+
+
+class TestInstitutionSearch(TestCase):
+    institutions = load_institutions()
+
+    def test_rank_parity(self):
+        """
+        The ranking should exactly match difflib for all the institution data
+        """
+        for province in self.institutions.provinces():
+            names = self.institutions.universities(province)
+            search = InstitutionSearch(names)
+            for term in queries(names):
+                self.assertEqual(
+                    search.rank(term), difflib_search(names, term), (province, term)
+                )
+            self.assertEqual(
+                search.rank(names[0], 1), difflib_search(names, names[0], 1)
+            )
+
+    def test_search_parity(self):
+        """
+        If the term isn't an abbreviation or a reordering, then the search results
+        should be the same as the ranking
+        """
+        for province in self.institutions.provinces():
+            names = self.institutions.universities(province)
+            search = InstitutionSearch(names)
+            for term in queries(names):
+                if search.expansions(term):
+                    continue
+                self.assertEqual(search.search(term), search.rank(term), term)
+
+    def test_search_afda(self):
+        search = InstitutionSearch(self.institutions.universities("ec"))
+        self.assertEqual(
+            search.search("afda"),
+            ["AFDA", "STADIO AFDA", "Ikhala", "MANCOSA", "Damelin"],
+        )
+
+    def test_abbreviations(self):
+        self.assertEqual(
+            abbreviations("University of Cape Town (UCT)"), {"uoct", "uct"}
+        )
+        self.assertEqual(
+            abbreviations("Academy of Sound Engineering (Pty) Ltd"), {"aose", "ase"}
+        )
+        self.assertEqual(abbreviations("UNISA"), set())
+
+    def test_search_abbreviation(self):
+        """
+        Searching for an abbreviation should return the matching institution first
+        """
+        search = InstitutionSearch(self.institutions.universities("wc"))
+        for term in ["uct", "UCT", "u.c.t", "U C T"]:
+            [first, *_] = search.search(term)
+            self.assertEqual(first, "University of Cape Town (UCT)", term)
+        [first, *_] = search.search("cput")
+        self.assertEqual(first, "Cape Peninsula University of Technology (CPUT)")
+
+        search = InstitutionSearch(self.institutions.universities("gt"))
+        [first, *_] = search.search("wits")
+        self.assertEqual(first, "University of the Witwatersrand (WITS)")
+
+    def test_search_word_order(self):
+        """
+        Searching for the words in a different order should return the institution
+        first
+        """
+        search = InstitutionSearch(self.institutions.universities("wc"))
+        [first, *rest] = search.search("cape town college of")
+        self.assertEqual(first, "College of Cape Town")
+        self.assertEqual(len(rest), 4)
+        self.assertNotIn(first, rest)
@@ -13,7 +13,7 @@ if (( $# != 2 )); then
 fi
 
 
-rasa run actions --actions "$1.actions.actions" &
+python -m base.actions.server --actions "$1.actions.actions" &
 child=$!
 trap 'kill -TERM "$child"' SIGTERM EXIT
 